@@ -0,0 +1,62 @@
+"""
+Aho-Corasick automaton for matching many literal strings in one pass.
+
+Matching cost depends on the text length and the number of matches, not on
+how many patterns the automaton holds. It finds the dilution monograph
+titles (parse_dilution.py) and the drug names embedded in Frank Shann
+dosages (entry_splitter.py), each with one scan of the text.
+"""
+from collections import deque
+
+
+class AhoCorasick:
+    """
+    Build once from a list of literal patterns; iter_matches(text) yields
+    (start, end, pattern_index) for every occurrence, overlaps included,
+    ordered by end position.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [()]
+
+        for index, pattern in enumerate(self.patterns):
+            if not pattern:
+                raise ValueError("empty pattern")
+            state = 0
+            for char in pattern:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.outputs.append(())
+                state = next_state
+            self.outputs[state] += (index,)
+
+        # Breadth-first: a state's failure link points to its longest proper
+        # suffix in the trie, and it inherits that state's outputs
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                self.outputs[next_state] += self.outputs[self.fail[next_state]]
+
+    def iter_matches(self, text):
+        goto, fail, outputs, patterns = self.goto, self.fail, self.outputs, self.patterns
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in outputs[state]:
+                yield end - len(patterns[index]), end, index
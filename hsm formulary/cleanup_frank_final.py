@@ -1,5 +1,9 @@
 import json
-import re
+
+from ocr_rules import rule_set
+
+# The cleanup_frank_final set in ocr_rules.json, applied to both name and dosage
+OCR_RULES = rule_set('cleanup_frank_final')
 
 # Load the data
 with open('src/frankShannData.json', 'r', encoding='utf-8') as f:
@@ -11,33 +15,11 @@ fixes = 0
 
 for entry in data:
     original_name = entry['name']
-    original_dosage = entry['dosage']
-    
-    # Fix BOTH name and dosage
-    name = entry['name']
-    dosage = entry['dosage']
-    
-    # Apply all H-pattern fixes to BOTH fields
-    for field_name, field_value in [('name', name), ('dosage', dosage)]:
-        # Time interval fixes
-        field_value = re.sub(r'\b121-1\b', '12H', field_value)
-        field_value = re.sub(r'\b81-1\b', '8H', field_value)
-        field_value = re.sub(r'\b61-1\b', '6H', field_value)
-        field_value = re.sub(r'\b241-1\b', '24H', field_value)
-        field_value = re.sub(r'\b(\d+)1-1\b', r'\1H', field_value)
-        
-        if field_name == 'name':
-            name = field_value
-        else:
-            dosage = field_value
     
-    # Update if changed
-    if original_name != name or original_dosage != dosage:
-        entry['name'] = name
-        entry['dosage'] = dosage
+    if OCR_RULES.apply_entry(entry):
         fixes += 1
-        if original_name != name:
-            print(f"Fixed NAME: '{original_name}' → '{name}'")
+        if original_name != entry['name']:
+            print(f"Fixed NAME: '{original_name}' → '{entry['name']}'")
 
 # Save
 with open('src/frankShannData.json', 'w', encoding='utf-8') as f:
@@ -46,9 +28,6 @@ with open('src/frankShannData.json', 'w', encoding='utf-8') as f:
 print(f"\n✓ Applied {fixes} final fixes")
 print(f"✓ Saved to src/frankShannData.json")
 
-# Verify
-import subprocess
-result = subprocess.run(['grep', '-c', '121-1', 'src/frankShannData.json'], 
-                       capture_output=True, text=True, cwd='/Users/cda/Desktop/my Coding Project/hsm formulary')
-count = result.stdout.strip()
+# Verify on the records in memory: fields that would show up in a grep of the file
+count = sum('121-1' in entry[field] for entry in data for field in ('name', 'dosage'))
 print(f"\nVerification: {count} occurrences of '121-1' remaining in file")
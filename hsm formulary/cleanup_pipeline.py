@@ -0,0 +1,170 @@
+"""
+In-memory cleanup pipeline for src/frankShannData.json.
+
+cleanup_frank_data.py, cleanup_frank_data_v2.py, cleanup_frank_final.py and
+fix_frank_data.py each load the JSON, clean every entry and write it back.
+A Pipeline chains the same passes over records held in memory, times each
+one, and writes the file once at the end, and only if something changed.
+
+The default chain is CLEANUP_SETS: cleanup_frank_data, cleanup_frank_data_v2
+and cleanup_frank_final. fix_frank_data is left out on purpose. It was written
+for an earlier parser's output, and on the current data it rewrites about one
+entry in ten, much of it for the worse: "(qv)" becomes "((qv))", "1 hr"
+becomes "1H", and "25. 50mg/kg" is glued into "25.50mg/kg". It can still be
+named as a stage explicitly.
+
+A stage that changed nothing is remembered by the digest of its rules and of
+the records it was given. When it meets the same records again it is
+skipped, so re-running the chain on already clean data costs one digest per
+stage. After a run that changed the data, the stages are tried once more on
+a copy of the result, so the stages that leave it as is are already skipped
+on the next run.
+
+Usage:
+    python cleanup_pipeline.py [stage ...] [--data src/frankShannData.json] [--no-skip] [--dry-run]
+"""
+import argparse
+import copy
+import hashlib
+import json
+import os
+import time
+
+from extraction_cache import DEFAULT_CACHE_DIR, write_atomic
+from ocr_rules import CLEANUP_SETS, DATA_FILE, load_rules
+
+NOOPS_FILE = 'cleanup_noops.json'
+
+
+def records_digest(records):
+    return hashlib.sha256(json.dumps(records, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class CleanupStage:
+    """
+    One pass over the records. apply(entry) cleans an entry in place and
+    returns whether it changed it; key identifies what the pass does, so a
+    remembered no-op is dropped when its rules change.
+    """
+
+    def __init__(self, name, apply, key=None):
+        self.name = name
+        self.apply = apply
+        self.key = key or name
+
+    def run(self, records):
+        """Apply to every record; returns the number changed"""
+        return sum(bool(self.apply(entry)) for entry in records)
+
+
+def rule_stage(name, book=None):
+    """A stage running one rule set from ocr_rules.json"""
+    book = book or load_rules()
+    spec = json.dumps(book.spec[name], sort_keys=True).encode('utf-8')
+    return CleanupStage(name, book[name].apply_entry, f"{name}:{hashlib.sha256(spec).hexdigest()[:16]}")
+
+
+class Pipeline:
+    """Cleanup stages composed in order: Pipeline([a, b]) or Pipeline().then(a).then(b)"""
+
+    def __init__(self, stages=(), cache_dir=DEFAULT_CACHE_DIR):
+        self.stages = list(stages)
+        self.cache_dir = cache_dir
+
+    def then(self, stage):
+        return Pipeline(self.stages + [stage], self.cache_dir)
+
+    def _noops_path(self):
+        return os.path.join(self.cache_dir, NOOPS_FILE)
+
+    def _load_noops(self):
+        if self.cache_dir is None:
+            return {}
+        try:
+            with open(self._noops_path(), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _settle(self, records, digest, noops):
+        """
+        Record the stages that leave the final records unchanged, in order,
+        up to the first one that would change them again. The next run
+        starts from these records and skips what was recorded.
+        """
+        trial = copy.deepcopy(records)
+        for stage in self.stages:
+            if stage.run(trial):
+                break
+            noops[stage.key] = digest
+
+    def run(self, records, skip_unchanged=True):
+        """
+        Run every stage over the records in place. Returns one report per
+        stage: {"stage", "seconds", "changed", "skipped"}.
+        """
+        noops = self._load_noops() if skip_unchanged else {}
+        digest = records_digest(records) if skip_unchanged else None
+        reports = []
+        for stage in self.stages:
+            if skip_unchanged and noops.get(stage.key) == digest:
+                reports.append({"stage": stage.name, "seconds": 0.0, "changed": 0, "skipped": True})
+                continue
+            start = time.perf_counter()
+            changed = stage.run(records)
+            seconds = time.perf_counter() - start
+            if skip_unchanged:
+                if changed:
+                    digest = records_digest(records)
+                else:
+                    noops[stage.key] = digest
+            reports.append({"stage": stage.name, "seconds": seconds, "changed": changed, "skipped": False})
+
+        if skip_unchanged and any(report["changed"] for report in reports):
+            self._settle(records, digest, noops)
+        if skip_unchanged and self.cache_dir is not None:
+            write_atomic(self._noops_path(), json.dumps(noops, indent=2))
+        return reports
+
+
+def clean_file(path=DATA_FILE, names=CLEANUP_SETS, skip_unchanged=True, dry_run=False,
+               cache_dir=DEFAULT_CACHE_DIR):
+    """Load the data once, run the named rule sets as one pipeline, and write it back once"""
+    with open(path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+
+    pipeline = Pipeline([rule_stage(name) for name in names], cache_dir)
+    reports = pipeline.run(records, skip_unchanged)
+    if any(report["changed"] for report in reports) and not dry_run:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(records, f, indent=4, ensure_ascii=False)
+    return records, reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Frank Shann cleanup passes in one load and one write")
+    parser.add_argument("stages", nargs="*", default=list(CLEANUP_SETS),
+                        help=f"rule sets from ocr_rules.json, in order (default: {' '.join(CLEANUP_SETS)}; "
+                             "fix_frank_data is left out, it was written for an earlier parser's output "
+                             "and damages the current data)")
+    parser.add_argument("--data", default=DATA_FILE)
+    parser.add_argument("--no-skip", action="store_true", help="run stages even if they changed nothing last time")
+    parser.add_argument("--dry-run", action="store_true", help="report only, do not write the data file")
+    args = parser.parse_args()
+
+    records, reports = clean_file(args.data, args.stages, not args.no_skip, args.dry_run)
+    print(f"Cleaned {len(records)} entries")
+    for report in reports:
+        status = "skipped (unchanged input)" if report["skipped"] else f"{report['changed']} entries changed"
+        print(f"  {report['stage']:24s} {report['seconds'] * 1000:8.1f} ms  {status}")
+    total = sum(report["seconds"] for report in reports)
+    if not any(report["changed"] for report in reports):
+        print(f"✓ Nothing changed in {total * 1000:.1f} ms; {args.data} left as is")
+    elif args.dry_run:
+        print(f"✓ {total * 1000:.1f} ms (dry run, not saved)")
+    else:
+        print(f"✓ {total * 1000:.1f} ms; saved to {args.data}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Column reading order for two-column pages.
+
+Plain extraction follows the content stream, which on the two-column Frank
+Shann pages interleaves lines of the left and right columns, so one drug's
+text runs into another's. Here the text runs of a page (with their positions,
+see table_extraction.py) are split at the gutter: the widest band down the
+middle of the page that almost no run crosses. The left column is read top
+to bottom, then the right. A line that crosses the gutter, such as a
+heading, ends one band of columns and starts the next.
+
+Pages without a gutter come out line by line, top to bottom.
+
+Usage:
+    python column_order.py "public/Frank Shann 17th Edition 2017.pdf" [page ...]
+"""
+import math
+import sys
+
+import numpy as np
+import PyPDF2
+
+from table_extraction import CHAR_WIDTH, group_rows, join_runs, page_runs
+
+# The gutter is searched for between these fractions of the text width
+GUTTER_BAND = (0.3, 0.7)
+# Narrowest gutter, in points
+MIN_GUTTER = 6.0
+# Share of the rows that may cross the gutter (headings, full-width notes)
+MAX_CROSSING = 0.2
+# Rows each column needs before a page counts as two-column
+MIN_COLUMN_ROWS = 3
+
+
+def run_ends(runs):
+    """Estimated right edge of every run"""
+    return np.array([x + len(text) * size * CHAR_WIDTH for x, _, size, text in runs])
+
+
+def find_gutter(runs):
+    """
+    (left, right) edges of the gutter between two columns of runs, or None.
+    Coverage counts how many runs overlap each point across the page.
+    """
+    if not runs:
+        return None
+    starts = np.array([run[0] for run in runs])
+    ends = run_ends(runs)
+    origin = math.floor(starts.min())
+    width = math.ceil(ends.max()) - origin + 1
+    delta = np.zeros(width + 1, dtype=int)
+    np.add.at(delta, (starts - origin).astype(int), 1)
+    np.add.at(delta, (ends - origin).astype(int), -1)
+    coverage = np.cumsum(delta)[:width]
+
+    lo, hi = (int(width * share) for share in GUTTER_BAND)
+    rows = len(group_rows(runs))
+    open_points = np.flatnonzero(coverage[lo:hi] <= rows * MAX_CROSSING) + lo
+    if not len(open_points):
+        return None
+    # Longest stretch of consecutive open points
+    bands = np.split(open_points, np.flatnonzero(np.diff(open_points) > 1) + 1)
+    band = max(bands, key=len)
+    if len(band) < MIN_GUTTER:
+        return None
+    left, right = origin + float(band[0]), origin + float(band[-1])
+    if (len(group_rows([run for run, end in zip(runs, ends) if end <= right])) < MIN_COLUMN_ROWS or
+            len(group_rows([run for run in runs if run[0] >= left])) < MIN_COLUMN_ROWS):
+        return None
+    return left, right
+
+
+def _lines(runs):
+    return [line for line in (join_runs(row) for row in group_rows(runs)) if line]
+
+
+def column_lines(runs):
+    """Lines of a page's runs in reading order, column by column"""
+    gutter = find_gutter(runs)
+    if gutter is None:
+        return _lines(runs)
+    left_edge, right_edge = gutter
+    middle = (left_edge + right_edge) / 2
+
+    lines = []
+    left, right = [], []
+    for row in group_rows(runs):
+        ends = run_ends(row)
+        if any(x < left_edge and end > right_edge for (x, _, _, _), end in zip(row, ends)):
+            lines += _lines(left) + _lines(right) + _lines(row)
+            left, right = [], []
+            continue
+        for run in row:
+            (left if run[0] < middle else right).append(run)
+    return lines + _lines(left) + _lines(right)
+
+
+def column_text(page, content=None):
+    """Text of a page in column reading order; content as in page_runs"""
+    return '\n'.join(column_lines(page_runs(page, content)))
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    reader = PyPDF2.PdfReader(sys.argv[1])
+    pages = [int(n) for n in sys.argv[2:]] or range(1, len(reader.pages) + 1)
+    for page_no in pages:
+        runs = page_runs(reader.pages[page_no - 1])
+        gutter = find_gutter(runs)
+        print(f"=== PAGE {page_no} === " + (f"gutter {gutter[0]:.0f}-{gutter[1]:.0f}" if gutter else "one column"))
+        print('\n'.join(column_lines(runs)))
+
+
+if __name__ == "__main__":
+    main()
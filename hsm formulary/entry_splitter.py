@@ -0,0 +1,160 @@
+"""
+Split Frank Shann records that hold several drug entries.
+
+Where extraction merged two entries, the later one sits inside the earlier
+one's dosage as "... oral. Abacavir 600mg + lamivudine 300mg. >16yr: ...".
+One Aho-Corasick automaton holds every known generic name: formulary
+genericName, dilution genericName and counseling name, first word of each
+component. Each dosage field is scanned once; a name found at the start of
+a sentence, whose sentence closes within an entry name's length, starts a
+new entry there, as long as both sides of the cut keep a dosage.
+
+Usage:
+    python entry_splitter.py [--data src/frankShannData.json] [--dry-run]
+"""
+import argparse
+import json
+import re
+
+from aho_corasick import AhoCorasick
+from ocr_rules import DATA_FILE
+
+FORMULARY_FILE = 'src/formularyData.json'
+DILUTION_FILE = 'src/dilutionData.js'
+COUNSELING_FILE = 'src/counselingData.js'
+
+JS_NAME = {
+    DILUTION_FILE: re.compile(r'^\s*genericName:\s*"([^"]*)"', re.MULTILINE),
+    COUNSELING_FILE: re.compile(r'^\s*name:\s*"([^"]*)"', re.MULTILINE),
+}
+# Components of a combination name, and the word that names each
+COMPONENT_SEPARATOR = re.compile(r'\s*(?:/|&|\+|,|\band\b|\bwith\b)\s*', re.IGNORECASE)
+LEADING_WORD = re.compile(r'[A-Z][A-Za-z\-]{3,}')
+# Leading words that name a salt, a form or a product line rather than a drug
+NOT_GENERIC = {
+    'Sodium', 'Potassium', 'Calcium', 'Magnesium', 'Monobasic', 'Dibasic', 'Amino', 'Starter',
+    'Conjugated', 'Vitamin', 'Human', 'Water', 'Dextrose', 'Glucose', 'Topical', 'Insulin',
+    'Compound', 'Oral', 'Liquid', 'Cream', 'Tablet', 'Capsule', 'Injection', 'Solution',
+    'Transdermal', 'Patch',
+}
+# Longest entry name, in characters, from the name to the full stop after it
+MAX_NAME_LENGTH = 80
+SENTENCE_START = re.compile(r'\.\s+$')
+NAME_END = re.compile(r'\.(?:\s|$)')
+# Prose and dosing words, which a sentence about the drug has and an entry name does not
+NOT_IN_NAME = re.compile(r'\b(?:as|on|is|are|be|may|if|of|to|in|than|when|see|usually|preferable|speeds|'
+                         r'IV|IM|oral|\d+H)\b|/kg', re.IGNORECASE)
+
+
+def trusted_names(formulary_path=FORMULARY_FILE, js_paths=(DILUTION_FILE, COUNSELING_FILE)):
+    """Drug names as written in the formulary, dilution and counseling data"""
+    with open(formulary_path, 'r', encoding='utf-8') as f:
+        names = [entry.get('genericName', '') for entry in json.load(f)]
+    for path in js_paths:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            names += JS_NAME[path].findall(f.read())
+    return names
+
+
+def lexicon_names(names=None):
+    """Generic names from the trusted data, capitalised as entry names"""
+    words = set()
+    for name in trusted_names() if names is None else names:
+        for component in COMPONENT_SEPARATOR.split(name):
+            match = LEADING_WORD.match(component.strip())
+            if match:
+                words.add(match.group().capitalize())
+    return sorted(words - NOT_GENERIC)
+
+
+class EntrySplitter:
+    """Finds entry starts embedded in a dosage field with one automaton pass"""
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.automaton = AhoCorasick(self.names)
+
+    def entry_starts(self, text):
+        """Offsets in text where an embedded entry begins"""
+        starts = []
+        for start, end, _ in self.automaton.iter_matches(text):
+            if starts and start < starts[-1] + 1:
+                continue
+            # Whole word, at a sentence start, followed by a short name ending in a full stop
+            if end < len(text) and text[end].isalpha():
+                continue
+            if start == 0 or not SENTENCE_START.search(text[max(0, start - 3):start]):
+                continue
+            close = NAME_END.search(text, end, start + MAX_NAME_LENGTH)
+            if close and not NOT_IN_NAME.search(text, end, close.start()) and ':' not in text[end:close.start()]:
+                starts.append(start)
+        return starts
+
+    def split(self, entry):
+        """
+        The entry, followed by the entries embedded in its dosage, as dicts
+        with name and dosage. A start is only cut where both the text before
+        it and the new entry keep a dosage; otherwise it stays in place.
+        """
+        dosage = entry['dosage']
+        starts = self.entry_starts(dosage)
+        cuts = []
+        body = 0
+        for k, start in enumerate(starts):
+            close = NAME_END.search(dosage, start, len(dosage))
+            stop = starts[k + 1] if k + 1 < len(starts) else len(dosage)
+            if dosage[body:start].strip() and dosage[close.end():stop].strip():
+                cuts.append((start, close))
+                body = close.end()
+        if not cuts:
+            return [entry]
+        entries = [dict(entry, dosage=dosage[:cuts[0][0]].strip())]
+        for (start, close), (stop, _) in zip(cuts, cuts[1:] + [(len(dosage), None)]):
+            entries.append({"id": "", "name": dosage[start:close.start()].strip(),
+                            "dosage": dosage[close.end():stop].strip()})
+        return entries
+
+    def split_records(self, records):
+        """
+        Records with every merged entry split out. Each record keeps its id;
+        the entries split out of it take that id with -2, -3, ... appended, so
+        ids stored elsewhere (favourites) still find their drug.
+        Returns (records, number of records that were split).
+        """
+        result = []
+        split_count = 0
+        for entry in records:
+            entries = self.split(entry)
+            split_count += len(entries) > 1
+            for number, part in enumerate(entries[1:], 2):
+                part['id'] = f"{entry['id']}-{number}"
+            result += entries
+        return result, split_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split Frank Shann records holding several drug entries")
+    parser.add_argument("--data", default=DATA_FILE)
+    parser.add_argument("--dry-run", action="store_true", help="list the splits, do not write the data file")
+    args = parser.parse_args()
+
+    with open(args.data, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    splitter = EntrySplitter(lexicon_names())
+    if args.dry_run:
+        for entry in records:
+            entries = splitter.split(entry)
+            if len(entries) > 1:
+                print(f"{entry['id']}: " + ' | '.join(part['name'] for part in entries))
+
+    result, split_count = splitter.split_records(records)
+    if split_count and not args.dry_run:
+        with open(args.data, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=4, ensure_ascii=False)
+    print(f"✓ {len(splitter.names)} names; split {split_count} records into "
+          f"{len(result) - len(records) + split_count} entries, {len(result)} in all"
+          f"{' (dry run, not saved)' if args.dry_run else ''}")
+
+
+if __name__ == "__main__":
+    main()
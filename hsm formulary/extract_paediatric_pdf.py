@@ -1,27 +1,35 @@
-import PyPDF2
+import sys
+
+from pdf_extraction import count_pages, extract_to_file, write_pages
+from pdf_toc import iter_toc_pages
+
+def report_progress(count):
+    if count % 50 == 0:
+        print(f"Processed {count} pages...")
 
 def extract_paediatric_pdf_text(pdf_path, output_path):
     """Extract text from the Paediatric Protocols PDF"""
-    with open(pdf_path, 'rb') as file:
-        pdf_reader = PyPDF2.PdfReader(file)
-        total_pages = len(pdf_reader.pages)
-        
-        print(f"Total pages: {total_pages}")
-        
-        with open(output_path, 'w', encoding='utf-8') as output_file:
-            for page_num in range(total_pages):
-                page = pdf_reader.pages[page_num]
-                text = page.extract_text()
-                
-                output_file.write(f"\n=== PAGE {page_num + 1} ===\n\n")
-                output_file.write(text)
-                
-                if (page_num + 1) % 50 == 0:
-                    print(f"Processed {page_num + 1} pages...")
-        
-        print(f"Extraction complete! Saved to {output_path}")
+    total_pages = count_pages(pdf_path)
+    
+    print(f"Total pages: {total_pages}")
+    
+    extract_to_file(pdf_path, output_path, page_format="\n=== PAGE {page_no} ===\n\n{text}",
+                    progress=report_progress)
+    
+    print(f"Extraction complete! Saved to {output_path}")
+
+def extract_paediatric_chapters(pdf_path, chapters, output_path):
+    """Extract only the pages of the given chapters, located through the table of contents"""
+    pages = write_pages(iter_toc_pages(pdf_path, chapters), output_path,
+                        page_format="\n=== PAGE {page_no} ===\n\n{text}")
+    
+    print(f"Extracted {pages} pages for {', '.join(chapters)} to {output_path}")
 
 if __name__ == "__main__":
     pdf_path = "public/Paediatric Protocols 5th Edition PDF_compressed.pdf"
-    output_path = "paediatric_pdf_content.txt"
-    extract_paediatric_pdf_text(pdf_path, output_path)
+    if len(sys.argv) > 1:
+        # e.g. python extract_paediatric_pdf.py Asthma "Neonatal Sepsis"
+        extract_paediatric_chapters(pdf_path, sys.argv[1:], "paediatric_chapters_extracted.txt")
+    else:
+        output_path = "paediatric_pdf_content.txt"
+        extract_paediatric_pdf_text(pdf_path, output_path)
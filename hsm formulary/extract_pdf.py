@@ -1,30 +1,23 @@
 #!/usr/bin/env python3
-import PyPDF2
-import json
+from pdf_extraction import extract_pages, write_pages
 
 # Extract text from PDF
 pdf_path = "public/dilution guideline.pdf"
 output_path = "dilution_extracted.txt"
+page_format = "\n\n=== PAGE {page_no} ===\n\n{text}"
 
-with open(pdf_path, 'rb') as file:
-    pdf_reader = PyPDF2.PdfReader(file)
-    num_pages = len(pdf_reader.pages)
+if __name__ == "__main__":
+    pages = extract_pages(pdf_path)
+    num_pages = len(pages)
     
     print(f"Total pages: {num_pages}")
     
-    all_text = []
-    for page_num in range(num_pages):
-        page = pdf_reader.pages[page_num]
-        text = page.extract_text()
-        all_text.append(f"\n\n=== PAGE {page_num + 1} ===\n\n{text}")
-    
     # Save to file
-    with open(output_path, 'w', encoding='utf-8') as out:
-        out.write('\n'.join(all_text))
+    write_pages(pages, output_path, page_format=page_format, separator='\n')
     
     print(f"Extracted {num_pages} pages to {output_path}")
     
     # Show first 3000 characters
-    preview = '\n'.join(all_text)[:3000]
+    preview = '\n'.join(page_format.format(page_no=page_no, text=text) for page_no, text in pages)[:3000]
     print("\n=== PREVIEW ===")
     print(preview)
@@ -1,35 +1,27 @@
-import PyPDF2
-import os
+import sys
+
+from pdf_extraction import count_pages, extract_to_file, write_pages
+from pdf_toc import iter_toc_pages
 
 pdf_path = 'public/borang-penilaian-kemahiran-kaunseling-pegawai-farmasi.pdf'
 output_path = 'counseling_pdf_layout.txt'
 
-try:
-    with open(pdf_path, 'rb') as file:
-        reader = PyPDF2.PdfReader(file)
-        num_pages = len(reader.pages)
-        print(f"Number of pages: {num_pages}")
-        
-        with open(output_path, 'w') as out_file:
+if __name__ == "__main__":
+    try:
+        print(f"Number of pages: {count_pages(pdf_path)}")
+        if len(sys.argv) > 1:
+            # Drugs to refresh, e.g. python extract_pdf_layout.py Amlodipine "Beta-Blockers"
+            # Their page spans come from the table of contents, so only those pages
+            # go through the (expensive) layout extraction.
+            write_pages(iter_toc_pages(pdf_path, sys.argv[1:], extraction_mode="layout"), output_path)
+        else:
             # Extract TOC (first 10 pages)
-            for i in range(10):
-                page = reader.pages[i]
-                text = page.extract_text(extraction_mode="layout")
-                out_file.write(f"=== PAGE {i+1} ===\n\n")
-                out_file.write(text)
-                out_file.write("\n\n")
-            
             # Extract a sample medication page (e.g., page 23 for Amlodipine based on TOC)
             # Note: TOC page numbers might differ from PDF index. TOC said Amlodipine is page 23.
             # Let's extract a range around there.
-            for i in range(20, 30):
-                page = reader.pages[i]
-                text = page.extract_text(extraction_mode="layout")
-                out_file.write(f"=== PAGE {i+1} ===\n\n")
-                out_file.write(text)
-                out_file.write("\n\n")
-                
-    print(f"Successfully extracted layout text to {output_path}")
+            page_indices = list(range(10)) + list(range(20, 30))
+            extract_to_file(pdf_path, output_path, page_indices, extraction_mode="layout")
+        print(f"Successfully extracted layout text to {output_path}")
 
-except Exception as e:
-    print(f"Error extracting text: {e}")
+    except Exception as e:
+        print(f"Error extracting text: {e}")
@@ -1,24 +1,23 @@
-import PyPDF2
-import os
+import sys
+
+from pdf_extraction import extract_to_file, extract_to_files
 
 pdf_path = 'public/borang-penilaian-kemahiran-kaunseling-pegawai-farmasi.pdf'
 output_path = 'counseling_pdf_content.txt'
+layout_output_path = 'counseling_pdf_layout.txt'
 
-try:
-    with open(pdf_path, 'rb') as file:
-        reader = PyPDF2.PdfReader(file)
-        num_pages = len(reader.pages)
-        print(f"Number of pages: {num_pages}")
-        
-        with open(output_path, 'w') as out_file:
-            for i in range(num_pages):
-                page = reader.pages[i]
-                text = page.extract_text()
-                out_file.write(f"=== PAGE {i+1} ===\n\n")
-                out_file.write(text)
-                out_file.write("\n\n")
-                
-    print(f"Successfully extracted text to {output_path}")
+if __name__ == "__main__":
+    try:
+        if "--layout" in sys.argv[1:]:
+            # Plain and layout text from one pass over the content streams
+            num_pages = extract_to_files(pdf_path, {"plain": output_path,
+                                                    "layout": layout_output_path})
+            print(f"Number of pages: {num_pages}")
+            print(f"Successfully extracted text to {output_path} and {layout_output_path}")
+        else:
+            num_pages = extract_to_file(pdf_path, output_path)
+            print(f"Number of pages: {num_pages}")
+            print(f"Successfully extracted text to {output_path}")
 
-except Exception as e:
-    print(f"Error extracting text: {e}")
+    except Exception as e:
+        print(f"Error extracting text: {e}")
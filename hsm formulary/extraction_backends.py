@@ -0,0 +1,304 @@
+"""
+Pluggable text extraction backends.
+
+PyPDF2 is the default. Other pure-Python extractors are registered when they
+are installed locally (pypdf, pdfminer.six). The bench command times every
+backend on every PDF in public/ and records the fastest acceptable one per
+document and mode; the extraction engine then uses that backend on future
+runs, for that mode only, until the document changes.
+
+Usage:
+    python extraction_backends.py list
+    python extraction_backends.py bench [pdf ...] [--pages 20]
+"""
+import argparse
+import glob
+import inspect
+import io
+import json
+import os
+import re
+import time
+
+from extraction_cache import DEFAULT_CACHE_DIR, file_digest, write_atomic
+
+DEFAULT_BACKEND = 'pypdf2'
+CHOICES_FILE = 'backends.json'
+
+# A backend is acceptable when its output is deterministic and close enough
+# to the default backend's output
+MIN_AGREEMENT = 0.7
+MIN_TEXT_RATIO = 0.9
+
+
+class PyPDF2Backend:
+    name = 'pypdf2'
+
+    def __init__(self):
+        import PyPDF2
+        self.module = PyPDF2
+        self._set_modes()
+
+    def _set_modes(self):
+        self.version = self.module.__version__
+        params = inspect.signature(self.module.PageObject.extract_text).parameters
+        self.modes = {'plain', 'layout'} if 'extraction_mode' in params else {'plain'}
+        if 'visitor_text' in params:
+            self.modes.add('columns')
+
+    def open(self, pdf_path):
+        return self.module.PdfReader(pdf_path)
+
+    def page_count(self, document):
+        return len(document.pages)
+
+    def extract(self, document, index, extraction_mode):
+        return self._extract(document.pages[index], extraction_mode)
+
+    def _extract(self, page, extraction_mode, content=None):
+        """Text of a page in one mode; content is the page's parsed content stream, if at hand"""
+        if extraction_mode == "plain":
+            return page.extract_text()
+        if extraction_mode == "columns":
+            # Rebuilt from positioned text runs; see column_order.py
+            from column_order import column_text
+            return column_text(page, content)
+        return page.extract_text(extraction_mode=extraction_mode)
+
+    def extract_modes(self, document, index, modes):
+        """
+        Text of one page in each of the given modes, as a tuple. For several
+        modes the content stream is parsed once: the parsed ContentStream
+        replaces the page's /Contents, which extract_text reuses as is, and
+        the other modes read its operations.
+        """
+        page = document.pages[index]
+        if len(modes) < 2 or page.get("/Contents") is None:
+            return tuple(self._extract(page, mode) for mode in modes)
+        generic = self.module.generic
+        content = generic.ContentStream(page["/Contents"].get_object(), page.pdf, "bytes")
+        page[generic.NameObject("/Contents")] = content
+        return tuple(self._extract(page, mode, content) for mode in modes)
+
+
+class PypdfBackend(PyPDF2Backend):
+    name = 'pypdf'
+
+    def __init__(self):
+        import pypdf
+        self.module = pypdf
+        self._set_modes()
+        # column_order works on PyPDF2 pages only
+        self.modes.discard('columns')
+
+    def extract_modes(self, document, index, modes):
+        """
+        As for PyPDF2, except with layout among the modes: pypdf's layout
+        extraction writes a parsed /Contents back to bytes and parses it
+        again, so sharing a parse with it is slower than extracting each
+        mode on its own (2.0 s against 1.75 s on the Abx PDF)
+        """
+        if 'layout' in modes:
+            return tuple(self.extract(document, index, mode) for mode in modes)
+        return super().extract_modes(document, index, modes)
+
+
+class PdfminerBackend:
+    name = 'pdfminer'
+    modes = {'plain'}
+
+    def __init__(self):
+        import pdfminer
+        from pdfminer.converter import TextConverter
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+        from pdfminer.pdfpage import PDFPage
+        self.version = pdfminer.__version__
+        self._converter = TextConverter
+        self._laparams = LAParams
+        self._interpreter = PDFPageInterpreter
+        self._resources = PDFResourceManager
+        self._page = PDFPage
+
+    def open(self, pdf_path):
+        handle = open(pdf_path, 'rb')
+        return {"file": handle, "pages": list(self._page.get_pages(handle)),
+                "resources": self._resources(caching=True)}
+
+    def page_count(self, document):
+        return len(document["pages"])
+
+    def extract_modes(self, document, index, modes):
+        return tuple(self.extract(document, index, mode) for mode in modes)
+
+    def extract(self, document, index, extraction_mode):
+        output = io.StringIO()
+        device = self._converter(document["resources"], output, laparams=self._laparams())
+        self._interpreter(document["resources"], device).process_page(document["pages"][index])
+        device.close()
+        return output.getvalue()
+
+
+_backends = None
+
+
+def available_backends():
+    """
+    Every backend whose library is installed, by name. They are instantiated
+    on first use, so importing this module (or pdf_extraction, to read a
+    text file) loads no PDF library.
+    """
+    global _backends
+    if _backends is None:
+        _backends = {}
+        for backend_class in (PyPDF2Backend, PypdfBackend, PdfminerBackend):
+            try:
+                backend = backend_class()
+            except ImportError:
+                continue
+            _backends[backend.name] = backend
+    return _backends
+
+
+def get_backend(name=None):
+    return available_backends()[name or DEFAULT_BACKEND]
+
+
+def _choices_path(cache_dir):
+    return os.path.join(cache_dir, CHOICES_FILE)
+
+
+def load_choices(cache_dir=DEFAULT_CACHE_DIR):
+    try:
+        with open(_choices_path(cache_dir), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def preferred_backend(pdf_path, extraction_mode="plain", cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Backend recorded by the last bench run for this document and mode, or the
+    default. A recorded choice holds only while the document still has the
+    digest it was benched with.
+    """
+    backends = available_backends()
+    if cache_dir is not None:
+        recorded = load_choices(cache_dir).get(os.path.basename(pdf_path), {})
+        choice = recorded.get(extraction_mode)
+        if (choice in backends and extraction_mode in backends[choice].modes and
+                recorded.get("digest") == file_digest(pdf_path)):
+            return choice
+    if extraction_mode in backends[DEFAULT_BACKEND].modes:
+        return DEFAULT_BACKEND
+    # The installed PyPDF2 may predate layout mode; use any backend that has it
+    return next((name for name, backend in backends.items() if extraction_mode in backend.modes),
+                DEFAULT_BACKEND)
+
+
+def _words(text):
+    return set(re.findall(r'\w+', text.lower()))
+
+
+def _agreement(texts, reference):
+    """Mean word-set Jaccard similarity between two lists of page texts"""
+    scores = []
+    for text, ref in zip(texts, reference):
+        a, b = _words(text), _words(ref)
+        scores.append(len(a & b) / len(a | b) if a | b else 1.0)
+    return sum(scores) / len(scores) if scores else 1.0
+
+
+def bench_document(pdf_path, sample_pages=20, extraction_mode="plain"):
+    """
+    Time each backend on an evenly spaced page sample. Returns
+    {backend: {"pages_per_sec", "stability", "agreement", "text_ratio", "acceptable"}}.
+    """
+    default = get_backend()
+    total = default.page_count(default.open(pdf_path))
+    step = max(1, total // sample_pages)
+    indices = list(range(0, total, step))[:sample_pages]
+
+    runs = {}
+    results = {}
+    for name, backend in available_backends().items():
+        if extraction_mode not in backend.modes:
+            continue
+        try:
+            document = backend.open(pdf_path)
+            start = time.perf_counter()
+            first = [backend.extract(document, i, extraction_mode) for i in indices]
+            elapsed = time.perf_counter() - start
+            document = backend.open(pdf_path)
+            second = [backend.extract(document, i, extraction_mode) for i in indices]
+        except Exception as e:
+            print(f"  {name}: failed ({e})")
+            continue
+        runs[name] = first
+        results[name] = {
+            "pages_per_sec": round(len(indices) / elapsed, 2) if elapsed else float(len(indices)),
+            "stability": sum(a == b for a, b in zip(first, second)) / len(indices) if indices else 1.0,
+        }
+
+    reference = runs.get(DEFAULT_BACKEND)
+    for name, result in results.items():
+        texts = runs[name]
+        if reference is None:
+            result["agreement"], result["text_ratio"] = 1.0, 1.0
+        else:
+            ref_chars = sum(len(t.strip()) for t in reference)
+            result["agreement"] = round(_agreement(texts, reference), 3)
+            result["text_ratio"] = round(sum(len(t.strip()) for t in texts) / ref_chars, 3) if ref_chars else 1.0
+        result["acceptable"] = (result["stability"] == 1.0 and
+                                result["agreement"] >= MIN_AGREEMENT and
+                                result["text_ratio"] >= MIN_TEXT_RATIO)
+    return results
+
+
+def bench(pdf_paths, sample_pages=20, extraction_mode="plain", cache_dir=DEFAULT_CACHE_DIR):
+    """Benchmark all backends on each PDF and record the fastest acceptable one"""
+    choices = load_choices(cache_dir)
+    for pdf_path in pdf_paths:
+        print(f"\n{pdf_path}")
+        results = bench_document(pdf_path, sample_pages, extraction_mode)
+        for name, r in sorted(results.items(), key=lambda item: -item[1]["pages_per_sec"]):
+            print(f"  {name:10s} {r['pages_per_sec']:8.2f} pages/s  stability {r['stability']:.2f}  "
+                  f"agreement {r['agreement']:.2f}  text {r['text_ratio']:.2f}"
+                  f"{'' if r['acceptable'] else '  (rejected)'}")
+
+        acceptable = [name for name, r in results.items() if r["acceptable"]]
+        best = max(acceptable, key=lambda name: results[name]["pages_per_sec"]) if acceptable else DEFAULT_BACKEND
+        digest = file_digest(pdf_path)
+        entry = choices.setdefault(os.path.basename(pdf_path), {})
+        if entry.get("digest") != digest:
+            # Choices for other modes were benched on an older copy of the file
+            entry.clear()
+        entry[extraction_mode] = best
+        entry["digest"] = digest
+        entry.setdefault("results", {})[extraction_mode] = results
+        print(f"  ✓ Using {best}")
+
+    write_atomic(_choices_path(cache_dir), json.dumps(choices, indent=2))
+    return choices
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF text extraction backends")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list")
+    bench_parser = sub.add_parser("bench")
+    bench_parser.add_argument("pdf_paths", nargs="*")
+    bench_parser.add_argument("--pages", type=int, default=20, help="pages sampled per document")
+    bench_parser.add_argument("--layout", action="store_true", help="benchmark layout mode")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for name, backend in available_backends().items():
+            print(f"{name:10s} modes: {', '.join(sorted(backend.modes))}")
+    else:
+        pdf_paths = args.pdf_paths or sorted(glob.glob('public/*.pdf'))
+        bench(pdf_paths, args.pages, "layout" if args.layout else "plain")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+On-disk page-level cache for PDF text extraction.
+
+Layout under the cache directory:
+    documents/<pdf digest>.json             page index -> page digest manifest
+    pages/<xx>/<page digest>.<mode>.txt     extracted text for one page
+
+A PDF that is byte-identical to a previous run is resolved from its manifest
+alone. When a PDF changes, each page is re-hashed from its decoded content
+stream and resolved resources, so only new or changed pages have to be
+extracted again. Page texts are stored per backend and library version (the
+mode key, see pdf_extraction.py), so upgrading a backend does not serve text
+the old version extracted.
+
+PyPDF2 is imported only where pages are read, so tools that just need
+file_digest or write_atomic do not depend on it.
+"""
+import hashlib
+import json
+import os
+
+DEFAULT_CACHE_DIR = '.extraction_cache'
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_streams(page):
+    """Yield the decoded bytes of each of a page's content streams"""
+    from PyPDF2.generic import ArrayObject
+
+    contents = page.get("/Contents")
+    if contents is not None:
+        contents = contents.get_object()
+        streams = contents if isinstance(contents, ArrayObject) else [contents]
+        for stream in streams:
+            yield stream.get_object().get_data()
+
+
+# Page keys that change what the backends read, besides /Contents
+PAGE_KEYS = ("/Resources", "/MediaBox", "/CropBox", "/Rotate")
+# Keys that lead out of an object to the rest of the document
+SKIPPED_KEYS = {"/Parent", "/P"}
+# Bumped when page_digest changes, so manifests written before are recomputed
+DIGEST_VERSION = 2
+
+
+def object_digest(obj, memo, active=frozenset()):
+    """
+    SHA-256 of a PDF object with every reference resolved: dictionaries by
+    sorted key, arrays in order, streams with their decoded data. Image data
+    is left out, it holds no text. memo maps (object, generation) numbers to
+    digests, so objects shared between pages are hashed once.
+    """
+    from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+
+    if isinstance(obj, IndirectObject):
+        key = (obj.idnum, obj.generation)
+        if key in memo:
+            return memo[key]
+        if key in active:
+            return f"cycle {key}"
+        memo[key] = object_digest(obj.get_object(), memo, active | {key})
+        return memo[key]
+
+    digest = hashlib.sha256(type(obj).__name__.encode('utf-8'))
+    if isinstance(obj, DictionaryObject):
+        for name in sorted(obj):
+            if name not in SKIPPED_KEYS:
+                digest.update(f"{name}={object_digest(obj.raw_get(name), memo, active)};".encode('utf-8'))
+        if isinstance(obj, StreamObject) and obj.get("/Subtype") != "/Image":
+            digest.update(obj.get_data())
+    elif isinstance(obj, ArrayObject):
+        for item in obj:
+            digest.update(f"{object_digest(item, memo, active)};".encode('utf-8'))
+    elif isinstance(obj, bytes):
+        digest.update(obj)
+    else:
+        digest.update(str(obj).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def page_digest(page, memo=None):
+    """
+    SHA-256 of everything extract_text depends on: content streams, and the
+    page's resources resolved in full (fonts with their encodings, /Differences
+    and descendant fonts, form XObjects drawn with Do and their own resources)
+    """
+    memo = {} if memo is None else memo
+    digest = hashlib.sha256()
+    for data in content_streams(page):
+        digest.update(data)
+    for key in PAGE_KEYS:
+        if key in page:
+            digest.update(f"{key}={object_digest(page.raw_get(key), memo)};".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class ExtractionCache:
+    """Page text cache keyed by (PDF digest, page index, extraction mode)"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _manifest_path(self, pdf_digest):
+        return os.path.join(self.cache_dir, 'documents', f"{pdf_digest}.json")
+
+    def _page_path(self, digest, extraction_mode):
+        return os.path.join(self.cache_dir, 'pages', digest[:2], f"{digest}.{extraction_mode}.txt")
+
+    def page_digests(self, pdf_path):
+        """Return the per-page digests of a PDF, computing and recording them on first sight"""
+        pdf_digest = file_digest(pdf_path)
+        manifest_path = self._manifest_path(pdf_digest)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('version') == DIGEST_VERSION:
+                return manifest['pages']
+
+        import PyPDF2
+
+        reader = PyPDF2.PdfReader(pdf_path)
+        memo = {}
+        digests = [page_digest(page, memo) for page in reader.pages]
+        write_atomic(manifest_path, json.dumps({"pdf": os.path.basename(pdf_path), "version": DIGEST_VERSION,
+                                                "pages": digests}))
+        return digests
+
+    def has(self, digest, extraction_mode):
+        return os.path.exists(self._page_path(digest, extraction_mode))
+
+    def get(self, digest, extraction_mode):
+        """Return cached page text or None"""
+        try:
+            with open(self._page_path(digest, extraction_mode), 'r', encoding='utf-8', newline='') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, digest, extraction_mode, text):
+        write_atomic(self._page_path(digest, extraction_mode), text)
@@ -0,0 +1,90 @@
+"""
+Cheap per-page table detection, used to pick layout or plain extraction.
+
+Layout extraction is several times slower than plain, and only tables gain
+from it. Each page is scored straight from its decoded content stream,
+without running either extractor:
+    - table rows: rows where text starts at 3 or more column anchors, an
+      anchor being an x position that text starts at on 3 or more rows
+      (positions follow BT/Tm/Td/TD; the transformation matrix is ignored)
+    - rules: thin filled rectangles, which is how cell borders are drawn
+Prose only has the margin and an indent or two to start text at, so it
+scores close to zero; every row of a table counts.
+
+Usage:
+    python layout_detection.py "public/Abx Regime HSM 2017.pdf"
+"""
+import re
+import sys
+from collections import defaultdict
+
+from extraction_cache import content_streams
+
+NUMBER = rb'(-?\d*\.?\d+)'
+TEXT_POSITION = re.compile(rb'((?:-?\d*\.?\d+\s+){0,6})(BT|Tm|Td|TD)\b')
+RECTANGLE = re.compile(rb'(?:-?\d*\.?\d+\s+){2}' + NUMBER + rb'\s+' + NUMBER + rb'\s+re\b')
+
+MIN_ANCHOR_ROWS = 3
+MIN_ROW_COLUMNS = 3
+RULES_PER_POINT = 20
+LAYOUT_THRESHOLD = 8.0
+
+
+def layout_score(data):
+    """Table score of one page's content stream bytes; 0 for plain prose"""
+    anchor_rows = defaultdict(set)
+    starts = []
+    x = y = 0.0
+    for operands, operator in TEXT_POSITION.findall(data):
+        values = [float(v) for v in operands.split()]
+        if operator == b'BT':
+            x = y = 0.0
+            continue
+        if operator == b'Tm' and len(values) == 6:
+            x, y = values[4], values[5]
+        elif operator in (b'Td', b'TD') and len(values) >= 2:
+            x, y = x + values[-2], y + values[-1]
+        else:
+            continue
+        start = (round(x / 2), round(y))
+        anchor_rows[start[0]].add(start[1])
+        starts.append(start)
+
+    anchors = {column for column, ys in anchor_rows.items() if len(ys) >= MIN_ANCHOR_ROWS}
+    row_columns = defaultdict(set)
+    for column, row in starts:
+        if column in anchors:
+            row_columns[row].add(column)
+    table_rows = sum(1 for columns in row_columns.values() if len(columns) >= MIN_ROW_COLUMNS)
+    rules = sum(1 for w, h in RECTANGLE.findall(data) if min(abs(float(w)), abs(float(h))) <= 2)
+    return table_rows + rules / RULES_PER_POINT
+
+
+def page_scores(pdf_path, page_indices=None):
+    """{page_index: layout score} for the given pages (all pages by default)"""
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(pdf_path)
+    if page_indices is None:
+        page_indices = range(len(reader.pages))
+    return {i: layout_score(b''.join(content_streams(reader.pages[i]))) for i in page_indices}
+
+
+def layout_pages(pdf_path, page_indices=None, threshold=LAYOUT_THRESHOLD):
+    """Indices of the pages that should go through layout extraction"""
+    return {i for i, score in page_scores(pdf_path, page_indices).items() if score >= threshold}
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    scores = page_scores(sys.argv[1])
+    for i, score in scores.items():
+        print(f"page {i + 1:4d}  score {score:6.1f}  {'layout' if score >= LAYOUT_THRESHOLD else 'plain'}")
+    chosen = sum(score >= LAYOUT_THRESHOLD for score in scores.values())
+    print(f"✓ {chosen}/{len(scores)} pages need layout extraction")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+OCR correction of drug names by lookup in a deletion index.
+
+Every word of the trusted drug names (formulary, dilution and counseling
+data, see entry_splitter.py) is indexed under each string left after
+deleting up to MAX_DISTANCE of its letters. A damaged word is looked up
+through its own deletions, so only the few words sharing a key with it are
+compared, however large the vocabulary. A candidate is accepted only if the
+damaged word can be read from it with OCR errors: glyphs the scan confuses
+(l/t, c/e, rn/m, ...) and stray punctuation. A different drug or a
+spelling variant (Axitinib/Afatinib, Cyclosporin/Ciclosporin) is not an OCR
+error and is left alone. Words split in two by the OCR ("Abaca vir") are
+joined when the joined word is known.
+
+Usage:
+    python name_correction.py [--data src/frankShannData.json] [--dry-run]
+"""
+import argparse
+import json
+import re
+import time
+from collections import Counter
+
+from entry_splitter import trusted_names
+from ocr_rules import DATA_FILE
+
+MAX_DISTANCE = 2
+# Shorter words are abbreviations or common words; they are never corrected
+MIN_WORD_LENGTH = 5
+VOCABULARY_WORD = re.compile(r'[A-Za-z]{%d,}' % MIN_WORD_LENGTH)
+# Punctuation around a word, kept as it is
+AFFIXES = re.compile(r'^(\W*)(.*?)(\W*)$')
+# Letters the scan reads as one another, as (printed, read) pairs; both directions count
+OCR_CONFUSIONS = {
+    ('t', 'l'), ('i', 'l'), ('f', 'l'), ('l', 'j'), ('i', 'j'), ('e', 'c'), ('e', 'o'), ('a', 'o'),
+    ('e', 'u'), ('n', 'u'), ('b', 'h'), ('t', 'r'), ('g', 'q'),
+}
+OCR_CONFUSIONS |= {(read, printed) for printed, read in OCR_CONFUSIONS}
+
+
+def max_distance(word):
+    """Edits allowed when correcting a word: one for short words, MAX_DISTANCE from eight letters"""
+    return 1 if len(word) < 8 else MAX_DISTANCE
+
+
+def deletions(word, distance):
+    """word with every choice of up to distance characters deleted, word itself included"""
+    variants = layer = {word}
+    # One deletion at a time, by slicing: each layer is the one before with a letter less
+    for _ in range(min(distance, len(word) - 1)):
+        layer = {variant[:i] + variant[i + 1:] for variant in layer for i in range(len(variant))}
+        variants = variants | layer
+    return variants
+
+
+def ocr_distance(read, word, limit):
+    """
+    Number of OCR errors that turn word into read, or limit + 1 if it takes
+    more or needs an edit the scan does not make. An error is a confused
+    letter, a stray character in place of a letter or in addition to them,
+    or rn read for m (and m for rn).
+    """
+    blocked = limit + 1
+    if abs(len(read) - len(word)) > limit:
+        return blocked
+    rows = [[0] * (len(word) + 1) for _ in range(len(read) + 1)]
+    for j in range(1, len(word) + 1):
+        rows[0][j] = blocked
+    for i in range(1, len(read) + 1):
+        char = read[i - 1]
+        rows[i][0] = min(rows[i - 1][0] + 1, blocked) if not char.isalpha() else blocked
+        for j in range(1, len(word) + 1):
+            printed = word[j - 1]
+            if char == printed:
+                best = rows[i - 1][j - 1]
+            elif not char.isalpha() or (printed, char) in OCR_CONFUSIONS:
+                best = rows[i - 1][j - 1] + 1
+            else:
+                best = blocked
+            if not char.isalpha():
+                best = min(best, rows[i - 1][j] + 1)
+            if i > 1 and read[i - 2:i] == 'rn' and printed == 'm':
+                best = min(best, rows[i - 2][j - 1] + 1)
+            if j > 1 and char == 'm' and word[j - 2:j] == 'rn':
+                best = min(best, rows[i - 1][j - 2] + 1)
+            rows[i][j] = min(best, blocked)
+        # rn read for m is only settled a row later, from the row before this one
+        if min(rows[i]) >= blocked and (i < 2 or min(rows[i - 1]) >= blocked):
+            return blocked
+    return rows[-1][-1]
+
+
+def match_case(word, template):
+    """word in the letter case of template"""
+    if template.isupper() and len(template) > 1:
+        return word.upper()
+    if template[:1].isupper():
+        return word.capitalize()
+    return word
+
+
+class NameCorrector:
+    """
+    Deletion index over a vocabulary of lower-case words with their counts.
+    correct_word and correct_name look a word up; results are memoised per
+    token and per lower-case word, so a batch with repeated words costs one
+    dictionary hit per repeat. spellings
+    maps a vocabulary word to the spelling written in its place.
+    """
+
+    def __init__(self, counts, spellings=None):
+        self.counts = dict(counts)
+        self.spellings = dict(spellings or {})
+        self.index = {}
+        for word in self.counts:
+            for key in deletions(word, max_distance(word)):
+                self.index.setdefault(key, []).append(word)
+        self._cache = {}
+        self._found = {}
+
+    @classmethod
+    def from_names(cls, names, spellings=None):
+        return cls(Counter(word.lower() for name in names for word in VOCABULARY_WORD.findall(name)), spellings)
+
+    def lookup(self, word):
+        """The vocabulary word closest to a lower-case word, or None past the edit limit"""
+        if word in self.counts:
+            return word
+        # Tokens differing only in case or punctuation share one lookup
+        if word not in self._found:
+            self._found[word] = self._closest(word)
+        return self._found[word]
+
+    def _closest(self, word):
+        limit = max_distance(word)
+        best = None
+        seen = set()
+        # Only the keys the index has; the set intersection runs in C
+        for key in deletions(word, limit) & self.index.keys():
+            for candidate in self.index[key]:
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                distance = ocr_distance(word, candidate, limit)
+                if distance <= limit:
+                    rank = (distance, -self.counts[candidate], candidate)
+                    if best is None or rank < best:
+                        best = rank
+        return best[2] if best else None
+
+    def correct_word(self, token):
+        """token with its word corrected; punctuation around it and its letter case are kept"""
+        result = self._cache.get(token)
+        if result is None:
+            lead, word, trail = AFFIXES.match(token).groups()
+            result = token
+            if sum(char.isalpha() for char in word) >= MIN_WORD_LENGTH and not any(char.isdigit() for char in word):
+                found = self.lookup(word.lower())
+                found = self.spellings.get(found, found)
+                if found:
+                    result = lead + match_case(found, word) + trail
+            self._cache[token] = result
+        return result
+
+    def _joined(self, first, second):
+        """The known word that first and second make when written together, if only that is known"""
+        first, second = AFFIXES.match(first).group(2), AFFIXES.match(second).group(2)
+        if not (first.isalpha() and second.isalpha()) or first.lower() in self.counts:
+            return None
+        joined = (first + second).lower()
+        return joined if joined in self.counts else None
+
+    def correct_name(self, name):
+        """name with every word corrected and OCR-split words joined"""
+        tokens = name.split(' ')
+        words = []
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if i + 1 < len(tokens) and self._joined(token, tokens[i + 1]):
+                i += 1
+                token += tokens[i]
+            words.append(self.correct_word(token))
+            i += 1
+        return ' '.join(words)
+
+    def correct_words(self, tokens):
+        """Batch form of correct_word"""
+        return [self.correct_word(token) for token in tokens]
+
+    def correct_names(self, names):
+        """Batch form of correct_name"""
+        return [self.correct_name(name) for name in names]
+
+
+# Frank Shann names missing from the trusted data
+EXTRA_NAMES = ('Abatacept', 'Albuterol')
+# Names the trusted data spells one way and Frank Shann another (British
+# approved names), by the trusted spelling
+SPELLINGS = {'acyclovir': 'aciclovir'}
+
+_default = None
+
+
+def default_corrector():
+    """Corrector over the trusted names, built on first use"""
+    global _default
+    if _default is None:
+        _default = NameCorrector.from_names(trusted_names() + list(EXTRA_NAMES), SPELLINGS)
+    return _default
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Correct OCR-damaged Frank Shann drug names")
+    parser.add_argument("--data", default=DATA_FILE)
+    parser.add_argument("--dry-run", action="store_true", help="list the corrections, do not write the data file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    corrector = default_corrector()
+    built = time.perf_counter() - start
+    with open(args.data, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+
+    start = time.perf_counter()
+    names = corrector.correct_names(entry['name'] for entry in records)
+    elapsed = time.perf_counter() - start
+    tokens = sum(len(entry['name'].split(' ')) for entry in records)
+
+    changed = 0
+    for entry, name in zip(records, names):
+        if name != entry['name']:
+            changed += 1
+            if args.dry_run:
+                print(f"  {entry['id']}: {entry['name']} → {name}")
+            entry['name'] = name
+    if changed and not args.dry_run:
+        with open(args.data, 'w', encoding='utf-8') as f:
+            json.dump(records, f, indent=4, ensure_ascii=False)
+    print(f"✓ Index of {len(corrector.counts)} words, {len(corrector.index)} keys built in {built * 1000:.0f} ms")
+    print(f"✓ {tokens} name tokens in {elapsed * 1000:.1f} ms ({tokens / elapsed:,.0f} tokens/s); "
+          f"{changed} names corrected{' (dry run, not saved)' if args.dry_run else ''}")
+
+
+if __name__ == "__main__":
+    main()
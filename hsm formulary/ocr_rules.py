@@ -0,0 +1,491 @@
+"""
+OCR correction rules, with runs of whole-word rules merged into one pass.
+
+This is not one combined pass for every rule. Most rules still take a pass
+of their own; only runs of whole-word rules share one.
+
+The Frank Shann cleaners apply about a hundred re.sub calls one after
+another, rescanning the whole text for every rule. A RuleSet takes the same
+ordered (pattern, replacement[, flags]) list and splits it into stages. A
+run of consecutive whole-word rules (\\bword\\b -> text) that cannot see
+each other's output becomes one stage, matched in one left-to-right pass by
+a single alternation whose named groups dispatch each match to its rule.
+Every other rule is a stage of its own, one re.sub as before, and a scope
+with no merged stage is simply the sequence of re.sub calls.
+
+Only whole-word rules are merged because only for them is sharing a pass
+easy to prove and worth it. A merged stage of two words is already faster
+than two re.sub calls (11 ms against 16 ms on the extracted book). re
+searches a single pattern by its literal prefix; an alternation of unrelated
+patterns loses that and tries every branch at every position. One
+alternation of all the parse_frank_shann rules took 3.0 s on the extracted
+book against 0.9 s for the sequential re.sub calls. "python ocr_rules.py
+bench" gives the measured gain:
+- parse_frank_shann: 86 passes for 109 rules, about 1.1-1.2x
+- v2/v3 sets: 71-72 passes, about 1.2-1.6x
+- fix_frank_data and cleanup_frank_data_v2 dosage sets: about 1.2x
+- the other cleanup scopes: nothing to merge, the same re.sub calls as before
+"python ocr_rules.py plan" writes the stages into the rule file for
+review; "python ocr_rules.py verify" compares the staged and sequential
+results on the extracted book.
+
+Plain string tables such as the one in parse_frank_shann_final.py stay a
+chain of str.replace calls (LiteralReplacer). Each call is one C-level scan,
+and the chain of 65 takes about 26 ms on the extracted book, where a single
+Aho-Corasick pass in Python took 54 ms and one regex alternation 29 ms.
+
+Every parser and cleanup script takes its rules from ocr_rules.json, which
+maps a rule set name to
+    {"description": ..., "kind": "literal" (optional), "strip": true (optional),
+     "rules": [{"stage", "scope", "pattern", "replacement", "flags", "when",
+                "section", "note"}, ...]}
+Only pattern and replacement are required. scope is "text" (the default),
+an entry field such as "name" or "dosage", or a list of fields; flags are re
+flag names; when lists words of which one must be present for the rule to
+run. Literal sets run their rules in file order. A change of stage number
+always starts a new stage, and a rule without one runs on its own.
+strip trims each field after the set has run, as the cleanup scripts did.
+load_rules() reads and compiles the file once per process.
+
+Usage:
+    python ocr_rules.py verify [frank_shann_extracted.txt]
+    python ocr_rules.py bench [frank_shann_extracted.txt]
+    python ocr_rules.py plan [rule set ...]
+"""
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+from functools import lru_cache
+
+# Marker in a rule list: the following rules start a new stage
+STAGE = 'STAGE'
+
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ocr_rules.json')
+DATA_FILE = 'src/frankShannData.json'
+DEFAULT_SCOPE = 'text'
+
+# The cleanup scripts, in the order that turns parse_frank_shann_final output
+# into src/frankShannData.json. fix_frank_data was written for an earlier
+# parser's output and is not part of the chain: on the current data it
+# damages more than it fixes (see cleanup_pipeline.py).
+CLEANUP_SETS = ('cleanup_frank_data', 'cleanup_frank_data_v2', 'cleanup_frank_final')
+
+_WORD_RULE = re.compile(r'\\b(\w+)\\b')
+
+
+class Rule:
+    """One re.sub step, optionally run only when one of the words in when is present"""
+
+    def __init__(self, pattern, replacement, flags=0, when=None):
+        self.pattern = pattern
+        self.replacement = replacement
+        self.flags = flags
+        self.when = tuple(when or ())
+        self.regex = re.compile(pattern, flags)
+        self.literal = '\\' not in replacement
+        # \bword\b -> literal text, the only rules that share a pass
+        word = _WORD_RULE.fullmatch(pattern)
+        self.word = (word.group(1) if word and self.literal and not self.when and
+                     not flags & ~(re.UNICODE | re.IGNORECASE) else None)
+
+    def apply(self, text):
+        if self.when and not any(word in text for word in self.when):
+            return text
+        return self.regex.sub(self.replacement, text)
+
+    def __repr__(self):
+        return f"Rule({self.pattern!r}, {self.replacement!r})"
+
+
+def can_share(first, later):
+    """
+    Whether whole-word rule later, applied after whole-word rule first, can
+    join it in one pass. Both only match a whole word, so they can only
+    meet on the same word; the pass must not let later see a word first
+    rewrites or claims, nor first see a word later claims. A whole word is
+    bounded by non-word characters, so the words later can find in first's
+    replacement are the same with or without the text around it.
+    """
+    return bool(first.word and later.word) and not (
+        later.regex.search(first.word) or first.regex.search(later.word) or
+        later.regex.search(first.replacement))
+
+
+class Stage:
+    """
+    Rules run in one pass as a \\b(?:(?P<r0>word)|(?P<r1>word)|...)\\b
+    alternation; match.lastgroup names the rule that matched. A stage of one
+    rule is that rule's own re.sub.
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.regex = None
+        if len(rules) > 1:
+            branches = '|'.join(f'(?P<r{i}>{"(?i:%s)" % rule.word if rule.flags & re.IGNORECASE else rule.word})'
+                                for i, rule in enumerate(rules))
+            self.regex = re.compile(rf'\b(?:{branches})\b')
+            self.by_group = {f'r{i}': rule for i, rule in enumerate(rules)}
+
+    def _replacement(self, match):
+        return self.by_group[match.lastgroup].replacement
+
+    def apply(self, text):
+        if self.regex is None:
+            return self.rules[0].apply(text)
+        return self.regex.sub(self._replacement, text)
+
+    def iter_replacements(self, text, start=0, stop=None):
+        """
+        Yield the (start, end, replacement) edits apply() makes, scanning
+        from start and stopping before the first match that begins at or
+        after stop. Matches are tried on the whole text, so lookarounds and
+        word boundaries see past both ends.
+        """
+        stop = len(text) + 1 if stop is None else stop
+        rule = self.rules[0]
+        if self.regex is None and rule.when and not any(word in text for word in rule.when):
+            return
+        for match in (self.regex or rule.regex).finditer(text, start):
+            if match.start() >= stop:
+                return
+            if self.regex is not None:
+                replacement = self._replacement(match)
+            else:
+                replacement = rule.replacement if rule.literal else match.expand(rule.replacement)
+            yield match.start(), match.end(), replacement
+
+
+class RuleSet:
+    """
+    Ordered OCR correction rules, applied one pass per stage. rules is a
+    list of (pattern, replacement) or (pattern, replacement, flags) tuples.
+    A whole-word rule joins the stage before it when that stage is all
+    whole-word rules and can_share holds with every one of them; STAGE
+    markers in the list start a new stage as well. A set where no rules
+    share a stage (merged is False) runs as sequential re.sub calls.
+    """
+
+    def __init__(self, rules):
+        self.rules = []
+        self.stage_starts = [0]
+        forced = False
+        for rule in rules:
+            if rule == STAGE:
+                forced = True
+                continue
+            rule = Rule(*rule)
+            stage = self.rules[self.stage_starts[-1]:]
+            if stage and (forced or not all(can_share(earlier, rule) for earlier in stage)):
+                self.stage_starts.append(len(self.rules))
+            self.rules.append(rule)
+            forced = False
+        bounds = self.stage_starts + [len(self.rules)]
+        self.stages = [Stage(self.rules[a:b]) for a, b in zip(bounds, bounds[1:])]
+        # Without a merged stage there is nothing to gain, and the set is the
+        # plain sequence of re.sub calls
+        self.merged = any(stage.regex is not None for stage in self.stages)
+        self._passes = ([stage.apply if stage.regex is not None else stage.rules[0].apply
+                         for stage in self.stages] if self.merged else [rule.apply for rule in self.rules])
+
+    def apply(self, text):
+        for apply in self._passes:
+            text = apply(text)
+        return text
+
+    __call__ = apply
+
+    def apply_sequential(self, text):
+        """Reference semantics: one re.sub per rule, in order"""
+        for rule in self.rules:
+            text = rule.apply(text)
+        return text
+
+
+class LiteralReplacer:
+    """
+    Replace literal strings with str.replace, one table entry after another
+    in table order, so an entry also fixes what the ones before it produced
+    ("rnll" -> "mll" -> "ml"). replacements is a {wrong: correct} dict or an
+    iterable of (wrong, correct) pairs.
+    """
+
+    def __init__(self, replacements):
+        items = replacements.items() if isinstance(replacements, dict) else replacements
+        table = dict(items)
+        self.wrong = list(table)
+        self.correct = list(table.values())
+
+    def apply(self, text):
+        for wrong, correct in zip(self.wrong, self.correct):
+            text = text.replace(wrong, correct)
+        return text
+
+    __call__ = apply
+
+
+def _scopes(rule):
+    scope = rule.get('scope', DEFAULT_SCOPE)
+    return [scope] if isinstance(scope, str) else list(scope)
+
+
+def _flags(names):
+    flags = 0
+    for name in names:
+        flags |= re.RegexFlag[name]
+    return flags
+
+
+def rule_spec(rule):
+    """(pattern, replacement, flags, when) arguments for Rule from a rule file entry"""
+    return rule['pattern'], rule['replacement'], _flags(rule.get('flags', ())), rule.get('when')
+
+
+def _staged_specs(rules):
+    """Rule specs with a STAGE marker wherever the stage number changes or is missing"""
+    specs = []
+    previous = None
+    for rule in rules:
+        stage = rule.get('stage')
+        if specs and (stage is None or stage != previous):
+            specs.append(STAGE)
+        specs.append(rule_spec(rule))
+        previous = stage
+    return specs
+
+
+class ScopedRuleSet:
+    """
+    One named set from the rule file, compiled per scope: a RuleSet, or a
+    LiteralReplacer for "literal" sets.
+    """
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.description = spec.get('description', '')
+        self.literal = spec.get('kind') == 'literal'
+        self.strip = spec.get('strip', False)
+        self.scopes = {}
+        for scope in dict.fromkeys(s for rule in spec['rules'] for s in _scopes(rule)):
+            rules = [rule for rule in spec['rules'] if scope in _scopes(rule)]
+            if self.literal:
+                self.scopes[scope] = LiteralReplacer((rule['pattern'], rule['replacement']) for rule in rules)
+            else:
+                self.scopes[scope] = RuleSet(_staged_specs(rules))
+
+    def apply(self, text, scope=DEFAULT_SCOPE):
+        rules = self.scopes.get(scope)
+        if rules is None:
+            return text
+        text = rules.apply(text)
+        return text.strip() if self.strip else text
+
+    __call__ = apply
+
+    def apply_entry(self, entry):
+        """Clean every field of an entry that the set has rules for, in place. True if any changed"""
+        changed = False
+        for scope in self.scopes:
+            if scope in entry:
+                value = self.apply(entry[scope], scope)
+                changed |= value != entry[scope]
+                entry[scope] = value
+        return changed
+
+
+class RuleBook:
+    """The rule sets of a rule file; each is compiled the first time it is used"""
+
+    def __init__(self, path=RULES_FILE):
+        self.path = path
+        with open(path, 'r', encoding='utf-8') as f:
+            self.spec = json.load(f)
+        self._compiled = {}
+
+    def __getitem__(self, name):
+        if name not in self._compiled:
+            self._compiled[name] = ScopedRuleSet(name, self.spec[name])
+        return self._compiled[name]
+
+    def __iter__(self):
+        return iter(self.spec)
+
+    def apply_entry(self, entry, names=CLEANUP_SETS):
+        """Run several rule sets over one entry, in order. True if any field changed"""
+        changed = False
+        for name in names:
+            changed |= self[name].apply_entry(entry)
+        return changed
+
+    def clean_entries(self, entries, names=CLEANUP_SETS):
+        """
+        One sweep over the entries running all the given sets on each, in
+        place of one load-clean-save round per cleanup script. Entries are
+        independent, so this matches running the scripts one after another.
+        Returns the number of entries changed.
+        """
+        return sum(self.apply_entry(entry, names) for entry in entries)
+
+
+@lru_cache(maxsize=None)
+def load_rules(path=RULES_FILE):
+    return RuleBook(path)
+
+
+def rule_set(name, path=RULES_FILE):
+    """A compiled rule set by name, from the rule file loaded once per process"""
+    return load_rules(path)[name]
+
+
+def save_rules(spec, path=RULES_FILE):
+    """Write a rule file with one rule per line, so diffs stay readable"""
+    lines = ['{']
+    for n, (name, rule_set_spec) in enumerate(spec.items()):
+        lines.append(f'  {json.dumps(name)}: {{')
+        for key, value in rule_set_spec.items():
+            if key != 'rules':
+                lines.append(f'    {json.dumps(key)}: {json.dumps(value, ensure_ascii=False)},')
+        lines.append('    "rules": [')
+        rules = rule_set_spec['rules']
+        for i, rule in enumerate(rules):
+            comma = ',' if i < len(rules) - 1 else ''
+            lines.append(f'      {json.dumps(rule, ensure_ascii=False)}{comma}')
+        lines.append('    ]')
+        lines.append('  }' + (',' if n < len(spec) - 1 else ''))
+    lines.append('}')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def plan_stages(rules):
+    """The rule list with a STAGE marker wherever RuleSet starts a new stage"""
+    rules = [rule for rule in rules if rule != STAGE]
+    starts = set(RuleSet(rules).stage_starts[1:])
+    planned = []
+    for i, spec in enumerate(rules):
+        if i in starts:
+            planned.append(STAGE)
+        planned.append(spec)
+    return planned
+
+
+def sample_texts(path='frank_shann_extracted.txt'):
+    """The extracted book as cleaned whole (v2/v3) and with lines joined by spaces, as entries are"""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = unicodedata.normalize('NFKD', f.read()).encode('ascii', 'ignore').decode('ascii')
+    return [text, text.replace('\n', ' ')]
+
+
+def field_values(scope, data_path=DATA_FILE):
+    """Every value of one entry field in the parsed data"""
+    with open(data_path, 'r', encoding='utf-8') as f:
+        return [entry[scope] for entry in json.load(f) if scope in entry]
+
+
+def _samples(scope, path):
+    if scope == DEFAULT_SCOPE:
+        return sample_texts(path)
+    return field_values(scope) + sample_texts(path)
+
+
+def plan_rule_set(spec):
+    """
+    Renumber the stages of a rule file set in place from plan_stages, run
+    separately for each scope; a rule shared by several scopes starts a new
+    stage wherever any of them needs one. No sample text is involved, so the
+    stages hold for any input.
+    """
+    rules = spec['rules']
+    starts = set()
+    for scope in dict.fromkeys(s for rule in rules for s in _scopes(rule)):
+        indices = [i for i, rule in enumerate(rules) if scope in _scopes(rule)]
+        planned = plan_stages([rule_spec(rules[i]) for i in indices])
+        position = 0
+        for item in planned:
+            if item == STAGE:
+                starts.add(indices[position])
+            else:
+                position += 1
+
+    stage = 0
+    previous = None
+    for i, rule in enumerate(rules):
+        if i in starts or _scopes(rule) != previous:
+            stage += 1
+        previous = _scopes(rule)
+        rules[i] = {'stage': stage, **{key: value for key, value in rule.items() if key != 'stage'}}
+    return spec
+
+
+def verify(path='frank_shann_extracted.txt'):
+    book = load_rules()
+    ok = True
+    for name in book:
+        rules = book[name]
+        if rules.literal:
+            continue
+        same = all(compiled.apply(text) == compiled.apply_sequential(text)
+                   for scope, compiled in rules.scopes.items()
+                   for text in _samples(scope, path))
+        ok &= same
+        stages = sum(len(compiled.stages) for compiled in rules.scopes.values())
+        print(f"{'✓' if same else '✗'} {name}: {len(book.spec[name]['rules'])} rules in {stages} stages")
+    return ok
+
+
+def _time(apply, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            apply(text)
+    return (time.perf_counter() - start) / repeat
+
+
+def bench(path='frank_shann_extracted.txt', repeat=3):
+    """Time every rule set on the text it cleans: the book, or each field of every entry"""
+    book = load_rules()
+    for name in book:
+        rules = book[name]
+        for scope, compiled in rules.scopes.items():
+            texts = sample_texts(path)[:1] if scope == DEFAULT_SCOPE else field_values(scope)
+            label = f"{name} [{scope}]"
+            combined = _time(compiled.apply, texts, repeat)
+            if rules.literal:
+                print(f"{label:40s} {len(compiled.wrong):4d} literals            "
+                      f"sequential {combined * 1000:7.1f} ms")
+                continue
+            if not compiled.merged:
+                print(f"{label:40s} {len(compiled.rules):4d} rules, nothing to merge  "
+                      f"sequential {combined * 1000:7.1f} ms")
+                continue
+            sequential = _time(compiled.apply_sequential, texts, repeat)
+            print(f"{label:40s} {len(compiled.rules):4d} rules {len(compiled.stages):3d} stages  "
+                  f"sequential {sequential * 1000:7.1f} ms  combined {combined * 1000:7.1f} ms  "
+                  f"({sequential / combined:.1f}x)")
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ('verify', 'bench', 'plan'):
+        print(__doc__)
+        sys.exit(1)
+    command = sys.argv[1]
+    if command == 'plan':
+        with open(RULES_FILE, 'r', encoding='utf-8') as f:
+            spec = json.load(f)
+        for name in sys.argv[2:] or [name for name in spec if spec[name].get('kind') != 'literal']:
+            plan_rule_set(spec[name])
+            stages = {rule['stage'] for rule in spec[name]['rules']}
+            print(f"✓ {name}: {len(spec[name]['rules'])} rules in {len(stages)} stages")
+        save_rules(spec)
+    elif command == 'verify':
+        if not verify(*sys.argv[2:3]):
+            sys.exit(1)
+    else:
+        bench(*sys.argv[2:3])
+
+
+if __name__ == "__main__":
+    main()
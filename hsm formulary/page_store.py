@@ -0,0 +1,264 @@
+"""
+Memory-mapped page store for extracted PDF corpora.
+
+A store is two files:
+    <name>.pages      UTF-8 page texts, each terminated by a newline
+    <name>.pages.idx  header plus page and line offset arrays
+
+The blob is memory-mapped, so a page or line range is a zero-copy memoryview
+slice and a page is reached through the index without scanning the corpus.
+
+A compressed store is a single <name>.pagez file: a header, one zlib frame
+per page, then the frame index. Only the frames of the pages asked for are
+decompressed, which suits archiving the large raw extraction outputs.
+
+Usage:
+    python page_store.py build abx_extracted.txt abx_extracted.pages
+    python page_store.py pack paediatric_pdf_content.txt paediatric.pagez
+    python page_store.py show abx_extracted.pages 3
+"""
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left
+
+MAGIC = b'PGSTORE1'
+HEADER = struct.Struct('<8sQQ')  # magic, page count, line count
+
+PAGEZ_MAGIC = b'PAGEZ001'
+PAGEZ_HEADER = struct.Struct('<8sQQ')  # magic, page count, index offset
+
+
+def build_page_store(pages, path):
+    """
+    Write (page_no, text) tuples to a page store, streaming page by page.
+    Returns the number of pages written.
+    """
+    page_nos = array('Q')
+    page_offsets = array('Q', [0])
+    page_first_line = array('Q', [0])
+    line_offsets = array('Q', [0])
+
+    offset = 0
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as blob:
+        for page_no, text in pages:
+            data = text.encode('utf-8') + b'\n'
+            blob.write(data)
+            start = offset
+            pos = data.find(b'\n')
+            while pos != -1:
+                line_offsets.append(start + pos + 1)
+                pos = data.find(b'\n', pos + 1)
+            offset += len(data)
+            page_nos.append(page_no)
+            page_offsets.append(offset)
+            page_first_line.append(len(line_offsets) - 1)
+
+    tmp_idx_path = f"{path}.idx.{os.getpid()}.tmp"
+    with open(tmp_idx_path, 'wb') as idx:
+        idx.write(HEADER.pack(MAGIC, len(page_nos), len(line_offsets) - 1))
+        for arr in (page_nos, page_offsets, page_first_line, line_offsets):
+            arr.tofile(idx)
+    # Both files are complete before either is replaced; the index goes last,
+    # so a store is never left with an index that points past its blob
+    os.replace(tmp_path, path)
+    os.replace(tmp_idx_path, f"{path}.idx")
+    return len(page_nos)
+
+
+class PageStore:
+    """Read-only view over a page store; iterating yields (page_no, text) tuples"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(f"{path}.idx", 'rb') as idx:
+            magic, n_pages, n_lines = HEADER.unpack(idx.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path}.idx is not a page store index")
+            self.page_nos = self._read_array(idx, n_pages)
+            self.page_offsets = self._read_array(idx, n_pages + 1)
+            self.page_first_line = self._read_array(idx, n_pages + 1)
+            self.line_offsets = self._read_array(idx, n_lines + 1)
+
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size != self.page_offsets[-1]:
+            self._file.close()
+            raise ValueError(f"{path}.idx does not match {path}; rebuild the store")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._view = memoryview(self._mmap) if self._mmap else memoryview(b'')
+
+    @staticmethod
+    def _read_array(f, count):
+        arr = array('Q')
+        arr.fromfile(f, count)
+        return arr
+
+    def __len__(self):
+        return len(self.page_nos)
+
+    @property
+    def line_count(self):
+        return len(self.line_offsets) - 1
+
+    def page_index(self, page_no):
+        """Position of a page number in the store"""
+        i = bisect_left(self.page_nos, page_no)
+        if i == len(self.page_nos) or self.page_nos[i] != page_no:
+            # Page numbers are normally ascending; fall back to a scan otherwise
+            try:
+                return self.page_nos.index(page_no)
+            except ValueError:
+                raise KeyError(page_no) from None
+        return i
+
+    def page_bytes(self, page_no):
+        """Zero-copy memoryview of one page's UTF-8 text"""
+        i = self.page_index(page_no)
+        return self._view[self.page_offsets[i]:self.page_offsets[i + 1] - 1]
+
+    def page(self, page_no):
+        return str(self.page_bytes(page_no), 'utf-8')
+
+    def page_line_range(self, page_no):
+        """Global (start, stop) line numbers of a page"""
+        i = self.page_index(page_no)
+        return self.page_first_line[i], self.page_first_line[i + 1]
+
+    def lines_bytes(self, start, stop):
+        """Zero-copy memoryview of lines [start, stop) joined by newlines"""
+        if start >= stop:
+            return self._view[0:0]
+        return self._view[self.line_offsets[start]:self.line_offsets[stop] - 1]
+
+    def line(self, n):
+        return str(self.lines_bytes(n, n + 1), 'utf-8')
+
+    def iter_lines(self, start=0, stop=None):
+        """Yield decoded lines in [start, stop)"""
+        stop = self.line_count if stop is None else stop
+        offsets, view = self.line_offsets, self._view
+        for n in range(start, stop):
+            yield str(view[offsets[n]:offsets[n + 1] - 1], 'utf-8')
+
+    def __iter__(self):
+        for i, page_no in enumerate(self.page_nos):
+            yield page_no, str(self._view[self.page_offsets[i]:self.page_offsets[i + 1] - 1], 'utf-8')
+
+    def close(self):
+        """Release the mapping; memoryviews handed out must be released first"""
+        self._view.release()
+        if self._mmap:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def build_compressed_store(pages, path, level=6):
+    """
+    Write (page_no, text) tuples to a .pagez file, one zlib frame per page.
+    Returns the number of pages written.
+    """
+    page_nos = array('Q')
+    frame_offsets = array('Q', [PAGEZ_HEADER.size])
+    text_sizes = array('Q')
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(PAGEZ_HEADER.pack(PAGEZ_MAGIC, 0, 0))
+        for page_no, text in pages:
+            data = text.encode('utf-8')
+            frame = zlib.compress(data, level)
+            f.write(frame)
+            page_nos.append(page_no)
+            frame_offsets.append(frame_offsets[-1] + len(frame))
+            text_sizes.append(len(data))
+
+        for arr in (page_nos, frame_offsets, text_sizes):
+            arr.tofile(f)
+        f.seek(0)
+        f.write(PAGEZ_HEADER.pack(PAGEZ_MAGIC, len(page_nos), frame_offsets[-1]))
+    os.replace(tmp_path, path)
+    return len(page_nos)
+
+
+class CompressedPageStore:
+    """Read-only view over a .pagez file; iterating yields (page_no, text) tuples"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        magic, n_pages, index_offset = PAGEZ_HEADER.unpack(self._file.read(PAGEZ_HEADER.size))
+        if magic != PAGEZ_MAGIC:
+            self._file.close()
+            raise ValueError(f"{path} is not a compressed page store")
+        self._file.seek(index_offset)
+        self.page_nos = PageStore._read_array(self._file, n_pages)
+        self.frame_offsets = PageStore._read_array(self._file, n_pages + 1)
+        self.text_sizes = PageStore._read_array(self._file, n_pages)
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self.page_nos)
+
+    page_index = PageStore.page_index
+
+    def _frame(self, i):
+        return zlib.decompress(self._mmap[self.frame_offsets[i]:self.frame_offsets[i + 1]])
+
+    def page_bytes(self, page_no):
+        """Decompressed UTF-8 text of one page"""
+        return self._frame(self.page_index(page_no))
+
+    def page(self, page_no):
+        return str(self.page_bytes(page_no), 'utf-8')
+
+    def __iter__(self):
+        for i, page_no in enumerate(self.page_nos):
+            yield page_no, str(self._frame(i), 'utf-8')
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_store(path):
+    """Open a .pagez or .pages store by file extension"""
+    return CompressedPageStore(path) if path.endswith('.pagez') else PageStore(path)
+
+
+def main():
+    from pdf_extraction import open_pages
+
+    if len(sys.argv) >= 4 and sys.argv[1] == 'build':
+        count = build_page_store(open_pages(sys.argv[2]), sys.argv[3])
+        print(f"✓ Stored {count} pages in {sys.argv[3]}")
+    elif len(sys.argv) >= 4 and sys.argv[1] == 'pack':
+        count = build_compressed_store(open_pages(sys.argv[2]), sys.argv[3])
+        print(f"✓ Packed {count} pages into {sys.argv[3]} "
+              f"({os.path.getsize(sys.argv[3]) / 1024:.0f} KB)")
+    elif len(sys.argv) >= 4 and sys.argv[1] == 'show':
+        with open_store(sys.argv[2]) as store:
+            print(store.page(int(sys.argv[3])))
+    else:
+        print(__doc__)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Multi-core OCR cleaning of whole-book text.
+
+parse_frank_shann_v2/v3 clean the full extracted book as one string. Here
+the book is cut at page markers into one chunk per worker, and each worker
+runs every stage of the rule set over its chunk in a single round trip, so
+the text crosses to the workers once. A chunk is sent with a page of
+context on either side, which lookarounds, word boundaries and matches
+running over the cut see as they would in the whole text; the worker keeps
+track of where the cuts end up and the parent joins the cleaned chunks
+there; an edit over a cut goes to the chunk before it.
+
+Both chunks beside a cut clean the text around it, each with the other's
+context cut short. The parent compares the two readings before joining, and
+if they differ anywhere near the cut the whole text is cleaned serially
+instead.
+
+Usage:
+    python parallel_clean.py [rule set] [frank_shann_extracted.txt] [--workers N]
+"""
+import argparse
+import os
+import re
+import time
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+
+from ocr_rules import DEFAULT_SCOPE, rule_set, sample_texts
+
+PAGE_BOUNDARY = re.compile(r'^=== PAGE \d+ ===', re.MULTILINE)
+
+# Pages of context sent with a chunk on each side
+CONTEXT_PAGES = 1
+
+_rules = None
+
+
+def _init_worker(name, scope):
+    """Compile the rule set once per worker process"""
+    global _rules
+    _rules = rule_set(name).scopes[scope]
+
+
+def _clean_chunk(text, cuts):
+    """
+    Run every stage over a chunk with its context. Returns the cleaned text
+    and where each cut offset ended up; an edit over a cut moves the cut to
+    its end, so the edit goes to the chunk before the cut.
+    """
+    cuts = list(cuts)
+    for stage in _rules.stages:
+        edits = list(stage.iter_replacements(text))
+        for i, cut in enumerate(cuts):
+            shift = 0
+            for start, end, replacement in edits:
+                if start >= cut:
+                    break
+                cut = max(cut, end)
+                shift += len(replacement) - (end - start)
+            cuts[i] = cut + shift
+        pieces = []
+        cursor = 0
+        for start, end, replacement in edits:
+            pieces.append(text[cursor:start])
+            pieces.append(replacement)
+            cursor = end
+        pieces.append(text[cursor:])
+        text = ''.join(pieces)
+    return text, cuts
+
+
+def page_starts(text, boundary=PAGE_BOUNDARY):
+    """Offsets of the page markers (or of the line starts if there are none)"""
+    marks = [m.start() for m in boundary.finditer(text)]
+    return marks or [m.end() for m in re.finditer('\n', text)]
+
+
+def chunk_starts(text, chunks, boundary=PAGE_BOUNDARY):
+    """Start offsets of about equal chunks, cut at page markers (or line starts if there are none)"""
+    marks = page_starts(text, boundary)
+    starts = [0]
+    for k in range(1, chunks):
+        i = bisect_left(marks, k * len(text) // chunks)
+        if i < len(marks) and starts[-1] < marks[i] < len(text):
+            starts.append(marks[i])
+    return starts
+
+
+def _with_context(text, pages, lo, hi):
+    """(start, end) of the chunk lo:hi widened by CONTEXT_PAGES pages each way"""
+    i = bisect_left(pages, lo)
+    j = bisect_right(pages, hi) + CONTEXT_PAGES - 1
+    return (pages[i - CONTEXT_PAGES] if i >= CONTEXT_PAGES else 0), (pages[j] if j < len(pages) else len(text))
+
+
+def _cuts_agree(results):
+    """Whether the chunks on both sides of every cut read the text around it alike"""
+    for (left, (_, left_cut)), (right, (right_cut, _)) in zip(results, results[1:]):
+        width = min(left_cut, len(left) - left_cut, right_cut, len(right) - right_cut) // 2
+        if left[left_cut - width:left_cut + width] != right[right_cut - width:right_cut + width]:
+            return False
+    return True
+
+
+def clean_parallel(name, text, workers=None, scope=DEFAULT_SCOPE):
+    """
+    Apply a rule set from ocr_rules.json to one long text across worker
+    processes. Same result as rule_set(name).apply(text, scope).
+    """
+    workers = workers or os.cpu_count() or 1
+    rules = rule_set(name)
+    compiled = rules.scopes.get(scope)
+    # when conditions look at the whole text, which a chunk does not have
+    if workers == 1 or compiled is None or rules.literal or any(rule.when for rule in compiled.rules):
+        return rules.apply(text, scope)
+
+    pages = page_starts(text)
+    bounds = chunk_starts(text, workers) + [len(text)]
+    chunks, cuts = [], []
+    for lo, hi in zip(bounds, bounds[1:]):
+        start, end = _with_context(text, pages, lo, hi)
+        chunks.append(text[start:end])
+        cuts.append((lo - start, hi - start))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(name, scope)) as pool:
+        results = list(pool.map(_clean_chunk, chunks, cuts))
+
+    if not _cuts_agree(results):
+        return rules.apply(text, scope)
+    text = ''.join(cleaned[lo:hi] for cleaned, (lo, hi) in results)
+    return text.strip() if rules.strip else text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean a whole text with a rule set across cores")
+    parser.add_argument("name", nargs="?", default="parse_frank_shann_v3")
+    parser.add_argument("path", nargs="?", default="frank_shann_extracted.txt")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    text = sample_texts(args.path)[0]
+    start = time.perf_counter()
+    expected = rule_set(args.name).apply(text)
+    serial = time.perf_counter() - start
+    start = time.perf_counter()
+    result = clean_parallel(args.name, text, args.workers)
+    parallel = time.perf_counter() - start
+    print(f"{args.name}: serial {serial * 1000:.1f} ms, "
+          f"{args.workers or os.cpu_count()} workers {parallel * 1000:.1f} ms")
+    print(f"{'✓' if result == expected else '✗'} output {'identical' if result == expected else 'differs'}")
+
+
+if __name__ == "__main__":
+    main()
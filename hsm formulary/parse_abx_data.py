@@ -1,25 +1,245 @@
+import argparse
 import json
 import re
 
-def parse_abx_data(filename='abx_extracted.txt'):
-    """Parse ABX regime extracted text into structured JSON"""
-    
-    with open(filename, 'r', encoding='utf-8') as f:
-        text = f.read()
+from pdf_extraction import open_pages
+
+ABX_PDF = 'public/Abx Regime HSM 2017.pdf'
+
+# Line classes, each tested once on every stripped line of a page
+LINE_CLASSES = {
+    # Drug names start with IV/Oral or Penicillin; header lines are not drugs
+    'drug': lambda line: (line.startswith(('IV', 'Oral', 'Penicillin'))
+                          and 'Antibiotic' not in line and 'Usual' not in line and '===' not in line),
+    'dose': lambda line: ('mg' in line or 'MU' in line or 'unit' in line) and not line.startswith(('CrCl', 'Source')),
+    'renal': lambda line: 'CrCl' in line or 'GFR' in line or 'ml/min' in line,
+}
+
+class LineIndex:
+    """
+    The stripped lines of a page, tagged with their classes in one pass per
+    class. For every class it keeps the tagged line numbers, the next one at
+    or after each line and a running count, so the next dose line or the
+    renal lines in a window are lookups rather than rescans of the lines
+    ahead.
+    """
+
+    def __init__(self, lines, classes=LINE_CLASSES):
+        self.lines = [line.strip() for line in lines]
+        n = len(self.lines)
+        self.positions = {}
+        self.next = {}
+        self.counts = {}
+        for name, test in classes.items():
+            positions = [i for i, line in enumerate(self.lines) if test(line)]
+            following = []
+            counts = []
+            previous = 0
+            for count, i in enumerate(positions):
+                following.extend([i] * (i + 1 - previous))
+                counts.extend([count] * (i + 1 - previous))
+                previous = i + 1
+            following.extend([n] * (n + 1 - previous))
+            counts.extend([len(positions)] * (n + 1 - previous))
+            self.positions[name] = positions
+            self.next[name] = following
+            self.counts[name] = counts
+
+    def next_line(self, name, start, stop):
+        """First line number of a class in [start, stop), or None"""
+        start, stop = min(start, len(self.lines)), min(stop, len(self.lines))
+        i = self.next[name][start]
+        return i if i < stop else None
+
+    def lines_between(self, name, start, stop):
+        """Lines of a class in [start, stop), in order"""
+        counts = self.counts[name]
+        start, stop = min(start, len(self.lines)), min(stop, len(self.lines))
+        return [self.lines[i] for i in self.positions[name][counts[start]:counts[stop]]]
+
+# Renal dosing read from the positioned text of the guideline's tables. NumPy
+# (through table_extraction) and PyPDF2 are imported only where it is read, so
+# parsing the extracted text needs neither
+ROUTES = ('IV', 'Oral', 'IV/Oral')
+DRUG_START = re.compile(r'^(?:IV|Oral|Penicillin)\b')
+# Full-width text after the drug table (formula, lists, TB tables)
+TABLE_END = re.compile(r'^(?:Cockcroft|List of|Table \d|Dosage Adjustment for|Fixed Dose)')
+NOTE = re.compile(r'^(?:\*|\(?\s*Source|Usual dose in HD)')
+RANGE_LINE = re.compile(r'^(?:(?:CrCl|GFR)\s*:?\s*)?(?P<crcl>(?:[<>≤≥]\s*)?\d[^:]*|HD|CAPD)\s*:\s*(?P<adjustment>.+)$')
+NO_ADJUSTMENT = re.compile(r'^-?\s*No (?:dosage |dose )?adjustment', re.IGNORECASE)
+SUPERSCRIPTS = {'st', 'nd', 'rd', 'th'}
+# A letter set as a run of its own, read apart from the rest of its word
+# ("N ot recommended", "Patien t"); a, q and x stand alone in doses
+SPLIT_LETTER = re.compile(r'\b([B-HJ-Z]) (?=[a-z]{2})|(?<=[a-z]{2}) ([b-pr-wyz])(?!\w)')
+
+def _tidy(text):
+    """Collapse spaces, close up ranges like "10 -50", rejoin split words and drop registered marks"""
+    text = re.sub(r'\s*®\s*', ' ', text)
+    text = SPLIT_LETTER.sub(lambda m: m.group(1) or m.group(2), ' '.join(text.split()))
+    text = re.sub(r'(?<=[\w%])\s*-\s*(?=\d)', '-', text)
+    text = re.sub(r'\(\s+', '(', re.sub(r'\s+\)', ')', text))
+    return ' '.join(text.split()).strip(' :')
+
+def _crcl(text):
+    text = re.sub(r'\(?ml/min\)?', '', text)
+    return re.sub(r'([<>≤≥])\s+', r'\1', _tidy(text))
+
+def table_dosing(header, rows):
+    """
+    Records of a CrCl table: the first column is the CrCl range, the others
+    the adjustment. A row whose first cell is empty, or opens with "(" or a
+    lower-case word, continues the record above. When there are more
+    columns than header cells, the columns are alternatives under one
+    heading and are joined with " / ".
+    """
+    from table_extraction import assign_columns
+
+    table, count = assign_columns(rows)
+    joiner = ' / ' if count > len(header) else ' '
+    records = []
+    for columns in table:
+        first = columns.get(0, '')
+        if first and not first.startswith('(') and not first[0].islower():
+            records.append([columns.get(k, '') for k in range(count)])
+        elif records:
+            for k, text in columns.items():
+                records[-1][k] = f"{records[-1][k]} {text}".strip()
+    return [{"crcl": _crcl(record[0]), "adjustment": _tidy(joiner.join(text for text in record[1:] if text))}
+            for record in records if any(record[1:])]
+
+def renal_dosing(rows):
+    """renalDosing records from the rows of cells in one drug's renal column"""
+    records = []
+    table = None
+    # Lower-case lines continue the record above, unless a skipped line came between
+    continues = False
+    for cells in rows + [None]:
+        text = ' '.join(cell[2] for cell in cells) if cells else ''
+        if table is not None and (cells is None or NOTE.match(text)):
+            records.extend(table_dosing(table[0], table[1]))
+            table = None
+        if cells is None or text in SUPERSCRIPTS:
+            continue
+        if NOTE.match(text):
+            continues = False
+        elif table is not None:
+            table[1].append(cells)
+        elif text.startswith('CrCl') and not re.search(r'\d', text):
+            table = (cells, [])
+        else:
+            # A note may share the row
+            text = _tidy(re.sub(r'(?:^|\s)\*.*$', '', text))
+            match = RANGE_LINE.match(text)
+            if match:
+                records.append({"crcl": _crcl(match.group('crcl')), "adjustment": _tidy(match.group('adjustment'))})
+            elif NO_ADJUSTMENT.match(text) and not records:
+                records.append({"crcl": "All", "adjustment": text.lstrip('- ')})
+            elif not (continues and text[:1].islower()):
+                continues = False
+                continue
+            else:
+                records[-1]["adjustment"] += ' ' + text
+            continues = True
+    return records
+
+def page_drugs(page):
+    """
+    Drugs in the dosage table of one guideline page, as {"name", "route",
+    "usualDose", "renalDosing"}. The page columns are split halfway between
+    the header cells; a drug runs from its name down to the next one, and a
+    route label alone in its renal column (Oral, IV) starts a section of its
+    own.
+    """
+    from table_extraction import group_rows, page_runs, row_cells
+
+    rows = group_rows(page_runs(page))
+    header = next((i for i, row in enumerate(rows) if any(run[3].strip().startswith('Usual') for run in row)), None)
+    if header is None or len(rows[header]) < 3:
+        return []
+    starts = [run[0] for run in rows[header]]
+    name_end, usual_end = (starts[0] + starts[1]) / 2, (starts[1] + starts[2]) / 2
+
+    drugs = []
+    for row in rows[header + 1:]:
+        name = _tidy(' '.join(run[3] for run in row if run[0] < name_end))
+        usual = _tidy(' '.join(run[3] for run in row if name_end <= run[0] < usual_end))
+        renal = row_cells([run for run in row if run[0] >= usual_end])
+        renal_text = ' '.join(cell[2] for cell in renal)
+        if TABLE_END.match(name or ' '.join(run[3] for run in row).strip()):
+            break
+        label = renal_text.rstrip(':') if renal_text.rstrip(':') in ROUTES else None
+        if DRUG_START.match(name) or (name and label):
+            drugs.append({"name": [], "sections": []})
+        if not drugs:
+            continue
+        drug = drugs[-1]
+        if name:
+            drug["name"].append(name)
+        if label or not drug["sections"]:
+            drug["sections"].append({"route": label, "usual": [], "renal": []})
+            if label:
+                continue
+        if usual:
+            drug["sections"][-1]["usual"].append(usual)
+        if renal:
+            drug["sections"][-1]["renal"].append(renal)
+
+    results = []
+    for drug in drugs:
+        name = _tidy(' '.join(drug["name"]))
+        route, _, rest = name.partition(' ')
+        if route in ROUTES:
+            name = rest
+        else:
+            route = ''
+        for section in drug["sections"]:
+            usual = _tidy(' '.join(section["usual"]))
+            if section["route"]:
+                usual = re.sub(r'^(?:IV|Oral):?\s*', '', usual)
+            results.append({"name": name, "route": section["route"] or route, "usualDose": usual,
+                            "renalDosing": renal_dosing(section["renal"])})
+    return results
+
+def extract_renal_tables(pdf_path=ABX_PDF):
+    """Every drug with renal dosing read from the guideline's tables, in page order"""
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(pdf_path)
+    return [drug for page in reader.pages for drug in page_drugs(page) if drug["renalDosing"]]
+
+def apply_renal_tables(abx_data, drugs):
+    """
+    Replace the renalDosing of each entry with the one extracted for its
+    drug: same route (or none given) and its first match keyword in the
+    name, the entry and drug sharing the most name words being paired
+    first. Returns the extracted drugs left unpaired.
+    """
+    def words(text):
+        return set(re.findall(r'[a-z]+', text.lower()))
+
+    pairs = sorted((-len(words(entry["name"]) & words(drug["name"])), e, d)
+                   for e, entry in enumerate(abx_data) for d, drug in enumerate(drugs)
+                   if entry["matchKeywords"][0] in drug["name"].lower() and drug["route"] in ('', entry["route"]))
+    paired_entries, paired_drugs = set(), set()
+    for _, e, d in pairs:
+        if e not in paired_entries and d not in paired_drugs:
+            abx_data[e]["renalDosing"] = drugs[d]["renalDosing"]
+            paired_entries.add(e)
+            paired_drugs.add(d)
+    return [drug for d, drug in enumerate(drugs) if d not in paired_drugs]
+
+def parse_abx_data(filename='abx_extracted.txt', tables=None):
+    """Parse ABX regime extracted text (or the PDF itself, or a page iterator) into structured JSON"""
     
     antibiotics = []
     antifungals = []
     antivirals = []
     
-    # Split by pages
-    pages = text.split('=== PAGE')
-    
     current_drug = None
     current_category = 'antibiotic'
     
-    for page in pages[1:]:  # Skip first empty split
+    for page_num, page in open_pages(filename):
         lines = page.split('\n')
-        page_num = lines[0].strip().replace('===', '').strip()
         
         # Determine category based on page title
         if 'Antifungal' in ''.join(lines[:10]):
@@ -28,50 +248,33 @@ def parse_abx_data(filename='abx_extracted.txt'):
             current_category = 'antiviral'
         
         # Simple extraction: look for drug name patterns
-        for i, line in enumerate(lines):
-            line = line.strip()
-            
-            # Skip headers and empty lines
-            if not line or 'Antibiotic' in line or 'Usual' in line or '===' in line:
-                continue
-            
-            # Detect drug names (starts with IV/Oral or capitalized word)
-            if re.match(r'^(IV|Oral|Penicillin)', line):
-                # Extract drug name
-                drug_name = line
-                
-                # Try to get usual dose from next few lines
-                usual_dose = ""
-                dosage_info = []
-                
-                for j in range(i+1, min(i+20, len(lines))):
-                    next_line = lines[j].strip()
-                    if next_line and not next_line.startswith('CrCl') and not next_line.startswith('Source'):
-                        if 'mg' in next_line or 'MU' in next_line or 'unit' in next_line:
-                            usual_dose = next_line
-                            break
-                
-                # Get dosing adjustments
-                for j in range(i+1, min(i+30, len(lines))):
-                    next_line = lines[j].strip()
-                    if 'CrCl' in next_line or 'GFR' in next_line or 'ml/min' in next_line:
-                        dosage_info.append(next_line)
+        index = LineIndex(lines)
+        for i in index.positions['drug']:
+            # Extract drug name
+            drug_name = index.lines[i]
+
+            # Try to get usual dose from next few lines
+            dose_line = index.next_line('dose', i + 1, i + 20)
+            usual_dose = index.lines[dose_line] if dose_line is not None else ""
+
+            # Get dosing adjustments
+            dosage_info = index.lines_between('renal', i + 1, i + 30)
+
+            if drug_name and usual_dose:
+                drug_entry = {
+                    "name": drug_name,
+                    "usualDose": usual_dose,
+                    "renalDosing": ' '.join(dosage_info[:5]) if dosage_info else "See reference for details",
+                    "category": current_category
+                }
                 
-                if drug_name and usual_dose:
-                    drug_entry = {
-                        "name": drug_name,
-                        "usualDose": usual_dose,
-                        "renalDosing": ' '.join(dosage_info[:5]) if dosage_info else "See reference for details",
-                        "category": current_category
-                    }
-                    
-                    if current_category == 'antibiotic':
-                        antibiotics.append(drug_entry)
-                    elif current_category == 'antifungal':
-                        antifungals.append(drug_entry)
-                    elif current_category == 'antiviral':
-                        antivirals.append(drug_entry)
-    
+                if current_category == 'antibiotic':
+                    antibiotics.append(drug_entry)
+                elif current_category == 'antifungal':
+                    antifungals.append(drug_entry)
+                elif current_category == 'antiviral':
+                    antivirals.append(drug_entry)
+
     # Manual extraction for key drugs (more reliable)
     abx_data = [
         {
@@ -485,6 +688,15 @@ def parse_abx_data(filename='abx_extracted.txt'):
         }
     ]
     
+    # Opt-in: renal dosing read straight from the tables of the PDF
+    if tables:
+        drugs = extract_renal_tables(tables)
+        unpaired = apply_renal_tables(abx_data, drugs)
+        print(f"✓ Renal dosing from the tables of {tables} for {len(drugs) - len(unpaired)}/{len(abx_data)} entries")
+        if unpaired:
+            names = [f"{drug['route']} {drug['name']}".strip() for drug in unpaired]
+            print(f"  Not in abx_data: {', '.join(names)}")
+
     # Save to JSON
     output = {
         "metadata": {
@@ -504,4 +716,9 @@ def parse_abx_data(filename='abx_extracted.txt'):
     return output
 
 if __name__ == "__main__":
-    parse_abx_data()
+    parser = argparse.ArgumentParser(description="Build src/abxData.json from the ABX regime guideline")
+    parser.add_argument("filename", nargs="?", default='abx_extracted.txt')
+    parser.add_argument("--tables", nargs="?", const=ABX_PDF, default=None,
+                        help=f"read renal dosing from the PDF's tables (default PDF: {ABX_PDF})")
+    args = parser.parse_args()
+    parse_abx_data(args.filename, args.tables)
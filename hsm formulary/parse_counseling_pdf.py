@@ -1,5 +1,33 @@
+import argparse
+import os
 import re
 import json
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from pdf_extraction import iter_page_lines, open_pages
+
+# Markers substituted for the monograph headers. A drug starts at NAME_HEADER and
+# each section runs from its marker to the next marker of another section
+NAME_HEADER = '<HEADER_NAME>'
+ALL_HEADERS = ['<HEADER_GROUP>', '<HEADER_INDICATION>', '<HEADER_METHOD>', '<HEADER_SPECIAL>', '<HEADER_SIDE_EFFECTS>', '<HEADER_STORAGE>', '<HEADER_OTHERS>']
+HEADER_PATTERN = re.compile('|'.join(re.escape(marker) for marker in ALL_HEADERS))
+# Headers written inline, replaced in this order. Storage and Others are only
+# taken when they stand on their own line, to prevent false positives in text
+HEADER_SUBSTITUTIONS = [
+    (r'\bName\s*:', NAME_HEADER),
+    (r'\bPharmacological\s+Group\b', '<HEADER_GROUP>'),
+    (r'\bIndications\s+and\s+Dosage\b', '<HEADER_INDICATION>'),
+    (r'\bMethod\s+of\s+Administration\s*\*?', '<HEADER_METHOD>'),
+    (r'\bSpecial\s+Considerations\b', '<HEADER_SPECIAL>'),
+    (r'\bSide\s+Effects\s+and\s+their\s+Management\s*\*?', '<HEADER_SIDE_EFFECTS>'),
+]
+HEADER_SUBSTITUTIONS = [(re.compile(pattern, re.IGNORECASE), marker) for pattern, marker in HEADER_SUBSTITUTIONS]
+NAME_WINDOW = 100
+# Drug blocks sent to a worker at a time in parallel mode
+BATCH_SIZE = 8
 
 def clean_text(text):
     """Remove page markers, extra spaces, and common artifacts"""
@@ -191,164 +219,261 @@ def extract_drug_name(before_text):
     
     return name
 
-def parse_counseling_text(file_path):
-    with open(file_path, 'r') as f:
-        lines = f.readlines()
+class HeaderIndex:
+    """Offsets of every section marker in one drug body, from a single finditer pass"""
 
-    processed_lines = []
-    for line in lines:
-        clean_line = line.strip()
-        # Handle headers that appear on their own lines to avoid false positives in text
-        if clean_line == "Others":
-            processed_lines.append("<HEADER_OTHERS>")
-        elif re.match(r'^Storage\*?$', clean_line):
-            processed_lines.append("<HEADER_STORAGE>")
-        else:
-            processed_lines.append(clean_line)
+    def __init__(self, text):
+        self.text = text
+        self.starts = []
+        self.markers = []
+        self.by_marker = {marker: [] for marker in ALL_HEADERS}
+        for match in HEADER_PATTERN.finditer(text):
+            self.by_marker[match.group()].append(match.start())
+            self.starts.append(match.start())
+            self.markers.append(match.group())
 
-    full_text = " ".join(processed_lines)
-    full_text = re.sub(r'\s+', ' ', full_text)
-    
-    # Replace headers with markers
-    text = full_text
-    text = re.sub(r'\bName\s*:', '<HEADER_NAME>', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bPharmacological\s+Group\b', '<HEADER_GROUP>', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bIndications\s+and\s+Dosage\b', '<HEADER_INDICATION>', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bMethod\s+of\s+Administration\s*\*?', '<HEADER_METHOD>', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bSpecial\s+Considerations\b', '<HEADER_SPECIAL>', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bSide\s+Effects\s+and\s+their\s+Management\s*\*?', '<HEADER_SIDE_EFFECTS>', text, flags=re.IGNORECASE)
-    # Storage and Others are now handled during line processing to prevent false positives
-    
-    name_pattern = r'(.{0,100})<HEADER_NAME>'
-    matches = list(re.finditer(name_pattern, text))
-    
-    extracted_data = []
-    
-    for i, match in enumerate(matches):
-        name_candidate = match.group(1)
-        name = extract_drug_name(name_candidate) # Use the existing extract_drug_name for robust cleaning
-        
-        # Skip non-drug entries
-        if not name:
-            continue
-        
-        # Filter out common non-drug text patterns
-        skip_patterns = [
-            r'^Name\s*:?\s*$',  # Just "Name:" with no actual name
-            r'Signature',  # Contains "Signature" anywhere
-            r'Date\s*:',  # Contains "Date:" anywhere
-            r'^\d{1,2}[/-]\d{1,2}[/-]\d{2,4}',  # Dates
-            r'^Reviewed\s+by',
-            r'^Prepared\s+by',
-            r'^Checked\s+by',
-            r'^Verified\s+by',
-            r'^\s*$',  # Empty
-            r'^Page\s+\d+',
-            r'^Remarks',
-            r'^References',
-            r'^Name\s*&\s*Signature',  # "Name & Signature" pattern
-        ]
-        
-        should_skip = False
-        for pattern in skip_patterns:
-            if re.match(pattern, name, re.IGNORECASE):
-                should_skip = True
+    def section(self, marker, start_pos, end_pos):
+        """
+        Text of one section of the drug body text[start_pos:end_pos]: from the
+        first occurrence of marker up to the next marker of any other
+        section, or the end of the body
+        """
+        positions = self.by_marker[marker]
+        i = bisect_left(positions, start_pos)
+        if i == len(positions) or positions[i] + len(marker) > end_pos:
+            return ""
+        start_idx = positions[i] + len(marker)
+
+        end_idx = end_pos
+        j = bisect_left(self.starts, start_idx)
+        while j < len(self.starts) and self.starts[j] + len(self.markers[j]) <= end_pos:
+            if self.markers[j] != marker:
+                end_idx = self.starts[j]
                 break
-        
-        if should_skip:
-            continue
-        
-        # Also skip if name is too short (likely not a drug name)
-        if len(name) < 3:
+            j += 1
+        return clean_text(self.text[start_idx:end_idx])
+
+def mark_line(line):
+    """Stripped line, or its marker when it is a Storage or Others header on its own"""
+    clean_line = line.strip()
+    if clean_line == "Others":
+        return "<HEADER_OTHERS>"
+    if re.match(r'^Storage\*?$', clean_line):
+        return "<HEADER_STORAGE>"
+    return clean_line
+
+def iter_marked_pages(source):
+    """
+    Yield the corpus a page at a time, as one string per page: lines joined
+    with spaces, whitespace collapsed and headers replaced with markers.
+    Joined together the pages are the text the whole file would give. Each
+    page starts with its "=== PAGE n ===" line, which no header pattern can
+    reach into, so no header is ever split between two pages.
+    """
+    def marked(text):
+        for pattern, marker in HEADER_SUBSTITUTIONS:
+            text = pattern.sub(marker, text)
+        return text
+
+    previous = None
+    for page in open_pages(source):
+        # Keep the page markers in the stream: the 100-char name window before
+        # <HEADER_NAME> is measured over the text as it appears in the extracted file
+        text = re.sub(r'\s+', ' ', " ".join(mark_line(line) for line in iter_page_lines([page], with_markers=True)))
+        if previous is not None:
+            # The space joining the pages belongs to the earlier one
+            yield marked(previous if previous.endswith(' ') else previous + ' ')
+        previous = text
+    if previous is not None:
+        yield marked(previous)
+
+def iter_drug_blocks(source):
+    """
+    Split the marked corpus into drugs as it streams in, yielding
+    (index, name_candidate, body) per <HEADER_NAME>, index counting every
+    match of (.{0,100})<HEADER_NAME> in the text. Only the drug being read
+    is held in memory, plus the page that ends it.
+    """
+    buffer = ''
+    base = 0        # corpus offset of buffer[0]
+    scan = 0        # where the search for the next name starts
+    current = None  # (index, name_candidate) of the drug whose body is being read
+    index = 0
+    pages = iter_marked_pages(source)
+    exhausted = False
+    while True:
+        found = buffer.find(NAME_HEADER, max(scan - base, 0))
+        if found >= 0:
+            start = max(scan, base + found - NAME_WINDOW)
+            # The greedy window reaches the last marker that still fits in
+            # 100 characters of its start, so read far enough to see them all
+            if not exhausted and len(buffer) < start - base + NAME_WINDOW + len(NAME_HEADER):
+                found = -1
+            else:
+                end = found
+                following = buffer.find(NAME_HEADER, end + 1)
+                while following >= 0 and base + following - start <= NAME_WINDOW:
+                    end = following
+                    following = buffer.find(NAME_HEADER, end + 1)
+                if current is not None:
+                    yield current + (buffer[:start - base],)
+                current = (index, buffer[start - base:end])
+                index += 1
+                scan = base + end + len(NAME_HEADER)
+                buffer = buffer[scan - base:]
+                base = scan
+                continue
+
+        if exhausted:
+            break
+        page = next(pages, None)
+        if page is None:
+            exhausted = True
             continue
-        
-        start_pos = match.end()
-        if i < len(matches) - 1:
-            end_pos = matches[i+1].start()
-        else:
-            end_pos = len(text)
-        
-        drug_content = text[start_pos:end_pos]
-        
-        ALL_HEADERS = ['<HEADER_GROUP>', '<HEADER_INDICATION>', '<HEADER_METHOD>', '<HEADER_SPECIAL>', '<HEADER_SIDE_EFFECTS>', '<HEADER_STORAGE>', '<HEADER_OTHERS>']
+        if current is None:
+            # Before the first drug only the text a name window could reach is kept
+            keep = max(scan - base, len(buffer) - NAME_WINDOW - len(NAME_HEADER))
+            if keep > 0:
+                buffer = buffer[keep:]
+                base += keep
+        buffer += page
 
-        # Extract sections
-        def extract_section(content, start_marker, explicit_end_markers):
-            if start_marker and start_marker not in content:
-                return ""
-            start_idx = content.find(start_marker) + len(start_marker) if start_marker else 0
-            end_idx = len(content)
-            
-            # Use all headers as potential stop markers to prevent bleeding
-            # This ensures we stop at the NEXT header, whatever it is
-            stop_markers = set(explicit_end_markers + ALL_HEADERS)
-            if start_marker in stop_markers:
-                stop_markers.remove(start_marker)
-                
-            for marker in stop_markers:
-                idx = content.find(marker, start_idx)
-                if idx != -1 and idx < end_idx:
-                    end_idx = idx
-            result = content[start_idx:end_idx]
-            return clean_text(result)
+    if current is not None:
+        yield current + (buffer,)
 
-        group = extract_section(drug_content, '<HEADER_GROUP>', [])
-        indication_and_dosage = extract_section(drug_content, '<HEADER_INDICATION>', [])
-        method = extract_section(drug_content, '<HEADER_METHOD>', [])
-        special = extract_section(drug_content, '<HEADER_SPECIAL>', [])
-        side_effects = extract_section(drug_content, '<HEADER_SIDE_EFFECTS>', [])
-        storage = extract_section(drug_content, '<HEADER_STORAGE>', [])
-        others = extract_section(drug_content, '<HEADER_OTHERS>', [])
+def parse_drug_block(index, name_candidate, body):
+    """Build the monograph record for one drug block, or None if it is not a drug"""
+    name = extract_drug_name(name_candidate) # Use the existing extract_drug_name for robust cleaning
+    
+    # Skip non-drug entries
+    if not name:
+        return None
+    
+    # Filter out common non-drug text patterns
+    skip_patterns = [
+        r'^Name\s*:?\s*$',  # Just "Name:" with no actual name
+        r'Signature',  # Contains "Signature" anywhere
+        r'Date\s*:',  # Contains "Date:" anywhere
+        r'^\d{1,2}[/-]\d{1,2}[/-]\d{2,4}',  # Dates
+        r'^Reviewed\s+by',
+        r'^Prepared\s+by',
+        r'^Checked\s+by',
+        r'^Verified\s+by',
+        r'^\s*$',  # Empty
+        r'^Page\s+\d+',
+        r'^Remarks',
+        r'^References',
+        r'^Name\s*&\s*Signature',  # "Name & Signature" pattern
+    ]
+    
+    should_skip = False
+    for pattern in skip_patterns:
+        if re.match(pattern, name, re.IGNORECASE):
+            should_skip = True
+            break
+    
+    if should_skip:
+        return None
+    
+    # Also skip if name is too short (likely not a drug name)
+    if len(name) < 3:
+        return None
+    
+    headers = HeaderIndex(body)
+    group = headers.section('<HEADER_GROUP>', 0, len(body))
+    indication_and_dosage = headers.section('<HEADER_INDICATION>', 0, len(body))
+    method = headers.section('<HEADER_METHOD>', 0, len(body))
+    special = headers.section('<HEADER_SPECIAL>', 0, len(body))
+    side_effects = headers.section('<HEADER_SIDE_EFFECTS>', 0, len(body))
+    storage = headers.section('<HEADER_STORAGE>', 0, len(body))
+    others = headers.section('<HEADER_OTHERS>', 0, len(body))
 
-        # Clean specific fields
-        indication_and_dosage = re.sub(r'^1\.\s*Indication\s*:', '', indication_and_dosage, flags=re.IGNORECASE).strip()
-        indication_and_dosage = re.sub(r'^Indication\s*:', '', indication_and_dosage, flags=re.IGNORECASE).strip()
-        
-        # Split indication and dosage
-        # Look for common dosage markers
-        dosage_match = re.search(r'(?:Dosage|Dose)\s*:', indication_and_dosage, re.IGNORECASE)
-        if dosage_match:
-            indication = indication_and_dosage[:dosage_match.start()].strip()
-            dosage = indication_and_dosage[dosage_match.start():].strip()
-            # Clean dosage prefix
-            dosage = re.sub(r'^(?:Dosage|Dose)\s*:', '', dosage, flags=re.IGNORECASE).strip()
+    # Clean specific fields
+    indication_and_dosage = re.sub(r'^1\.\s*Indication\s*:', '', indication_and_dosage, flags=re.IGNORECASE).strip()
+    indication_and_dosage = re.sub(r'^Indication\s*:', '', indication_and_dosage, flags=re.IGNORECASE).strip()
+    
+    # Split indication and dosage
+    # Look for common dosage markers
+    dosage_match = re.search(r'(?:Dosage|Dose)\s*:', indication_and_dosage, re.IGNORECASE)
+    if dosage_match:
+        indication = indication_and_dosage[:dosage_match.start()].strip()
+        dosage = indication_and_dosage[dosage_match.start():].strip()
+        # Clean dosage prefix
+        dosage = re.sub(r'^(?:Dosage|Dose)\s*:', '', dosage, flags=re.IGNORECASE).strip()
+    else:
+        # If no clear split, use the whole text for indication and extract dosage info
+        indication = indication_and_dosage
+        # Try to find dosage patterns (mg, mcg, etc.)
+        dosage_pattern = r'(?:^|\n)(?:\d+(?:\.\d+)?\s*(?:mg|mcg|g|ml|%|units?|tablets?|capsules?).*?)(?=\n|$)'
+        dosage_matches = re.findall(dosage_pattern, indication_and_dosage, re.IGNORECASE | re.MULTILINE)
+        if dosage_matches:
+            dosage = ' '.join(dosage_matches).strip()
         else:
-            # If no clear split, use the whole text for indication and extract dosage info
-            indication = indication_and_dosage
-            # Try to find dosage patterns (mg, mcg, etc.)
-            dosage_pattern = r'(?:^|\n)(?:\d+(?:\.\d+)?\s*(?:mg|mcg|g|ml|%|units?|tablets?|capsules?).*?)(?=\n|$)'
-            dosage_matches = re.findall(dosage_pattern, indication_and_dosage, re.IGNORECASE | re.MULTILINE)
-            if dosage_matches:
-                dosage = ' '.join(dosage_matches).strip()
-            else:
-                dosage = "See indication for dosage details"
-        
-        # Remove footer text
-        others = remove_footer_text(others)
-        storage = remove_footer_text(storage)
+            dosage = "See indication for dosage details"
+    
+    # Remove footer text
+    others = remove_footer_text(others)
+    storage = remove_footer_text(storage)
 
-        # Parse special considerations into categories
-        special_considerations = parse_special_considerations(special)
-        
-        # Parse side effects
-        side_effects_list = parse_side_effects(side_effects)
+    # Parse special considerations into categories
+    special_considerations = parse_special_considerations(special)
+    
+    # Parse side effects
+    side_effects_list = parse_side_effects(side_effects)
 
-        drug = {
-            "id": f"counsel-{str(i+1).zfill(3)}",
-            "name": name,
-            "pharmacologicalGroup": group,
-            "indication": indication,
-            "dosage": dosage,
-            "methodOfAdministration": method,
-            "specialConsiderations": special_considerations,
-            "sideEffects": side_effects_list,
-            "others": {
-                "storage": storage,
-                "other_points": others
-            }
+    drug = {
+        "id": f"counsel-{str(index+1).zfill(3)}",
+        "name": name,
+        "pharmacologicalGroup": group,
+        "indication": indication,
+        "dosage": dosage,
+        "methodOfAdministration": method,
+        "specialConsiderations": special_considerations,
+        "sideEffects": side_effects_list,
+        "others": {
+            "storage": storage,
+            "other_points": others
         }
-        
-        extracted_data.append(drug)
+    }
+    
+    return drug
+
+def _parse_batch(blocks):
+    return [parse_drug_block(*block) for block in blocks]
+
+def iter_drugs(source, workers=1, batch_size=BATCH_SIZE):
+    """
+    Yield parse_drug_block for every drug block, in order. Blocks are parsed
+    serially by default. With several workers (0 for one per core), batches
+    of blocks are parsed in a process pool while the segmenter keeps
+    reading; only a few batches are in flight at once.
+    """
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    blocks = iter_drug_blocks(source)
+    if workers == 1:
+        for block in blocks:
+            yield parse_drug_block(*block)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+
+        def submit():
+            batch = list(islice(blocks, batch_size))
+            if batch:
+                pending.append(pool.submit(_parse_batch, batch))
+
+        for _ in range(workers * 2):
+            submit()
+        while pending:
+            future = pending.popleft()
+            submit()
+            yield from future.result()
+
+def parse_counseling_text(source, workers=1):
+    """Parse counseling monographs from an extracted text file, the PDF itself, or a page iterator"""
+    extracted_data = [drug for drug in iter_drugs(source, workers) if drug is not None]
 
     with open('counseling_data_extracted.json', 'w') as f:
         json.dump(extracted_data, f, indent=4)
@@ -356,4 +481,9 @@ def parse_counseling_text(file_path):
     print(f"Extracted {len(extracted_data)} medications.")
 
 if __name__ == "__main__":
-    parse_counseling_text('counseling_pdf_content.txt')
+    parser = argparse.ArgumentParser(description="Extract counseling monographs to counseling_data_extracted.json")
+    parser.add_argument("source", nargs="?", default='counseling_pdf_content.txt')
+    parser.add_argument("--workers", type=int, nargs="?", default=1, const=0,
+                        help="parse in a process pool of this many workers (no number: one per core)")
+    args = parser.parse_args()
+    parse_counseling_text(args.source, args.workers)
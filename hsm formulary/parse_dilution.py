@@ -4,16 +4,10 @@ Parse the dilution guideline PDF text and create a JSON data structure
 """
 import json
 import re
+import sys
 
-# Read the extracted text
-with open('dilution_extracted.txt', 'r', encoding='utf-8') as f:
-    content = f.read()
-
-# Split by pages
-pages = content.split('=== PAGE')
-
-drugs = []
-current_drug = None
+from aho_corasick import AhoCorasick
+from pdf_extraction import open_pages
 
 # Define the drugs we know from the table of contents
 drug_names = [
@@ -29,78 +23,167 @@ drug_names = [
     "Sulphamethoxazole-Trimethoprim", "Vancomycin", "Voriconazole", "Zidovudine"
 ]
 
-for page in pages:
-    if not page.strip():
-        continue
+# Every monograph title in one automaton, so each page is scanned once for all of them
+TITLES = AhoCorasick(f"{drug_name} Injection" for drug_name in drug_names)
+# A title that heads its monograph has a line to itself, after the page number
+# at most; in the table of contents it follows a bullet and precedes a page
+# number, and in prose it sits inside a sentence
+HEADING_PREFIX = re.compile(r'\d*')
+
+def index_titles(pages):
+    """
+    Scan the corpus once for every monograph title. Returns (hits, texts):
+    hits is every (drug_name, page_no, offset) in corpus order, contents and
+    mentions in prose included; texts maps the page_no of every page with a
+    hit to its text.
+    """
+    hits = []
+    texts = {}
+    for page_no, page in pages:
+        matches = sorted(TITLES.iter_matches(page))
+        if matches:
+            texts[page_no] = page
+            hits.extend((drug_names[index], page_no, start) for start, _, index in matches)
+    return hits, texts
+
+def is_heading(page, drug_name, offset):
+    """Whether the title of drug_name at offset heads a monograph rather than naming it"""
+    line_start = page.rfind('\n', 0, offset) + 1
+    line_end = page.find('\n', offset)
+    end = offset + len(f"{drug_name} Injection")
+    return (HEADING_PREFIX.fullmatch(page, line_start, offset) is not None and
+            not page[end:len(page) if line_end < 0 else line_end].strip())
+
+def spaced(label):
+    """
+    A label pattern that also matches its words split by a stray space
+    ("Storage &S tability"). One-word labels are left as they are: split, they
+    also head table columns ("Administ ration").
+    """
+    if not re.search(r'\\s', label):
+        return label
+    return re.sub(r'(?<=[A-Za-z])(?=[A-Za-z])', r'[ \t]?', label)
+
+# Field labels of a monograph, each starting a line except "Brand Name", which
+# never occurs in prose and is sometimes glued to the line before it.
+# "Diluents" also ends its line; followed by more words it heads a table.
+# A label never runs on into "&": "Reconstitution &\nFurther Dilution" is one
+# label, not Reconstitution with "&" for its value.
+# References and the page footer are not fields but end the field before them
+FIELD_LABELS = [
+    ("brandName", r'Brand\s+Name'),
+    ("reconstitution", r'Reconstitution(?:\s*&\s*Further\s+Dilution)?'),
+    ("furtherDilution", r'Further\s+Dilution(?:\s*&\s*Administration)?'),
+    ("diluents", r'Diluent(?: ?s)?(?=[ \t]*$)'),
+    ("administration", r'Administration'),
+    ("storage", r'Storage\s*&\s*Stability'),
+    ("remarks", r'Remarks'),
+    ("references", r'References'),
+    ("footer", r'\*The information provided'),
+]
+FIELD_PATTERN = re.compile('|'.join(f'(?P<{field}>{spaced(label)})(?![ \t]*&)' if field == "brandName"
+                                     else f'^[ \t]*(?P<{field}>{spaced(label)})(?![ \t]*&)'
+                                     for field, label in FIELD_LABELS), re.MULTILINE)
+# Fields a profile keeps; references and the footer only end other fields
+PROFILE_FIELDS = ("brandName", "reconstitution", "furtherDilution", "diluents",
+                  "administration", "storage", "remarks")
+# Labels without a value that mark a monograph laid out as a table
+STACKED_LABELS = 3
+# Fields whose value is a single line ("NS,D5"). Where the page lists its labels
+# after the values, the lines after it belong to other fields
+ONE_LINE_FIELDS = {"diluents"}
+
+def tokenize_fields(page, start=0, stop=None):
+    """
+    Field values of a monograph from one scan for its labels between start
+    and stop (the next monograph title, or the end of the page): each field
+    runs from its label to the next label, or to the end of its first line
+    for ONE_LINE_FIELDS, with whitespace collapsed. A label found twice keeps
+    its first value.
+    """
+    stop = len(page) if stop is None else stop
+    fields = {}
+    labels = list(FIELD_PATTERN.finditer(page, start, stop))
+    for label, end in zip(labels, [following.start() for following in labels[1:]] + [stop]):
+        value = page[label.end():end]
+        if label.lastgroup in ONE_LINE_FIELDS:
+            value = next((line for line in value.splitlines() if line.strip()), '')
+        fields.setdefault(label.lastgroup, ' '.join(value.split()))
+    return fields
+
+def is_stacked(fields):
+    """
+    Whether a monograph is laid out as a table: its labels come out as one
+    stacked block after the values, so the tokenizer finds them with no
+    value between them. Labels written beside their value in such a table
+    ("Diluents") still get one.
+    """
+    return sum(1 for field in PROFILE_FIELDS if field in fields and not fields[field]) >= STACKED_LABELS
+
+def title_line_after(page, offset):
+    """The line after the title at offset: a table monograph's first row, its brand name"""
+    start = page.find('\n', offset)
+    if start < 0:
+        return ''
+    end = page.find('\n', start + 1)
+    return ' '.join(page[start + 1:len(page) if end < 0 else end].split())
+
+def parse_dilution(source='dilution_extracted.txt'):
+    """
+    Parse drug profiles from an extracted text file, the PDF itself, or a page
+    iterator. Every monograph heading found by index_titles starts a profile,
+    which runs to the next heading on its page or to the end of the page.
+    """
+    drugs = []
+    hits, texts = index_titles(open_pages(source))
+    headings = [(drug_name, page_no, offset) for drug_name, page_no, offset in hits
+                if is_heading(texts[page_no], drug_name, offset)]
+
+    for k, (drug_name, page_no, offset) in enumerate(headings):
+        page = texts[page_no]
+        following = headings[k + 1] if k + 1 < len(headings) else None
+        stop = following[2] if following and following[1] == page_no else len(page)
+        fields = tokenize_fields(page, offset, stop)
+        # The values of a table monograph run together ahead of its stacked
+        # labels, with nothing to tell where one ends; only the brand name,
+        # the first row, is placed, and the other stacked fields stay empty
+        if is_stacked(fields) and not fields.get("brandName"):
+            fields["brandName"] = title_line_after(page, offset)
+
+        # Extract information
+        drug_data = {
+            "id": f"dilution-{len(drugs) + 1}",
+            "genericName": drug_name,
+            "brandName": fields.get("brandName", ""),
+            "reconstitution": fields.get("reconstitution", ""),
+            "furtherDilution": fields.get("furtherDilution", ""),
+            "diluents": fields.get("diluents", ""),
+            "administration": fields.get("administration", ""),
+            "storage": fields.get("storage", ""),
+            "remarks": fields.get("remarks", ""),
+            "category": "Injectable Antimicrobial"
+        }
     
-    # Check if this page contains a drug profile
-    for drug_name in drug_names:
-        if f"{drug_name} Injection" in page:
-            # Extract information
-            drug_data = {
-                "id": f"dilution-{len(drugs) + 1}",
-                "genericName": drug_name,
-                "brandName": "",
-                "reconstitution": "",
-                "furtherDilution": "",
-                "diluents": "",
-                "administration": "",
-                "storage": "",
-                "remarks": "",
-                "category": "Injectable Antimicrobial"
-            }
-            
-            # Extract brand name
-            brand_match = re.search(r'Brand Name\s+([^\n]+)', page)
-            if brand_match:
-                drug_data["brandName"] = brand_match.group(1).strip()
-            
-            # Extract reconstitution
-            recon_match = re.search(r'Reconstitution\s+([^■\n]+(?:\n[^■\n]+)*)', page, re.MULTILINE)
-            if recon_match:
-                drug_data["reconstitution"] = ' '.join(recon_match.group(1).strip().split())
-            
-            # Extract further dilution
-            dilution_match = re.search(r'Further Dilution\s+([^Diluent]+)', page, re.MULTILINE)
-            if dilution_match:
-                drug_data["furtherDilution"] = ' '.join(dilution_match.group(1).strip().split())
-            
-            # Extract diluents
-            diluent_match = re.search(r'Diluents?\s+([^\n]+)', page)
-            if diluent_match:
-                drug_data["diluents"] = diluent_match.group(1).strip()
-            
-            # Extract administration
-            admin_match = re.search(r'Administration\s+([^Storage]+)', page, re.MULTILINE)
-            if admin_match:
-                drug_data["administration"] = ' '.join(admin_match.group(1).strip().split())
-            
-            # Extract storage
-            storage_match = re.search(r'Storage.*?Stability\s+([^Remarks]+)', page, re.MULTILINE)
-            if storage_match:
-                drug_data["storage"] = ' '.join(storage_match.group(1).strip().split())
-            
-            # Extract remarks
-            remarks_match = re.search(r'Remarks\s+([^References]+)', page, re.MULTILINE)
-            if remarks_match:
-                drug_data["remarks"] = ' '.join(remarks_match.group(1).strip().split())
-            
-            drugs.append(drug_data)
-            break
-
-# Save to JSON
-output_data = {
-    "title": "MOH Dilution Guideline for Injectable Drugs",
-    "version": "December 2020",
-    "source": "Ministry of Health Malaysia - Pharmaceutical Services Programme",
-    "drugs": drugs
-}
-
-with open('dilution_data.json', 'w', encoding='utf-8') as f:
-    json.dump(output_data, f, indent=2, ensure_ascii=False)
-
-print(f"✅ Parsed {len(drugs)} drugs from dilution guideline")
-print(f"📄 Saved to dilution_data.json")
-print("\nSample drugs extracted:")
-for drug in drugs[:5]:
-    print(f"  - {drug['genericName']}")
+        drugs.append(drug_data)
+
+    return drugs
+
+if __name__ == "__main__":
+    drugs = parse_dilution(sys.argv[1] if len(sys.argv) > 1 else 'dilution_extracted.txt')
+
+    # Save to JSON
+    output_data = {
+        "title": "MOH Dilution Guideline for Injectable Drugs",
+        "version": "December 2020",
+        "source": "Ministry of Health Malaysia - Pharmaceutical Services Programme",
+        "drugs": drugs
+    }
+
+    with open('dilution_data.json', 'w', encoding='utf-8') as f:
+        json.dump(output_data, f, indent=2, ensure_ascii=False)
+
+    print(f"✅ Parsed {len(drugs)} drugs from dilution guideline")
+    print(f"📄 Saved to dilution_data.json")
+    print("\nSample drugs extracted:")
+    for drug in drugs[:5]:
+        print(f"  - {drug['genericName']}")
@@ -1,7 +1,12 @@
+import argparse
 import re
 import json
 import unicodedata
 
+from pdf_extraction import iter_page_lines, open_pages
+from name_correction import default_corrector
+from ocr_rules import rule_set
+
 def normalize_unicode(text):
     """Convert Unicode characters to ASCII where possible"""
     # Normalize Unicode to decomposed form, then remove combining characters
@@ -9,160 +14,13 @@ def normalize_unicode(text):
     text = text.encode('ascii', 'ignore').decode('ascii')
     return text
 
+# OCR corrections, applied in order (the parse_frank_shann set in ocr_rules.json)
+OCR_RULES = rule_set('parse_frank_shann')
+
 def clean_text(text):
     """Comprehensive text cleaning with OCR error correction"""
-    # First, normalize Unicode
     text = normalize_unicode(text)
-    
-    # Remove page artifacts and headers/footers
-    text = re.sub(r'=== PAGE \d+ ===', ' ', text)
-    text = re.sub(r'\$\d+\.\d+ \+ postage from orders@drugdoses\.com Page \d+', ' ', text)
-    text = re.sub(r'drugdoses\.com', ' ', text)
-    text = re.sub(r'Page \d+', ' ', text)
-    
-    # Fix common OCR character confusions - UNITS (comprehensive)
-    # mg variations
-    text = re.sub(r'(?<=\d)\s*rng\b', 'mg', text)
-    text = re.sub(r'(?<=\d)\s*rn\s*g\b', 'mg', text)
-    text = re.sub(r'(?<=\d)\s*rnq\b', 'mg', text)
-    text = re.sub(r'\brng\b', 'mg', text)
-    text = re.sub(r'\bmg\s+(?=\d)', 'mg/', text)  # "mg 12" -> "mg/12"
-    
-    # mcg variations
-    text = re.sub(r'(?<=\d)\s*rncg\b', 'mcg', text)
-    text = re.sub(r'(?<=\d)\s*mc\s*g\b', 'mcg', text)
-    text = re.sub(r'\brncg\b', 'mcg', text)
-    
-    # kg variations (extensive)
-    text = re.sub(r'(?<=\d)\s*l<g\b', 'kg', text)
-    text = re.sub(r'(?<=\d)\s*1<g\b', 'kg', text)
-    text = re.sub(r'(?<=\d)\s*I<g\b', 'kg', text)
-    text = re.sub(r'(?<=\d)\s*k\(J\b', 'kg', text)
-    text = re.sub(r'(?<=\d)\s*1\(g\b', 'kg', text)
-    text = re.sub(r'(?<=\d)\s*k\[J\b', 'kg', text)
-    text = re.sub(r'(?<=\d)\s*kq\b', 'kg', text)
-    text = re.sub(r'\bl<g\b', 'kg', text)
-    text = re.sub(r'\bI<g\b', 'kg', text)
-    text = re.sub(r'\bk\(J\b', 'kg', text)
-    text = re.sub(r'\bk\[J\b', 'kg', text)
-    text = re.sub(r'\bkq\b', 'kg', text)
-    
-    # ml variations
-    text = re.sub(r'(?<=\d)\s*rnl\b', 'ml', text)
-    text = re.sub(r'(?<=\d)\s*rn I\b', 'ml', text)
-    text = re.sub(r'\brnl\b', 'ml', text)
-    text = re.sub(r'\bm\s+l\b', 'ml', text)
-    text = re.sub(r'\bmll\b', 'ml', text)
-    
-    # min/hr/H variations
-    text = re.sub(r'(?<=\d)\s*rnin\b', 'min', text)
-    text = re.sub(r'\brnin\b', 'min', text)
-    text = re.sub(r'\bllr\b', 'hr', text)
-    text = re.sub(r'\blhr\b', 'hr', text)
-    text = re.sub(r'\b1hr\b', '1hr', text)
-    text = re.sub(r'(?<=\d)\s*/H\b', 'H', text)  # "6-12/H" -> "6-12H"
-    text = re.sub(r'\bti-1\s*/H\b', '6-12H', text)  # Common pattern
-    text = re.sub(r'\b8-l2H\b', '8-12H', text)
-    
-    # Fix spacing around numbers and units
-    text = re.sub(r'(\d+)\s+(\.\s*\d+)', r'\1\2', text)  # "0 . 5" -> "0.5"
-    text = re.sub(r'(\d+)\s*\.\s*(\d+)', r'\1.\2', text)  # "0 . 5" -> "0.5"
-    text = re.sub(r'0_\s*1', '0.1', text)  # "0_ 1" -> "0.1"
-    text = re.sub(r'(\d+)\s*_\s*(\d+)', r'\1.\2', text)  # "0_ 1" -> "0.1"
-    
-    # Common word OCR errors
-    text = re.sub(r'\bornl\b', 'oral', text, flags=re.IGNORECASE)
-    text = re.sub(r'\boml\b', 'oral', text, flags=re.IGNORECASE)
-    text = re.sub(r'\borul\b', 'oral', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bOrnin\b', '0min', text)
-    text = re.sub(r'\bOmin\b', '0min', text)
-    text = re.sub(r'\bbeforo\b', 'before', text)
-    text = re.sub(r'\btl1on\b', 'then', text)
-    text = re.sub(r'\btl1en\b', 'then', text)
-    text = re.sub(r'\bparacetarno1\b', 'paracetamol', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bparacetarnol\b', 'paracetamol', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bangioplasly\b', 'angioplasty', text)
-    text = re.sub(r'\bsoltn\b', 'solution', text)
-    text = re.sub(r'\bintratrac:l1eal\b', 'intratracheal', text)
-    text = re.sub(r'\bumoi\b', 'umol', text)
-    text = re.sub(r'\bumolll\b', 'umol/L', text)
-    text = re.sub(r'\burnoi\b', 'umol', text)
-    text = re.sub(r'\brnux\b', 'max', text)
-    text = re.sub(r'\brnax\b', 'max', text)
-    text = re.sub(r'\btub\b', 'tab', text)
-    text = re.sub(r'\brepoat\b', 'repeat', text)
-    text = re.sub(r'\bdni!y\b', 'daily', text)
-    text = re.sub(r'\bdnily\b', 'daily', text)
-    
-    # IV/IM variations
-    text = re.sub(r'\bUlV\b', 'IV', text)
-    text = re.sub(r'\bIVl\b', 'IM', text)
-    text = re.sub(r'\blVl\b', 'IM', text)
-    
-    # Common letter/number confusions in dosages
-    text = re.sub(r'\b1\s*!\s*i\s*0', '150', text)  # "1!i0" -> "150"
-    text = re.sub(r'\b!\s*i', '5', text)  # "!i" -> "5"
-    # Fix exclamation marks and special character confusions FIRST (before other substitutions)
-    # Most ! should be 't', but need to handle special cases
-    text = re.sub(r'!i', '5i', text)  # Temporarily mark "!i" pattern  
-    text = re.sub(r'!', 't', text)  # Convert remaining ! to t
-    text = re.sub(r'5i', 'ti', text)  # Convert back, now it's "ti"
-    text = re.sub(r'ti-1', '6-1', text)  # Fix "ti-1" -> "6-1"
-    
-    # Common letter/number confusions in dosages (do early)
-    text = re.sub(r'\b1\s*0\s*-\s*/\s*0', '10-20', text)  # "1 0-/0" or "10-/0" -> "10-20"
-    text = re.sub(r'\b([12]?\d)-/0', r'\1-20', text)  # "X-/0" -> "X-20"  
-    text = re.sub(r'/0mg', '20mg', text)  # "/0mg" -> "20mg"
-    text = re.sub(r'\b1 OO\s*(?=mg|mcg|ml|kg)', '100', text)
-    text = re.sub(r'\b1 O\s*(?=mg|mcg|ml|kg)', '10', text)
-    text = re.sub(r'\b0\s*\.\s*1\b', '0.1', text)
-    text = re.sub(r'\b0\s*\.\s*2\b', '0.2', text)
-    text = re.sub(r'\b0\s*\.\s*5\b', '0.5', text)
-    text = re.sub(r'\b1\s*\.\s*0\b', '1.0', text)
-    text = re.sub(r'\b2\.\s*5', '2.5', text)
-    
-    # Time intervals cleanup
-    text = re.sub(r'\b8-24ft\b', '8-24H', text)
-    text = re.sub(r'\b6-12JI\b', '6-12H', text)
-    text = re.sub(r'\b4wl<\b', '4wk', text)
-    text = re.sub(r'\b2wl<\b', '2wk', text)
-    text = re.sub(r'\b(\d+)wl<\b', r'\1wk', text)
-    text = re.sub(r'\bwl<\b', 'wk', text)
-    text = re.sub(r'\b(\d+)hr\b', r'\1H', text)  # Standardize to H
-    text = re.sub(r'\b21lr\b', '2hr', text)
-    text = re.sub(r'\b241lr\b', '24hr', text)
-    
-    # Fix "See X" references
-    text = re.sub(r'\bSee\s+([a-z])', r'See \1', text)
-    text = re.sub(r'\bSec\s+', 'See ', text)
-    text = re.sub(r'\bSoo\s+', 'See ', text)
-    text = re.sub(r'\bSeu\s+', 'See ', text)
-    
-    # Clean up common garbage patterns
-    text = re.sub(r'\b[A-Z]{1}\\\\\w+\b', '', text)  # Remove patterns like "A\\dtJit"
-    text = re.sub(r'\\u00b7', '-', text)
-    text = re.sub(r'~', '-', text)
-    text = re.sub(r'--+', '-', text)
-    
-    # Remove soft hyphens and other invisible characters
-    text = re.sub(r'[\u00ad\u200b\u200c\u200d]', '', text)
-    
-    # Remove obvious garbage patterns
-    text = re.sub(r'\$\d+\.\d+\s+\+\s+po;;lnqc.*?drugd?u?sos\.com', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'from\s+oniom.*?drugdosos\.com', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'ordors@.*?\.com', '', text)
-    text = re.sub(r'Pane\s+\d+', '', text)
-    text = re.sub(r'turnourlysis:', 'tumour lysis:', text)
-    
-    # Fix double periods
-    text = re.sub(r'\.\.+', '.', text)
-    
-    # Normalize whitespace
-    text = re.sub(r'\s+', ' ', text)
-    text = re.sub(r'\s+\.', '.', text)
-    text = re.sub(r'\.\s+\.', '.', text)
-    
-    return text.strip()
+    return OCR_RULES.apply(text).strip()
 
 def is_valid_drug_name(name):
     """Check if a name looks like a valid drug name"""
@@ -208,9 +66,16 @@ def is_valid_dosage(dosage):
     
     return True
 
-def parse_frank_shann(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
+def parse_frank_shann(source, split_merged=True, extraction_mode="plain"):
+    """
+    Parse Frank Shann pages from an extracted text file, the PDF itself, or a page iterator.
+
+    Plain extraction interleaves the two columns of a page, so a line may
+    carry the start of another drug, which split_merged looks for. A PDF read
+    with extraction_mode="columns" keeps each column's lines together and
+    needs no splitting.
+    """
+    lines = iter_page_lines(open_pages(source, extraction_mode=extraction_mode))
 
     parsed_data = []
     current_entry = None
@@ -299,7 +164,7 @@ def parse_frank_shann(file_path):
             if current_entry:
                 # Check for "hidden" drug entry in this line (merged by OCR)
                 # Look for pattern: ". Name. " where Name is capitalized
-                potential_split = re.search(r'\.\s+([A-Z][a-z]{3,30})\.\s', line)
+                potential_split = split_merged and re.search(r'\.\s+([A-Z][a-z]{3,30})\.\s', line)
                 if potential_split:
                     possible_name = potential_split.group(1)
                     if possible_name not in NON_DRUG_STARTS and is_valid_drug_name(possible_name):
@@ -355,21 +220,13 @@ def parse_frank_shann(file_path):
             rejected_count += 1
             continue
         
-        # Fix common drug name OCR errors
-        name_fixes = {
-            "Abaca vir": "Abacavir",
-            "Abalacept": "Abatacept", 
-            "Ace!ylcysteinu": "Acetylcysteine",
-            "Acetylcysteine": "Acetylcysteine",
-            "Acyclovir": "Aciclovir",
-            "AlbuteroL": "Albuterol",
-        }
-        
-        for wrong, correct in name_fixes.items():
-            if wrong in entry['name']:
-                entry['name'] = entry['name'].replace(wrong, correct)
-        
         final_data.append(entry)
+
+    # Fix drug name OCR errors against the formulary, dilution and counseling names,
+    # in Frank Shann's spelling (name_correction.SPELLINGS)
+    corrector = default_corrector()
+    for entry, name in zip(final_data, corrector.correct_names(entry['name'] for entry in final_data)):
+        entry['name'] = name
     
     # Save to file
     output_file = 'src/frankShannData.json'
@@ -381,4 +238,16 @@ def parse_frank_shann(file_path):
     print(f"✓ Output saved to {output_file}")
 
 if __name__ == "__main__":
-    parse_frank_shann('frank_shann_extracted.txt')
+    parser = argparse.ArgumentParser(description="Parse Frank Shann drug entries into src/frankShannData.json")
+    parser.add_argument("source", nargs="?", default='frank_shann_extracted.txt',
+                        help="extracted text file, page store, or the PDF itself")
+    parser.add_argument("--columns", action="store_true",
+                        help="read a PDF source in column order (implies --no-split)")
+    parser.add_argument("--no-split", action="store_true",
+                        help="do not split lines that look like two merged entries")
+    args = parser.parse_args()
+    if args.columns and not args.source.lower().endswith('.pdf'):
+        # A text source was extracted already, in plain order; only a PDF can be re-read
+        parser.error("--columns needs a PDF source")
+    parse_frank_shann(args.source, split_merged=not (args.columns or args.no_split),
+                      extraction_mode="columns" if args.columns else "plain")
@@ -1,39 +1,15 @@
 import re
 import json
 
+from ocr_rules import rule_set
+
+# Common OCR errors (the parse_frank_shann_final set in ocr_rules.json), replaced
+# in table order
+OCR_FIXES = rule_set('parse_frank_shann_final')
+
 def clean_text(text):
     """Clean OCR errors from text"""
-    # Fix common OCR errors
-    replacements = {
-        'rng': 'mg', 'rnq': 'mg', 'rn g': 'mg', 'm g': 'mg',
-        'rncg': 'mcg', 'mc g': 'mcg',
-        'l<g': 'kg', 'I<g': 'kg', 'k(J': 'kg', 'k[J': 'kg', 'kq': 'kg', '1<g': 'kg',
-        'rnl': 'ml', 'rn l': 'ml', 'mll': 'ml',
-        'rnin': 'min', 'Omin': '0min',
-        'ornl': 'oral', 'oml': 'oral', 'orul': 'oral', 'omI': 'oral',
-        'tl1en': 'then', 'tl1on': 'then',
-        'beforo': 'before', 'beforc': 'before',
-        'paracetarnol': 'paracetamol', 'paracetarno1': 'paracetamol',
-        'soltn': 'solution',
-        'umoi': 'umol', 'urnoi': 'umol', 'umolll': 'umol/L',
-        'rnux': 'max', 'rnax': 'max',
-        'tub': 'tab', 'tsb': 'tab', 'tau': 'tab',
-        'repoat': 'repeat',
-        'dnily': 'daily', 'dni!y': 'daily',
-        'rnane': 'mane', 'nocle': 'nocte',
-        'infsn': 'infusion', 'incr': 'increase', 'reqd': 'required',
-        'Sec': 'See', 'Soo': 'See', 'Seu': 'See',
-        'UlV': 'IV', 'IVl': 'IM', 'lVl': 'IM', 'IlV': 'IV',
-        '8-24ft': '8-24H', '6-12JI': '6-12H', '8-l2H': '8-12H',
-        '12-241-l': '12-24H', '12-241': '12-24H',
-        'wl<': 'wk',
-        '1 O': '10', '1O': '10', '2 O': '20', '2O': '20',
-        '5 O': '50', '5O': '50', '/O': '20',
-        '!': 't',
-    }
-    
-    for wrong, correct in replacements.items():
-        text = text.replace(wrong, correct)
+    text = OCR_FIXES.apply(text)
     
     # Remove page markers
     text = re.sub(r'\$\d+\.\d+.*?drugdoses\.com', '', text)
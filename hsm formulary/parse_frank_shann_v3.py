@@ -1,168 +1,34 @@
+import argparse
 import re
 import json
 import unicodedata
 
+from ocr_rules import rule_set
+from parallel_clean import clean_parallel
+
 def normalize_unicode(text):
     """Convert Unicode characters to ASCII where possible"""
     text = unicodedata.normalize('NFKD', text)
     text = text.encode('ascii', 'ignore').decode('ascii')
     return text
 
+# OCR corrections, applied in order (the parse_frank_shann_v3 set in ocr_rules.json)
+OCR_RULES = rule_set('parse_frank_shann_v3')
+
 def clean_text(text):
     """Comprehensive text cleaning with aggressive OCR error correction"""
-    # First, normalize Unicode
     text = normalize_unicode(text)
-    
-    # Remove page artifacts and headers/footers
-    text = re.sub(r'=== PAGE \d+ ===', ' ', text)
-    text = re.sub(r'\$\d+\.\d+ \+ postage from orders@drugdoses\.com Page \d+', ' ', text)
-    text = re.sub(r'drugdoses\.com', ' ', text)
-    text = re.sub(r'Page \d+', '', text)
-    text = re.sub(r'\$9\.9[5ti].*?drugdoses\.com', '', text, flags=re.IGNORECASE)
-    
-    # Fix exclamation marks (common OCR error for't')
-    text = re.sub(r'!', 't', text)
-    
-    # Fix common character substitutions - NUMBERS
-    text = re.sub(r'\bO(?=mg|mcg|ml|kg|H\b)', '0', text)  # Capital O -> 0
-    text = re.sub(r'(?<=\d)\s*O\s*(?=mg|mcg|ml|kg)', '0', text)  # "1 O" -> "10"
-    text = re.sub(r'\b1\s*O\s*O\b', '100', text)  # "1 O O" -> "100"
-    text = re.sub(r'\b1\s*O\b', '10', text)  # "1 O" -> "10"
-    text = re.sub(r'\b2\s*O\b', '20', text)  # "2 O" -> "20"
-    text = re.sub(r'\b5\s*O\b', '50', text)  # "5 O" -> "50"
-    text = re.sub(r'/O\b', '20', text)  # "/O" -> "20"
-    text = re.sub(r'\b0\s*\.\s*', '0.', text)  # "0 . " -> "0."
-    
-    # Fix UNITS - comprehensive pattern matching
-    text = re.sub(r'(?<=\d)\s*rng\b', 'mg', text)
-    text = re.sub(r'(?<=\d)\s*rnq\b', 'mg', text)
-    text = re.sub(r'(?<=\d)\s*rn\s*g\b', 'mg', text)
-    text = re.sub(r'(?<=\d)\s*m\s+g\b', 'mg', text)
-    text = re.sub(r'\brng\b', 'mg', text)
-    text = re.sub(r'\brnq\b', 'mg', text)
-    
-    # mcg variations
-    text = re.sub(r'(?<=\d)\s*rncg\b', 'mcg', text)
-    text = re.sub(r'(?<=\d)\s*mc\s*g\b', 'mcg', text)
-    text = re.sub(r'\brncg\b', 'mcg', text)
-    
-    # kg variations - very extensive
-    text = re.sub(r'(?<=\d)\s*[lI1]\s*<\s*g\b', 'kg', text)
-    text = re.sub(r'(?<=\d)\s*k\s*[(\[][Jg]\s*[)\]]\b', 'kg', text)
-    text = re.sub(r'(?<=\d)\s*kq\b', 'kg', text)
-    text = re.sub(r'\b[lI1]<g\b', 'kg', text)
-    text = re.sub(r'\bI<g\b', 'kg', text)
-    text = re.sub(r'\bk[(\[]J[)\]]\b', 'kg', text)
-    text = re.sub(r'\bkq\b', 'kg', text)
-    
-    # ml variations
-    text = re.sub(r'(?<=\d)\s*rnl\b', 'ml', text)
-    text = re.sub(r'(?<=\d)\s*rn\s*l\b', 'ml', text)
-    text = re.sub(r'\brnl\b', 'ml', text)
-    text = re.sub(r'\bmll\b', 'ml', text)
-    
-    # Time intervals - H pattern
-    text = re.sub(r'\bti\s*-\s*1', '6-1', text)
-    text = re.sub(r'\b6\s*-\s*1\s*2\s*H\b', '6-12H', text)
-    text = re.sub(r'\b8\s*-\s*1\s*2\s*H\b', '8-12H', text)
-    text = re.sub(r'\b(\d+)\s*-\s*1\s*H\b', r'\1-12H', text)
-    text = re.sub(r'\bti-12H\b', '6-12H', text)
-    text = re.sub(r'\b8-l2H\b', '8-12H', text)
-    text = re.sub(r'\b(\d+)hr\b', r'\1H', text)
-    text = re.sub(r'\bllr\b', 'hr', text)
-    text = re.sub(r'\blhr\b', 'hr', text)
-    text = re.sub(r'\b8-24ft\b', '8-24H', text)
-    text = re.sub(r'\b6-12JI\b', '6-12H', text)
-    text = re.sub(r'\b12-24H-l\b', '12-24H', text)
-    
-    # Week patterns
-    text = re.sub(r'\b(\d+)wl<\b', r'\1wk', text)
-    text = re.sub(r'\bwl<\b', 'wk', text)
-    
-    # min variations
-    text = re.sub(r'(?<=\d)\s*rnin\b', 'min', text)
-    text = re.sub(r'\brnin\b', 'min', text)
-    text = re.sub(r'\bOrnin\b', '0min', text)
-    text = re.sub(r'\bOmin\b', '0min', text)
-    
-    # Fix common WORD OCR errors
-    text = re.sub(r'\bornl\b', 'oral', text, flags=re.IGNORECASE)
-    text = re.sub(r'\boml\b', 'oral', text, flags=re.IGNORECASE)
-    text = re.sub(r'\borul\b', 'oral', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bomI\b', 'oral', text, flags=re.IGNORECASE)
-    text = re.sub(r'\btl1en\b', 'then', text)
-    text = re.sub(r'\btl1on\b', 'then', text)
-    text = re.sub(r'\bthen1\b', 'then', text)
-    text = re.sub(r'\btnon\b', 'then', text)
-    text = re.sub(r'\bbeforc\b', 'before', text)
-    text = re.sub(r'\bbeforo\b', 'before', text)
-    text = re.sub(r'\bparacetarno1\b', 'paracetamol', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bparacetarnol\b', 'paracetamol', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bnarar,r,tclt\b', 'paracetamol', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bangioplasly\b', 'angioplasty', text)
-    text = re.sub(r'\bsoltn\b', 'solution', text)
-    text = re.sub(r'\bintratrac:l1eal\b', 'intratracheal', text)
-    text = re.sub(r'\bumoi\b', 'umol', text)
-    text = re.sub(r'\burnoi\b', 'umol', text)
-    text = re.sub(r'\bumolll\b', 'umol/L', text)
-    text = re.sub(r'\brnux\b', 'max', text)
-    text = re.sub(r'\brnax\b', 'max', text)
-    text = re.sub(r'\btub\b', 'tab', text)
-    text = re.sub(r'\btsb\b', 'tab', text)
-    text = re.sub(r'\btau\b', 'tab', text)
-    text = re.sub(r'\brepoat\b', 'repeat', text)
-    text = re.sub(r'\brepeat\b', 'repeat', text)
-    text = re.sub(r'\bdnily\b', 'daily', text)
-    text = re.sub(r'\bdni!y\b', 'daily', text)
-    text = re.sub(r'\brnane\b', 'mane', text)
-    text = re.sub(r'\bnocle\b', 'nocte', text)
-    text = re.sub(r'\benceph\b', 'encephalitis', text)
-    text = re.sub(r'\bcella\b', 'cellulitis', text)
-    text = re.sub(r'\binfsn\b', 'infusion', text)
-    text = re.sub(r'\bincr\b', 'increase', text)
-    text = re.sub(r'\breqd\b', 'required', text)
-    text = re.sub(r'\bprn\b', 'as needed', text)
-    text = re.sub(r'\bSec\b', 'See', text)
-    text = re.sub(r'\bSoo\b', 'See', text)
-    text = re.sub(r'\bSeu\b', 'See', text)
-    
-    #IV/IM variations
-    text = re.sub(r'\bUlV\b', 'IV', text)
-    text = re.sub(r'\bIVl\b', 'IM', text)
-    text = re.sub(r'\blVl\b', 'IM', text)
-    text = re.sub(r'\bIlV\b', 'IV', text)
-    
-    # Fix decimal points
-    text = re.sub(r'(\d+)\s*\.\s*(\d+)', r'\1.\2', text)
-    text = re.sub(r'(\d+)\s*_\s*(\d+)', r'\1.\2', text)
-    text = re.sub(r'0_1', '0.1', text)
-    text = re.sub(r'12\.ti', '12.5', text)
-    
-    # Fix percentages
-    text = re.sub(r'([0-9])\s*%', r'\1%', text)
-    
-    # Fix spacing around operators
-    text = re.sub(r'\s*\+\s*', ' + ', text)
-    text = re.sub(r'(\d+)\s*/\s*(\d+)', r'\1/\2', text)
-    
-    # Clean up garbage patterns
-    text = re.sub(r'[\\\\][\w]+', '', text)
-    text = re.sub(r'~', '-', text)
-    text = re.sub(r'--+', '-', text)
-    
-    # Remove soft hyphens
-    text = re.sub(r'[\u00ad\u200b\u200c\u200d]', '', text)
-    
-    # Fix double periods
-    text = re.sub(r'\.\.+', '.', text)
-    text = re.sub(r'\s+\. name', '. name', text)
-    text = re.sub(r'\.\s+\.', '.', text)
-    
-    # Normalize whitespace
-    text = re.sub(r'\s+', ' ', text)
-    text = re.sub(r'\s+,', ',', text)
-    
-    return text.strip()
+    return OCR_RULES.apply(text).strip()
+
+def clean_book(text, workers=1):
+    """
+    clean_text for the whole book. Serial by default; with several workers
+    (0 for one per core) the book is cut into chunks at page markers and each
+    worker cleans one (see parallel_clean.py). On the extracted book that has
+    been slower than the serial pass, so it is opt-in.
+    """
+    text = normalize_unicode(text)
+    return clean_parallel('parse_frank_shann_v3', text, workers).strip()
 
 def is_valid_drug_name(name):
     """Check if a name looks like a valid drug name"""
@@ -191,13 +57,13 @@ def is_valid_drug_name(name):
     
     return True
 
-def parse_frank_shann(file_path):
+def parse_frank_shann(file_path, workers=1):
     """Parse Frank Shann text file into structured drug data"""
     with open(file_path, 'r', encoding='utf-8') as f:
         content = f.read()
     
     # Clean the entire content first
-    content = clean_text(content)
+    content = clean_book(content, workers)
     
     # Find the start of drug list
     start_marker = "DRUGS ARE LISTED BY GENERIC NAME"
@@ -322,8 +188,12 @@ def parse_frank_shann(file_path):
     return final_data, rejected_count
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parse frank_shann_extracted.txt into src/frankShannData.json")
+    parser.add_argument("--workers", type=int, nargs="?", default=1, const=0,
+                        help="clean the book in this many worker processes (no number: one per core)")
+    args = parser.parse_args()
     print("Parsing Frank Shann extracted text...")
-    data, rejected = parse_frank_shann('frank_shann_extracted.txt')
+    data, rejected = parse_frank_shann('frank_shann_extracted.txt', args.workers)
     
     # Save to file
     output_file = 'src/frankShannData.json'
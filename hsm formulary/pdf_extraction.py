@@ -0,0 +1,531 @@
+"""
+Shared page-parallel PDF text extraction engine.
+
+Page ranges are split across a process pool; every worker opens its own
+document once (PyPDF2 by default, see extraction_backends.py) and extracts
+the pages it is handed. Results are written back
+in page order using the same "=== PAGE n ===" markers as the original scripts.
+Pages that have not changed since the last run come from the extraction cache.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from multiprocessing.connection import wait
+
+from extraction_backends import available_backends, get_backend, preferred_backend
+from extraction_cache import DEFAULT_CACHE_DIR, ExtractionCache
+from layout_detection import layout_pages
+from page_store import build_compressed_store, open_store
+
+# Output layouts used by the existing extract_* scripts
+PAGE_FORMAT = "=== PAGE {page_no} ===\n\n{text}\n\n"
+PAGE_MARKER = re.compile(r'^\s*===\s*PAGE\s*(\d+)\s*===\s*$')
+
+# Per-page budget of --supervised; supervision runs pages one at a time, so it is opt-in
+DEFAULT_PAGE_TIMEOUT = 120
+DEFAULT_MEMORY_LIMIT_MB = 2048
+
+_backend = None
+_document = None
+
+
+def _init_worker(pdf_path, backend_name=None):
+    """Open the document once per worker process with the chosen backend"""
+    global _backend, _document
+    _backend = get_backend(backend_name)
+    _document = _backend.open(pdf_path)
+
+
+def _extract_page(index, modes):
+    """Text of one page in each extraction mode, from a single decode where the backend allows"""
+    return _backend.extract_modes(_document, index, modes)
+
+
+def _extract_range(page_indices, modes):
+    """Extract a contiguous batch of pages inside a worker"""
+    return [_extract_page(i, modes) for i in page_indices]
+
+
+def count_pages(pdf_path):
+    """Return the number of pages in a PDF"""
+    import PyPDF2
+
+    return len(PyPDF2.PdfReader(pdf_path).pages)
+
+
+def split_ranges(page_indices, workers, batches_per_worker=4, max_batch_size=8):
+    """
+    Split page indices into contiguous batches, a few per worker for load
+    balancing and never more than max_batch_size pages so results stream back
+    while later batches are still being extracted.
+    """
+    page_indices = list(page_indices)
+    if not page_indices:
+        return []
+    batch_size = max(1, min(max_batch_size, -(-len(page_indices) // (workers * batches_per_worker))))
+    return [page_indices[i:i + batch_size] for i in range(0, len(page_indices), batch_size)]
+
+
+def _supervised_worker(pdf_path, backend_name, modes, memory_limit_mb, conn):
+    """
+    Worker loop for isolated extraction: one page at a time, under a memory
+    cap. Pages come in and results go back over this worker's own pipe.
+    """
+    if memory_limit_mb:
+        try:
+            import resource
+            limit = memory_limit_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError):
+            pass  # no address-space limit on this platform; the timeout still applies
+    _init_worker(pdf_path, backend_name)
+    for index in iter(conn.recv, None):
+        try:
+            conn.send((index, True, _extract_page(index, modes)))
+        except MemoryError:
+            conn.send((index, False, f"memory budget of {memory_limit_mb} MB exceeded"))
+        except Exception as e:
+            conn.send((index, False, f"{type(e).__name__}: {e}"))
+
+
+def _iter_supervised(pdf_path, page_indices, modes, backend, workers,
+                     page_timeout, memory_limit_mb):
+    """
+    Extract pages in isolated worker processes, one page per task, and yield
+    (index, text, error) in page_indices order. A page that runs past
+    page_timeout or kills its worker is reported with text None and the
+    worker is replaced, so the remaining pages carry on at full speed.
+
+    Every worker has a pipe of its own. A killed worker takes its pipe with
+    it, so it cannot leave a shared channel half written, and a result it
+    sends too late is never read.
+    """
+    ctx = multiprocessing.get_context()
+
+    def spawn():
+        conn, child_conn = ctx.Pipe()
+        process = ctx.Process(target=_supervised_worker, daemon=True,
+                              args=(pdf_path, backend, modes, memory_limit_mb, child_conn))
+        process.start()
+        child_conn.close()
+        return {"process": process, "conn": conn, "index": None, "started": None}
+
+    def fail(slot, error):
+        done[slot["index"]] = (None, error)
+        slot["process"].kill()
+        slot["process"].join()
+        slot["conn"].close()
+        slots[slots.index(slot)] = spawn()
+
+    order = list(page_indices)
+    window = workers * 4
+    queued = deque(range(len(order)))
+    done = {}
+    next_pos = 0
+    slots = [spawn() for _ in range(min(workers, len(order)))]
+    try:
+        while next_pos < len(order):
+            for slot in slots:
+                if slot["index"] is None and queued and queued[0] < next_pos + window:
+                    slot["index"] = order[queued.popleft()]
+                    slot["started"] = time.monotonic()
+                    slot["conn"].send(slot["index"])
+
+            busy = [slot for slot in slots if slot["index"] is not None]
+            timeout = 0.5
+            if page_timeout and busy:
+                deadline = min(slot["started"] for slot in busy) + page_timeout
+                timeout = max(0.0, min(timeout, deadline - time.monotonic()))
+            ready = wait([slot["conn"] for slot in busy], timeout)
+            for slot in busy:
+                if slot["conn"] not in ready:
+                    continue
+                try:
+                    index, ok, payload = slot["conn"].recv()
+                except EOFError:
+                    slot["process"].join(timeout=1)
+                    fail(slot, f"worker died (exit code {slot['process'].exitcode})")
+                    continue
+                slot["index"] = None
+                done[index] = (payload, None) if ok else (None, payload)
+
+            now = time.monotonic()
+            for slot in list(slots):
+                if slot["index"] is None:
+                    continue
+                if page_timeout and now - slot["started"] > page_timeout:
+                    fail(slot, f"timed out after {page_timeout}s")
+                elif not slot["process"].is_alive():
+                    fail(slot, f"worker died (exit code {slot['process'].exitcode})")
+
+            while next_pos < len(order) and order[next_pos] in done:
+                index = order[next_pos]
+                text, error = done.pop(index)
+                yield index, text, error
+                next_pos += 1
+    finally:
+        for slot in slots:
+            try:
+                slot["conn"].send(None)
+            except OSError:
+                pass  # the worker is already gone
+        for slot in slots:
+            slot["process"].join(timeout=1)
+            if slot["process"].is_alive():
+                slot["process"].kill()
+            slot["conn"].close()
+
+
+def iter_pages(pdf_path, page_indices=None, extraction_mode="plain", workers=None,
+               cache_dir=DEFAULT_CACHE_DIR, backend=None, page_timeout=None,
+               memory_limit_mb=None, failures=None):
+    """
+    Lazily yield (page_no, text) tuples in page order, page_no being 1-based.
+
+    Only a small window of batches is in flight at once, so memory stays at a
+    few pages and the caller can parse early pages while later ones are still
+    being extracted. Cached pages are read from disk as they are reached; only
+    new or changed pages are extracted. Pass cache_dir=None to bypass the cache.
+
+    backend defaults to the one recorded for this document by
+    "python extraction_backends.py bench", falling back to PyPDF2, and is
+    chosen per mode: ("plain", "layout") keeps plain on its own backend even
+    when only another backend has layout.
+
+    extraction_mode may also be a tuple such as ("plain", "layout"): each page
+    is yielded as (page_no, (plain_text, layout_text)). Only PyPDF2's plain
+    and columns modes share one parse of the content stream; layout is
+    always parsed on its own, and with the PyPDF2 releases that lack layout
+    mode it comes from another backend, in a stream of its own.
+    extraction_mode="auto" uses layout only on pages that score as tables
+    (see layout_detection.py) and plain everywhere else.
+    extraction_mode="columns" reads two-column pages column by column (see
+    column_order.py).
+
+    With page_timeout (seconds) or memory_limit_mb set, every page runs alone
+    in an isolated worker under that budget. Pages that exceed it are yielded
+    as empty text, left out of the cache, and appended to the failures list
+    as {"page": page_no, "error": reason}.
+    """
+    if extraction_mode == "auto":
+        yield from _iter_auto(pdf_path, page_indices, workers, cache_dir, backend,
+                              page_timeout, memory_limit_mb, failures)
+        return
+
+    modes = (extraction_mode,) if isinstance(extraction_mode, str) else tuple(extraction_mode)
+    if backend is None:
+        chosen = [preferred_backend(pdf_path, mode, cache_dir) for mode in modes]
+        if len(set(chosen)) > 1:
+            yield from _iter_per_mode(pdf_path, page_indices, modes, chosen, workers, cache_dir,
+                                      page_timeout, memory_limit_mb, failures)
+            return
+        backend = chosen[0]
+    workers = workers or os.cpu_count() or 1
+    # The library version is part of the key: another release may extract differently
+    version = get_backend(backend).version
+    cache_keys = [f"{backend}-{version}.{mode}" for mode in modes]
+    cache = ExtractionCache(cache_dir) if cache_dir is not None else None
+    digests = cache.page_digests(pdf_path) if cache else None
+    if page_indices is None:
+        page_indices = range(len(digests) if digests else count_pages(pdf_path))
+    page_indices = list(page_indices)
+
+    def cached_text(i):
+        if not cache:
+            return None
+        texts = tuple(cache.get(digests[i], key) for key in cache_keys)
+        return None if None in texts else texts
+
+    def store(i, texts):
+        if cache:
+            for key, text in zip(cache_keys, texts):
+                cache.put(digests[i], key, text)
+
+    def result(i, texts):
+        return i + 1, texts if len(modes) > 1 else texts[0]
+
+    misses = [i for i in page_indices
+              if not (cache and all(cache.has(digests[i], key) for key in cache_keys))]
+    if misses and (page_timeout or memory_limit_mb):
+        extracted = _iter_supervised(pdf_path, misses, modes, backend, workers,
+                                     page_timeout, memory_limit_mb)
+        for i in page_indices:
+            text = cached_text(i)
+            if text is None:
+                _, text, error = next(extracted)
+                if error is None:
+                    store(i, text)
+                else:
+                    if failures is not None:
+                        failures.append({"page": i + 1, "error": error})
+                    text = ("",) * len(modes)
+            yield result(i, text)
+        return
+
+    if workers == 1 or len(misses) < 2:
+        # Local, not the worker globals: streams of several modes run side by side
+        engine = get_backend(backend)
+        document = engine.open(pdf_path) if misses else None
+        for i in page_indices:
+            text = cached_text(i)
+            if text is None:
+                text = engine.extract_modes(document, i, modes)
+                store(i, text)
+            yield result(i, text)
+        return
+
+    batches = split_ranges(page_indices, workers)
+    with ProcessPoolExecutor(max_workers=min(workers, len(batches)),
+                             initializer=_init_worker, initargs=(pdf_path, backend)) as pool:
+        pending = deque()
+
+        def submit(batch):
+            cached = {i: cached_text(i) for i in batch}
+            missing = [i for i in batch if cached[i] is None]
+            future = pool.submit(_extract_range, missing, modes) if missing else None
+            pending.append((batch, cached, missing, future))
+
+        remaining = iter(batches)
+        for batch in islice(remaining, workers * 2):
+            submit(batch)
+
+        while pending:
+            batch, texts, missing, future = pending.popleft()
+            next_batch = next(remaining, None)
+            if next_batch is not None:
+                submit(next_batch)
+            if future is not None:
+                for i, text in zip(missing, future.result()):
+                    store(i, text)
+                    texts[i] = text
+            for i in batch:
+                yield result(i, texts[i])
+
+
+def _iter_per_mode(pdf_path, page_indices, modes, backends, workers, cache_dir, page_timeout,
+                   memory_limit_mb, failures):
+    """
+    One stream per mode, each from its own backend, zipped into (page_no,
+    texts). Used when the modes' backends differ: a shared decode on one
+    backend would change the text of the others.
+    """
+    if page_indices is None:
+        page_indices = range(count_pages(pdf_path))
+    page_indices = list(page_indices)
+    streams = [iter_pages(pdf_path, page_indices, mode, workers, cache_dir, backend,
+                          page_timeout, memory_limit_mb, failures)
+               for mode, backend in zip(modes, backends)]
+    for pages in zip(*streams):
+        yield pages[0][0], tuple(text for _, text in pages)
+
+
+def _iter_auto(pdf_path, page_indices, *args):
+    """Merge a plain stream of prose pages and a layout stream of table pages in page order"""
+    if page_indices is None:
+        page_indices = range(count_pages(pdf_path))
+    page_indices = list(page_indices)
+    layout = layout_pages(pdf_path, page_indices)
+    plain_pages = iter_pages(pdf_path, [i for i in page_indices if i not in layout], "plain", *args)
+    table_pages = iter_pages(pdf_path, [i for i in page_indices if i in layout], "layout", *args)
+    for i in page_indices:
+        yield next(table_pages if i in layout else plain_pages)
+
+
+def extract_pages(pdf_path, page_indices=None, extraction_mode="plain", workers=None,
+                  cache_dir=DEFAULT_CACHE_DIR, backend=None):
+    """Extract pages eagerly; returns the list of (page_no, text) tuples from iter_pages"""
+    return list(iter_pages(pdf_path, page_indices, extraction_mode, workers, cache_dir, backend))
+
+
+def read_text_pages(path):
+    """
+    Lazily yield (page_no, text) tuples from an extracted "=== PAGE n ===" text file.
+
+    The file is read line by line, so only one page is held in memory at a time.
+    """
+    page_no = 0
+    lines = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            marker = PAGE_MARKER.match(line)
+            if marker:
+                if page_no or ''.join(lines).strip():
+                    yield page_no, ''.join(lines).strip('\n')
+                page_no = int(marker.group(1))
+                lines = []
+            else:
+                lines.append(line)
+    if page_no or ''.join(lines).strip():
+        yield page_no, ''.join(lines).strip('\n')
+
+
+def iter_page_lines(pages, with_markers=False):
+    """
+    Yield the lines of each (page_no, text) page in order, optionally preceded
+    by the "=== PAGE n ===" marker line found in the extracted text files.
+    """
+    for page_no, text in pages:
+        if with_markers:
+            yield f"=== PAGE {page_no} ==="
+        yield from text.split('\n')
+
+
+def _store_pages(path):
+    """Pages of a page store, closing it once they are read or the caller stops"""
+    with open_store(path) as store:
+        yield from store
+
+
+def open_pages(source, **kwargs):
+    """
+    Resolve a page source for the parsers: a PDF path is streamed through
+    iter_pages, a .pages or .pagez path is read from a page store, any other
+    path is read as an extracted text file, and an iterable of (page_no, text)
+    tuples is passed through unchanged.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        if path.lower().endswith('.pdf'):
+            return iter_pages(path, **kwargs)
+        if path.endswith(('.pages', '.pagez')):
+            return _store_pages(path)
+        return read_text_pages(path)
+    return iter(source)
+
+
+def write_pages(pages, output_path, page_format=PAGE_FORMAT, separator="", encoding='utf-8'):
+    """Write (page_no, text) tuples to a text file using the given page layout"""
+    count = 0
+    with open(output_path, 'w', encoding=encoding) as out_file:
+        for page_no, text in pages:
+            if count:
+                out_file.write(separator)
+            out_file.write(page_format.format(page_no=page_no, text=text))
+            count += 1
+    return count
+
+
+def _record_failures(output_path, pdf_path, extraction_mode, failures):
+    """Write <output_path>.failures.json for failed pages, or remove a stale one"""
+    manifest_path = f"{output_path}.failures.json"
+    if failures:
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump({"pdf": pdf_path, "extractionMode": extraction_mode, "failures": failures},
+                      f, indent=2)
+        print(f"⚠ {len(failures)} pages failed, see {manifest_path}")
+    elif os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+
+def _reporting(pages, progress):
+    """Pass pages through, calling progress with the running count after each one"""
+    for count, page in enumerate(pages, 1):
+        yield page
+        progress(count)
+
+
+def extract_to_file(pdf_path, output_path, page_indices=None, extraction_mode="plain",
+                    workers=None, page_format=PAGE_FORMAT, separator="",
+                    cache_dir=DEFAULT_CACHE_DIR, backend=None, page_timeout=None, memory_limit_mb=None,
+                    progress=None):
+    """
+    Extract a PDF in parallel and write it in the standard page-marker format,
+    or as a compressed page store when output_path ends in .pagez.
+
+    With page_timeout or memory_limit_mb set (see iter_pages), pages that blow
+    the budget are written empty and listed in <output_path>.failures.json;
+    a clean run removes any stale manifest.
+
+    progress, if given, is called with the number of pages written so far
+    after each page.
+    """
+    failures = []
+    pages = iter_pages(pdf_path, page_indices, extraction_mode, workers, cache_dir, backend,
+                       page_timeout, memory_limit_mb, failures)
+    if progress is not None:
+        pages = _reporting(pages, progress)
+    if output_path.endswith('.pagez'):
+        count = build_compressed_store(pages, output_path)
+    else:
+        count = write_pages(pages, output_path, page_format, separator)
+    _record_failures(output_path, pdf_path, extraction_mode, failures)
+    return count
+
+
+def extract_to_files(pdf_path, outputs, page_indices=None, workers=None,
+                     page_format=PAGE_FORMAT, separator="", cache_dir=DEFAULT_CACHE_DIR,
+                     backend=None, page_timeout=None, memory_limit_mb=None):
+    """
+    Write several extraction modes in one pass, e.g.
+    outputs={"plain": "counseling_pdf_content.txt", "layout": "counseling_pdf_layout.txt"}.
+    Modes on the same backend share one parse of each page.
+    """
+    modes = tuple(outputs)
+    failures = []
+    pages = iter_pages(pdf_path, page_indices, modes, workers, cache_dir, backend,
+                       page_timeout, memory_limit_mb, failures)
+    files = [open(outputs[mode], 'w', encoding='utf-8') for mode in modes]
+    count = 0
+    try:
+        for page_no, texts in pages:
+            for out_file, text in zip(files, texts):
+                if count:
+                    out_file.write(separator)
+                out_file.write(page_format.format(page_no=page_no, text=text))
+            count += 1
+    finally:
+        for out_file in files:
+            out_file.close()
+    for mode in modes:
+        _record_failures(outputs[mode], pdf_path, mode, failures)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel PDF text extraction")
+    parser.add_argument("pdf_path")
+    parser.add_argument("output_path")
+    parser.add_argument("--layout", action="store_true", help="use layout extraction mode")
+    parser.add_argument("--auto-layout", action="store_true",
+                        help="use layout mode only on pages detected as tables")
+    parser.add_argument("--columns", action="store_true",
+                        help="read two-column pages in column order")
+    parser.add_argument("--layout-output", default=None,
+                        help="also write layout text here, from the same pass over the PDF")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-cache", action="store_true", help="ignore the page extraction cache")
+    parser.add_argument("--backend", choices=sorted(available_backends()), default=None,
+                        help="extraction backend (default: benchmarked choice or pypdf2)")
+    parser.add_argument("--supervised", action="store_true",
+                        help=f"run every page in an isolated worker under a budget of "
+                             f"{DEFAULT_PAGE_TIMEOUT}s and {DEFAULT_MEMORY_LIMIT_MB} MB")
+    parser.add_argument("--page-timeout", type=float, default=None,
+                        help="seconds allowed per page, 0 to disable (implies --supervised)")
+    parser.add_argument("--memory-limit", type=int, default=None,
+                        help="MB of address space per worker, 0 to disable (implies --supervised)")
+    args = parser.parse_args()
+    if args.supervised:
+        args.page_timeout = DEFAULT_PAGE_TIMEOUT if args.page_timeout is None else args.page_timeout
+        args.memory_limit = DEFAULT_MEMORY_LIMIT_MB if args.memory_limit is None else args.memory_limit
+
+    mode = ("auto" if args.auto_layout else "layout" if args.layout else
+            "columns" if args.columns else "plain")
+    options = dict(workers=args.workers, cache_dir=None if args.no_cache else DEFAULT_CACHE_DIR,
+                   backend=args.backend, page_timeout=args.page_timeout,
+                   memory_limit_mb=args.memory_limit)
+    if args.layout_output:
+        count = extract_to_files(args.pdf_path, {"plain": args.output_path,
+                                                 "layout": args.layout_output}, **options)
+    else:
+        count = extract_to_file(args.pdf_path, args.output_path, extraction_mode=mode, **options)
+    print(f"✓ Extracted {count} pages to {args.output_path}")
+
+
+if __name__ == "__main__":
+    main()
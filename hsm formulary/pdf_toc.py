@@ -0,0 +1,167 @@
+"""
+Table-of-contents driven page targeting.
+
+Maps every drug monograph or chapter listed in a PDF's table of contents to
+its span of PDF page indices, so callers can extract just the pages they need
+(e.g. one counseling monograph in layout mode) instead of the whole document.
+
+The PDF outline (bookmarks) is used when present, which is what the
+paediatric protocols rely on: their printed TOC comes out of extract_text
+with titles and page numbers in scrambled columns. Otherwise the printed TOC
+pages are parsed from plain text, accepting dotted leaders or a page number
+at the end of a chapter line:
+    Amlodipine ........................ 23          (counseling form)
+    Chapter 26: Ophthalmia Neonatorum 88
+Printed page numbers are converted to PDF page indices by probing a few pages
+for the entry's title.
+"""
+import json
+import os
+import re
+from collections import Counter
+
+from extraction_cache import DEFAULT_CACHE_DIR, file_digest, write_atomic
+from pdf_extraction import count_pages, iter_pages
+
+DOTTED_ENTRY = re.compile(r'([A-Za-z(][^.]*?)\s*\.{4,}\s*(\d+)')
+CHAPTER_ENTRY = re.compile(r'^\s*(Chapter\s+\d+\s*:.*?)\s+(\d{1,4})\s*$', re.MULTILINE)
+TOC_HEADING = re.compile(r'CONTENTS|\(\s*PART\s+[A-Z]\s*:[^)]*\)', re.IGNORECASE)
+
+MAX_TOC_PAGES = 20
+MAX_OFFSET = 30
+
+
+def _squash(text):
+    """Lower-case text with all whitespace removed, for fuzzy title matching"""
+    return re.sub(r'\s+', '', text).lower()
+
+
+def parse_toc_text(text):
+    """Return [(title, printed_page)] entries found on one TOC page"""
+    flat = TOC_HEADING.sub(' ', re.sub(r'\s+', ' ', text))
+    entries = [(title.strip(), int(page)) for title, page in DOTTED_ENTRY.findall(flat)]
+    if entries:
+        return entries
+    return [(title.strip(), int(page)) for title, page in CHAPTER_ENTRY.findall(text)]
+
+
+def _outline_entries(reader):
+    """Flatten the PDF outline into [(title, page_index)]"""
+    entries = []
+
+    def walk(items):
+        for item in items:
+            if isinstance(item, list):
+                walk(item)
+            else:
+                try:
+                    entries.append((str(item.title).strip(), reader.get_destination_page_number(item)))
+                except Exception:
+                    continue
+
+    try:
+        walk(reader.outline)
+    except Exception:
+        return []
+    return entries
+
+
+def _find_offset(reader, entries):
+    """
+    Find printed page -> page index offset by probing pages for entry titles,
+    or None when no title is found. Pages are read straight from the open
+    reader, each at most once.
+    """
+    num_pages = len(reader.pages)
+    texts = {}
+    votes = Counter()
+    probes = [e for e in entries if len(_squash(e[0])) >= 5][:3]
+    for title, printed in probes:
+        needle = _squash(title)[:30]
+        for step in range(2 * MAX_OFFSET + 1):
+            offset = (step + 1) // 2 * (1 if step % 2 else -1)
+            index = printed + offset
+            if not 0 <= index < num_pages:
+                continue
+            if index not in texts:
+                texts[index] = _squash(reader.pages[index].extract_text())
+            if needle in texts[index]:
+                votes[offset] += 1
+                break
+    return votes.most_common(1)[0][0] if votes else None
+
+
+def read_toc(pdf_path, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Return [(title, first_page_index)] for a PDF, in document order.
+    The result is stored next to the page cache, keyed by the PDF digest;
+    an empty TOC, or one whose page offset could not be found, is not stored.
+    """
+    toc_path = None
+    if cache_dir is not None:
+        toc_path = os.path.join(cache_dir, 'toc', f"{file_digest(pdf_path)}.json")
+        if os.path.exists(toc_path):
+            with open(toc_path, 'r', encoding='utf-8') as f:
+                return [tuple(entry) for entry in json.load(f)]
+
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(pdf_path)
+    num_pages = len(reader.pages)
+    entries = _outline_entries(reader)
+    settled = True
+
+    if not entries:
+        printed = []
+        seen_toc = False
+        for page_no, text in iter_pages(pdf_path, range(min(MAX_TOC_PAGES, num_pages)),
+                                        cache_dir=cache_dir):
+            page_entries = parse_toc_text(text)
+            if page_entries:
+                printed.extend(page_entries)
+                seen_toc = True
+            elif seen_toc:
+                break
+        offset = _find_offset(reader, printed)
+        settled = offset is not None
+        offset = offset or 0
+        entries = [(title, page + offset) for title, page in printed
+                   if 0 <= page + offset < num_pages]
+
+    entries.sort(key=lambda entry: entry[1])
+    if toc_path and entries and settled:
+        write_atomic(toc_path, json.dumps(entries))
+    return entries
+
+
+def toc_spans(entries, num_pages):
+    """Turn [(title, first_page_index)] into [(title, start, stop)] page spans"""
+    spans = []
+    for i, (title, start) in enumerate(entries):
+        stop = num_pages
+        for _, next_start in entries[i + 1:]:
+            if next_start > start:
+                stop = next_start
+                break
+        # A monograph may share its first page with the tail of the previous one
+        spans.append((title, start, max(stop, start + 1)))
+    return spans
+
+
+def select_spans(spans, names):
+    """Spans whose title contains any of the requested names (case-insensitive)"""
+    wanted = [_squash(name) for name in names]
+    return [span for span in spans if any(name in _squash(span[0]) for name in wanted)]
+
+
+def pages_for(pdf_path, names, cache_dir=DEFAULT_CACHE_DIR):
+    """Sorted page indices covering the requested drugs or chapters"""
+    spans = select_spans(toc_spans(read_toc(pdf_path, cache_dir), count_pages(pdf_path)), names)
+    return sorted({i for _, start, stop in spans for i in range(start, stop)})
+
+
+def iter_toc_pages(pdf_path, names, extraction_mode="plain", workers=None,
+                   cache_dir=DEFAULT_CACHE_DIR):
+    """Lazily yield (page_no, text) for only the pages of the requested drugs or chapters"""
+    return iter_pages(pdf_path, pages_for(pdf_path, names, cache_dir), extraction_mode,
+                      workers, cache_dir)
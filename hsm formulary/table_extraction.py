@@ -0,0 +1,167 @@
+"""
+Coordinate-based table extraction.
+
+extract_text flattens a table: the cells of a row come out in content
+stream order and multi-line cells interleave with their neighbours. Here
+every text run is captured with its position through PyPDF2's visitor_text
+callback, then clustered with NumPy: runs into rows by baseline, the runs of
+a row into cells where the white space between them is wide, and cells into
+columns by where they start.
+
+Usage:
+    python table_extraction.py "public/Abx Regime HSM 2017.pdf" [page ...]
+"""
+import sys
+
+import numpy as np
+import PyPDF2
+from PyPDF2.generic import ContentStream, NameObject
+
+# Baselines of one row are at most this many points apart
+ROW_TOLERANCE = 3.0
+# Average glyph width in ems, used to estimate where a run ends
+CHAR_WIDTH = 0.45
+# White space, in ems, that separates two cells of a row
+CELL_GAP = 0.3
+# Cell starts of one column are chained at most this many points apart
+COLUMN_TOLERANCE = 15.0
+# Operators that show text, each followed by IDENTITY cm in page_runs
+SHOW_OPERATORS = (b'Tj', b'TJ', b"'", b'"')
+IDENTITY = [1.0, 0.0, 0.0, 1.0, 0.0, 0.0]
+
+
+def page_runs(page, content=None):
+    """
+    Text runs of a page as (x, y, font size, text) in user space, in content
+    stream order, one per text-showing operator. PyPDF2 only reports text
+    when a later operator flushes it, with the matrix in effect by then, and
+    joins shows on one baseline into one run. The page is read from a copy
+    of its content with an identity cm after every show: cm flushes the text
+    at once, at the matrix it was shown with, and moves nothing.
+
+    content is the page's already parsed ContentStream, if the caller has
+    one; it is read, not changed.
+    """
+    if NameObject('/Contents') not in page:
+        return []
+    if content is None:
+        content = ContentStream(page['/Contents'], page.pdf, 'bytes')
+    operations = []
+    for operands, operator in content.operations:
+        operations.append((operands, operator))
+        if operator in SHOW_OPERATORS:
+            operations.append((IDENTITY, b'cm'))
+    flushed_content = ContentStream(None, page.pdf)
+    flushed_content.operations = operations
+    flushed = PyPDF2.PageObject(page.pdf)
+    flushed.update(page)
+    flushed[NameObject('/Contents')] = flushed_content
+
+    runs = []
+
+    def visit(text, cm, tm, font, size):
+        if text.strip():
+            x = tm[4] * cm[0] + tm[5] * cm[2] + cm[4]
+            y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+            scale = abs(tm[3] * cm[3]) or 1.0
+            runs.append((x, y, size * scale, text.rstrip('\n')))
+
+    flushed.extract_text(visitor_text=visit)
+    return runs
+
+
+def cluster(values, tolerance):
+    """
+    Label 1-D positions so that sorted neighbours at most tolerance apart
+    share a label. Labels count up from the smallest value.
+    """
+    values = np.asarray(values, dtype=float)
+    labels = np.empty(len(values), dtype=int)
+    if not len(values):
+        return labels
+    order = np.argsort(values, kind='stable')
+    labels[order] = np.concatenate(([0], np.cumsum(np.diff(values[order]) > tolerance)))
+    return labels
+
+
+def group_rows(runs, tolerance=ROW_TOLERANCE):
+    """Runs grouped into rows, top of the page first, each row sorted left to right"""
+    if not runs:
+        return []
+    labels = cluster([-y for _, y, _, _ in runs], tolerance)
+    rows = [[] for _ in range(labels.max() + 1)]
+    for label, run in zip(labels, runs):
+        rows[label].append(run)
+    return [sorted(row, key=lambda run: run[0]) for row in rows]
+
+
+def join_runs(runs):
+    """Text of neighbouring runs, with a space where the gap between them is wider than a space's worth"""
+    text = ''
+    end = None
+    for x, _, size, run_text in runs:
+        if text and end is not None and x - end > size * CHAR_WIDTH / 2 \
+                and not text[-1].isspace() and not run_text[0].isspace():
+            text += ' '
+        text += run_text
+        end = x + len(run_text) * size * CHAR_WIDTH
+    return ' '.join(text.split())
+
+
+def row_cells(row, gap=CELL_GAP):
+    """
+    Merge the runs of one row into cells (x0, x1, text), a new cell starting
+    wherever the estimated gap after the previous run exceeds gap ems
+    """
+    if not row:
+        return []
+    x = np.array([run[0] for run in row])
+    size = np.array([run[2] for run in row])
+    end = x + np.array([len(run[3]) for run in row]) * size * CHAR_WIDTH
+    breaks = np.flatnonzero(x[1:] - end[:-1] > size[1:] * gap) + 1
+    cells = []
+    for start, stop in zip(np.concatenate(([0], breaks)), np.concatenate((breaks, [len(row)]))):
+        text = join_runs(row[start:stop])
+        if text:
+            cells.append((float(x[start]), float(end[start:stop].max()), text))
+    return cells
+
+
+def assign_columns(rows, tolerance=COLUMN_TOLERANCE):
+    """
+    Column index of every cell in rows of cells, clustering cell starts
+    across all rows. Returns ([{column: text}, ...], number of columns);
+    two cells of a row in one column are joined.
+    """
+    labels = cluster([cell[0] for cells in rows for cell in cells], tolerance)
+    count = int(labels.max()) + 1 if len(labels) else 0
+    labels = iter(labels.tolist())
+    table = []
+    for cells in rows:
+        columns = {}
+        for _, _, text in cells:
+            column = next(labels)
+            columns[column] = f"{columns[column]} {text}" if column in columns else text
+        table.append(columns)
+    return table, count
+
+
+def page_table(page):
+    """Every row of a page as a list of cells (x0, x1, text)"""
+    return [row_cells(row) for row in group_rows(page_runs(page))]
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    reader = PyPDF2.PdfReader(sys.argv[1])
+    pages = [int(n) for n in sys.argv[2:]] or range(1, len(reader.pages) + 1)
+    for page_no in pages:
+        print(f"=== PAGE {page_no} ===")
+        for cells in page_table(reader.pages[page_no - 1]):
+            print(' | '.join(f"{x0:5.0f} {text}" for x0, _, text in cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""
+Tests for the Aho-Corasick automaton on small pattern sets.
+
+Run with: python -m pytest test_aho_corasick.py
+"""
+import pytest
+
+from aho_corasick import AhoCorasick
+
+
+def test_every_occurrence_is_found_overlaps_included_by_end_position():
+    automaton = AhoCorasick(["he", "she", "his", "hers"])
+    assert list(automaton.iter_matches("ushers")) == [(1, 4, 1), (2, 4, 0), (2, 6, 3)]
+
+
+def test_matches_continue_through_failure_links():
+    automaton = AhoCorasick(["Amikacin Injection", "Amikacin", "kacin"])
+    text = "Amikacin. Amikacin Injection"
+    assert sorted((start, end) for start, end, _ in automaton.iter_matches(text)) == [
+        (0, 8), (3, 8), (10, 18), (10, 28), (13, 18)]
+
+
+def test_no_patterns_in_text_and_empty_patterns():
+    assert list(AhoCorasick(["abc"]).iter_matches("ababd")) == []
+    with pytest.raises(ValueError):
+        AhoCorasick(["ab", ""])
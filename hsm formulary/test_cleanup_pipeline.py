@@ -0,0 +1,47 @@
+"""
+Tests for remembered no-op stages in the cleanup pipeline.
+
+Run with: python -m pytest test_cleanup_pipeline.py
+"""
+from cleanup_pipeline import CleanupStage, Pipeline
+
+
+def strip_dosage(entry):
+    cleaned = entry["dosage"].strip()
+    changed = cleaned != entry["dosage"]
+    entry["dosage"] = cleaned
+    return changed
+
+
+def double_name(entry):
+    entry["name"] += entry["name"]
+    return True
+
+
+def test_second_run_skips_stages_that_settled_on_the_first(tmp_path):
+    pipeline = Pipeline([CleanupStage("strip", strip_dosage)], str(tmp_path))
+    records = [{"name": "Aspirin", "dosage": " 10 mg/kg "}]
+
+    first = pipeline.run(records)
+    assert first[0]["changed"] == 1 and not first[0]["skipped"]
+    assert records == [{"name": "Aspirin", "dosage": "10 mg/kg"}]
+
+    second = pipeline.run(records)
+    assert second[0]["skipped"]
+
+
+def test_stage_that_keeps_changing_its_output_is_never_skipped(tmp_path):
+    pipeline = Pipeline([CleanupStage("strip", strip_dosage), CleanupStage("double", double_name)],
+                        str(tmp_path))
+    records = [{"name": "A", "dosage": " x "}]
+    pipeline.run(records)
+    second = pipeline.run(records)
+    assert [report["skipped"] for report in second] == [True, False]
+    assert records[0]["name"] == "AAAA"
+
+
+def test_no_skip_runs_every_stage(tmp_path):
+    pipeline = Pipeline([CleanupStage("strip", strip_dosage)], str(tmp_path))
+    records = [{"name": "A", "dosage": "x"}]
+    pipeline.run(records)
+    assert not pipeline.run(records, skip_unchanged=False)[0]["skipped"]
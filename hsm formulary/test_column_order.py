@@ -0,0 +1,62 @@
+"""
+Tests for page_runs and column reading order on small generated pages.
+
+Run with: python -m pytest test_column_order.py
+"""
+import os
+import subprocess
+import sys
+from io import BytesIO
+
+import PyPDF2
+
+from column_order import column_lines, find_gutter
+from table_extraction import page_runs
+
+
+def one_page_pdf(content):
+    """A one-page PDF, Helvetica as /F1, whose content stream is content"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return PyPDF2.PdfReader(BytesIO(pdf)).pages[0]
+
+
+def test_td_lines_keep_their_own_position():
+    page = one_page_pdf(b"BT /F1 10 Tf 50 700 Td (line one) Tj 0 -12 Td (line two) Tj "
+                        b"0 -12 Td (line three) Tj 0 -12 Td (line four) Tj ET")
+    runs = page_runs(page)
+    assert [(x, y, text) for x, y, _, text in runs] == [
+        (50, 700, 'line one'), (50, 688, 'line two'), (50, 676, 'line three'), (50, 664, 'line four')]
+    assert column_lines(runs) == ['line one', 'line two', 'line three', 'line four']
+
+
+def test_interleaved_tm_columns_are_read_column_by_column():
+    rows = b" ".join(b"1 0 0 1 50 %d Tm (Left %d) Tj 1 0 0 1 320 %d Tm (Right %d) Tj" % (700 - 12 * i, i, 700 - 12 * i, i)
+                     for i in range(5))
+    page = one_page_pdf(b"BT /F1 10 Tf " + rows + b" ET")
+    runs = page_runs(page)
+    assert len(runs) == 10
+    assert [run[0] for run in runs[:2]] == [50, 320]
+    assert find_gutter(runs) is not None
+    assert column_lines(runs) == [f'Left {i}' for i in range(5)] + [f'Right {i}' for i in range(5)]
+
+
+def test_columns_flag_is_refused_for_a_text_source():
+    result = subprocess.run([sys.executable, "parse_frank_shann.py", "--columns", "frank_shann_extracted.txt"],
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert result.returncode == 2 and "--columns needs a PDF source" in result.stderr
@@ -0,0 +1,45 @@
+"""
+Tests for splitting Frank Shann records that hold several drug entries.
+
+Run with: python -m pytest test_entry_splitter.py
+"""
+from entry_splitter import EntrySplitter
+
+SPLITTER = EntrySplitter(["Abacavir", "Amlodipine", "Ceftriaxone", "Zidovudine"])
+
+
+def entry(entry_id, dosage, name="Acyclovir"):
+    return {"id": entry_id, "name": name, "dosage": dosage}
+
+
+def test_embedded_entry_is_split_at_its_name():
+    parts = SPLITTER.split(entry("fs-0001", "5mg/kg oral. Abacavir 600mg + lamivudine 300mg. >16yr: 1 tab daily."))
+    assert [(part["name"], part["dosage"]) for part in parts] == [
+        ("Acyclovir", "5mg/kg oral."),
+        ("Abacavir 600mg + lamivudine 300mg", ">16yr: 1 tab daily."),
+    ]
+
+
+def test_dose_sentences_and_mentions_are_not_split():
+    dosage = "Meningitis. Ceftriaxone 50mg/kg daily IV. Give with oral Amlodipine."
+    assert SPLITTER.split(entry("fs-0001", dosage)) == [entry("fs-0001", dosage)]
+
+
+def test_no_split_leaves_an_entry_without_dosage():
+    dosage = "G% oral Amlodipine. Amlodipine + olmesartan."
+    assert SPLITTER.split(entry("fs-0001", dosage)) == [entry("fs-0001", dosage)]
+    parts = SPLITTER.split(entry("fs-0001", "5mg oral. Abacavir 600mg. Zidovudine 300mg. 1 tab bd."))
+    assert [(part["name"], part["dosage"]) for part in parts] == [
+        ("Acyclovir", "5mg oral. Abacavir 600mg."),
+        ("Zidovudine 300mg", "1 tab bd."),
+    ]
+
+
+def test_split_records_keep_their_ids():
+    records = [entry("fs-0001", "5mg oral."),
+               entry("fs-0003", "5mg oral. Abacavir 600mg. 1 tab. Zidovudine 300mg. 1 tab bd."),
+               entry("fs-0004", "10mg oral.")]
+    result, split_count = SPLITTER.split_records(records)
+    assert split_count == 1
+    assert [part["id"] for part in result] == ["fs-0001", "fs-0003", "fs-0003-2", "fs-0003-3", "fs-0004"]
+    assert SPLITTER.split_records(result) == (result, 0)
@@ -0,0 +1,51 @@
+"""
+Tests for extracting several modes from one parse of a page.
+
+Run with: python -m pytest test_extraction_backends.py
+"""
+import PyPDF2
+import pytest
+
+from extraction_backends import available_backends
+from test_column_order import one_page_pdf
+
+TWO_COLUMNS = b"BT /F1 10 Tf " + b" ".join(
+    b"1 0 0 1 50 %d Tm (Left %d) Tj 1 0 0 1 320 %d Tm (Right %d) Tj" % (700 - 12 * i, i, 700 - 12 * i, i)
+    for i in range(5)) + b" ET"
+
+
+class OnePage:
+    """A document of one page, shaped like a PdfReader for the backends"""
+
+    def __init__(self, content):
+        self.pages = [one_page_pdf(content)]
+
+
+def test_shared_parse_matches_one_extract_per_mode():
+    backend = available_backends()['pypdf2']
+    modes = ('plain', 'columns')
+    separate = tuple(backend.extract(OnePage(TWO_COLUMNS), 0, mode) for mode in modes)
+    assert backend.extract_modes(OnePage(TWO_COLUMNS), 0, modes) == separate
+    assert separate[1].split('\n') == [f'Left {i}' for i in range(5)] + [f'Right {i}' for i in range(5)]
+
+
+def test_shared_parse_leaves_the_page_readable_again():
+    backend = available_backends()['pypdf2']
+    document = OnePage(TWO_COLUMNS)
+    first = backend.extract_modes(document, 0, ('plain', 'columns'))
+    assert backend.extract_modes(document, 0, ('plain', 'columns')) == first
+    assert backend.extract(document, 0, 'plain') == first[0]
+
+
+def test_pypdf_layout_is_extracted_from_the_page_as_is(tmp_path):
+    backend = available_backends().get('pypdf')
+    if backend is None:
+        pytest.skip("pypdf is not installed")
+    writer = PyPDF2.PdfWriter()
+    writer.add_page(one_page_pdf(TWO_COLUMNS))
+    pdf_path = str(tmp_path / "two_columns.pdf")
+    with open(pdf_path, 'wb') as f:
+        writer.write(f)
+    plain, layout = backend.extract_modes(backend.open(pdf_path), 0, ('plain', 'layout'))
+    assert (plain, layout) == tuple(backend.extract(backend.open(pdf_path), 0, mode) for mode in ('plain', 'layout'))
+    assert 'Left 0' in layout and 'Right 0' in layout
@@ -0,0 +1,58 @@
+"""
+Tests for page digests and the page text cache.
+
+Run with: python -m pytest test_extraction_cache.py
+"""
+import json
+
+import PyPDF2
+from PyPDF2.generic import NameObject
+
+from extraction_cache import DIGEST_VERSION, ExtractionCache, page_digest
+from test_column_order import one_page_pdf
+
+CONTENT = b"BT /F1 10 Tf 50 700 Td (Amikacin) Tj ET"
+
+
+def write_pdf(path, *pages):
+    writer = PyPDF2.PdfWriter()
+    for page in pages:
+        writer.add_page(page)
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+def test_digest_follows_content_and_resolved_resources():
+    page = one_page_pdf(CONTENT)
+    assert page_digest(one_page_pdf(CONTENT)) == page_digest(page)
+    assert page_digest(one_page_pdf(CONTENT.replace(b"Amikacin", b"Amoxicillin"))) != page_digest(page)
+
+    font_changed = one_page_pdf(CONTENT)
+    font_changed['/Resources']['/Font']['/F1'].get_object()[NameObject('/BaseFont')] = NameObject('/Courier')
+    assert page_digest(font_changed) != page_digest(page)
+
+
+def test_cached_text_is_kept_per_mode(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    digest = page_digest(one_page_pdf(CONTENT))
+    assert cache.get(digest, "pypdf2-3.0.1.plain") is None
+    cache.put(digest, "pypdf2-3.0.1.plain", "Amikacin\r\n")
+    assert cache.has(digest, "pypdf2-3.0.1.plain") and not cache.has(digest, "pypdf2-3.0.1.layout")
+    assert cache.get(digest, "pypdf2-3.0.1.plain") == "Amikacin\r\n"
+
+
+def test_page_digests_reuse_the_manifest_of_the_same_file(tmp_path):
+    pdf_path = tmp_path / "book.pdf"
+    write_pdf(pdf_path, one_page_pdf(CONTENT), one_page_pdf(CONTENT.replace(b"Amikacin", b"Amoxicillin")))
+    cache = ExtractionCache(str(tmp_path / "cache"))
+    digests = cache.page_digests(str(pdf_path))
+    assert len(set(digests)) == 2
+
+    [manifest_path] = (tmp_path / "cache" / "documents").iterdir()
+    manifest = json.loads(manifest_path.read_text())
+    assert manifest["version"] == DIGEST_VERSION and manifest["pages"] == digests
+    manifest_path.write_text(json.dumps(dict(manifest, pages=["recorded"] * 2)))
+    assert cache.page_digests(str(pdf_path)) == ["recorded"] * 2
+
+    manifest_path.write_text(json.dumps(dict(manifest, version=DIGEST_VERSION - 1, pages=["stale"] * 2)))
+    assert cache.page_digests(str(pdf_path)) == digests
@@ -0,0 +1,74 @@
+"""
+Tests for scoring pages as tables or prose from their content streams, and
+for extracting each page in the mode its score picks.
+
+Run with: python -m pytest test_layout_detection.py
+"""
+import PyPDF2
+import pytest
+
+from extraction_backends import available_backends
+from layout_detection import LAYOUT_THRESHOLD, layout_pages, layout_score
+from pdf_extraction import iter_pages
+from test_column_order import one_page_pdf
+
+
+class ModeBackend:
+    """Names the mode and page each text was extracted with"""
+    name = 'mode'
+    version = 'test'
+    modes = {'plain', 'layout'}
+
+    def open(self, pdf_path):
+        return None
+
+    def extract_modes(self, document, index, modes):
+        return tuple(f"{mode} {index}" for mode in modes)
+
+
+def text_at(positions):
+    """Content stream drawing a word at each (x, y) position"""
+    return b''.join(b'BT /F1 9 Tf 1 0 0 1 %d %d Tm (word) Tj ET\n' % (x, y) for x, y in positions)
+
+
+def test_a_table_scores_above_the_threshold():
+    rows = [(x, 700 - 14 * row) for row in range(10) for x in (50, 180, 320, 450)]
+    borders = b''.join(b'50 %d 450 0.5 re f\n' % (696 - 14 * row) for row in range(10))
+    assert layout_score(text_at(rows)) >= LAYOUT_THRESHOLD
+    assert layout_score(text_at(rows) + borders) > layout_score(text_at(rows))
+
+
+def test_prose_scores_below_the_threshold():
+    lines = [(72 if line % 6 else 90, 700 - 12 * line) for line in range(40)]
+    assert layout_score(text_at(lines)) < LAYOUT_THRESHOLD
+    assert layout_score(b'') == 0
+
+
+def test_relative_moves_are_followed_within_a_text_object():
+    row = b'BT 50 700 Td (a) Tj 130 0 Td (b) Tj 140 0 Td (c) Tj ET\n'
+    table = b''.join(row.replace(b'700', str(700 - 14 * i).encode()) for i in range(9))
+    assert layout_score(table) == 9
+
+
+@pytest.fixture
+def prose_table_prose_pdf(tmp_path):
+    table = text_at([(x, 700 - 14 * row) for row in range(10) for x in (50, 180, 320, 450)])
+    prose = text_at([(72, 700 - 12 * line) for line in range(40)])
+    writer = PyPDF2.PdfWriter()
+    for content in (prose, table, prose):
+        writer.add_page(one_page_pdf(content))
+    path = tmp_path / "book.pdf"
+    with open(path, 'wb') as f:
+        writer.write(f)
+    return str(path)
+
+
+def test_auto_extracts_only_table_pages_in_layout(prose_table_prose_pdf):
+    assert layout_pages(prose_table_prose_pdf) == {1}
+    available_backends()['mode'] = ModeBackend()
+    try:
+        pages = list(iter_pages(prose_table_prose_pdf, extraction_mode="auto", workers=1, cache_dir=None,
+                                backend='mode'))
+    finally:
+        del available_backends()['mode']
+    assert pages == [(1, "plain 0"), (2, "layout 1"), (3, "plain 2")]
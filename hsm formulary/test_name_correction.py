@@ -0,0 +1,65 @@
+"""
+Tests for correcting OCR-damaged drug names against a small vocabulary.
+
+Run with: python -m pytest test_name_correction.py
+"""
+import json
+import time
+
+from entry_splitter import trusted_names
+from name_correction import EXTRA_NAMES, SPELLINGS, NameCorrector, deletions, ocr_distance
+from ocr_rules import DATA_FILE
+
+CORRECTOR = NameCorrector.from_names(["Abacavir", "Afatinib", "Amoxicillin", "Ciclosporin", "Axitinib",
+                                      "Metformin", "Paracetamol"])
+
+
+def test_deletions_keep_the_word_and_never_empty_it():
+    assert deletions("abc", 1) == {"abc", "bc", "ac", "ab"}
+    assert "" not in deletions("ab", 2)
+
+
+def test_ocr_distance_counts_only_errors_the_scan_makes():
+    assert ocr_distance("paraeetamol", "paracetamol", 2) == 1
+    assert ocr_distance("metforrnin", "metformin", 2) == 1
+    assert ocr_distance("amoxicil.lin", "amoxicillin", 2) == 1
+    assert ocr_distance("axitinib", "afatinib", 2) == 3
+
+
+def test_ocr_damage_is_corrected_in_the_case_it_was_read():
+    assert CORRECTOR.correct_name("Paraeetamol syrup") == "Paracetamol syrup"
+    assert CORRECTOR.correct_name("METFORRNIN (oral)") == "METFORMIN (oral)"
+    assert CORRECTOR.correct_name("(Arnoxicillin),") == "(Amoxicillin),"
+
+
+def test_split_words_are_joined():
+    assert CORRECTOR.correct_name("Abaca vir 600mg") == "Abacavir 600mg"
+
+
+def test_other_drugs_spellings_and_short_words_are_left_alone():
+    assert CORRECTOR.correct_name("Cyclosporin") == "Cyclosporin"
+    assert CORRECTOR.correct_name("Axitinib and Afatinib") == "Axitinib and Afatinib"
+    assert CORRECTOR.correct_name("Paraeetamo1 plus") == "Paraeetamo1 plus"
+    assert CORRECTOR.correct_words(["Paraeetamol", "Paraeetamol"]) == ["Paracetamol", "Paracetamol"]
+
+
+def test_spellings_replace_the_trusted_name_after_lookup():
+    corrector = NameCorrector.from_names(["Acyclovir", "Valacyclovir"], {"acyclovir": "aciclovir"})
+    assert corrector.correct_names(["Acyclovir", "ACYCLOVIR eye", "Acyclovlr", "Valacyclovir"]) == [
+        "Aciclovir", "ACICLOVIR eye", "Aciclovir", "Valacyclovir"]
+
+
+def test_cold_batch_corrects_tens_of_thousands_of_tokens_a_second():
+    with open(DATA_FILE, 'r', encoding='utf-8') as f:
+        names = [entry['name'] for entry in json.load(f)]
+    tokens = sum(len(name.split(' ')) for name in names)
+    vocabulary = trusted_names() + list(EXTRA_NAMES)
+    best = None
+    # Best of a few runs, each on a fresh corrector so nothing is memoised yet
+    for _ in range(5):
+        corrector = NameCorrector.from_names(vocabulary, SPELLINGS)
+        start = time.perf_counter()
+        corrector.correct_names(names)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    assert tokens / best > 25000
@@ -0,0 +1,100 @@
+"""
+Tests for staging OCR rules into shared passes.
+
+Run with: python -m pytest test_ocr_rules.py
+"""
+import json
+import re
+
+from ocr_rules import STAGE, LiteralReplacer, RuleBook, RuleSet, rule_set
+
+TEXT = "take 5 rng oml tub then repoat; rnax 10 rnl dni!y, Tub ORNL"
+
+
+def stage_sizes(rules):
+    return [len(stage.rules) for stage in rules.stages]
+
+
+def test_independent_word_rules_share_one_pass():
+    rules = RuleSet([(r'\btub\b', 'tab'), (r'\brepoat\b', 'repeat'), (r'\bornl\b', 'oral', re.IGNORECASE)])
+    assert stage_sizes(rules) == [3]
+    assert rules.apply(TEXT) == rules.apply_sequential(TEXT)
+    assert rules.apply("tub ORNL Tub") == "tab oral Tub"
+
+
+def test_word_rule_that_reads_an_earlier_replacement_starts_a_new_stage():
+    rules = RuleSet([(r'\brnax\b', 'max'), (r'\bmax\b', 'maximum'), (r'\btub\b', 'tab')])
+    assert stage_sizes(rules) == [1, 2]
+    assert rules.apply("rnax tub") == "maximum tab"
+
+
+def test_word_rule_claiming_the_same_word_starts_a_new_stage():
+    rules = RuleSet([(r'\btub\b', 'tab', re.IGNORECASE), (r'\bTub\b', 'TAB')])
+    assert stage_sizes(rules) == [1, 1]
+    assert rules.apply("Tub") == rules.apply_sequential("Tub") == "tab"
+
+
+def test_other_rules_keep_a_pass_of_their_own():
+    rules = RuleSet([(r'(?<=\d)\s*rng\b', 'mg'), (r'(?<=\d)\s*rnl\b', 'ml'), ('!', 't'),
+                     (r'(\d+)\s+(\.\s*\d+)', r'\1\2')])
+    assert stage_sizes(rules) == [1, 1, 1, 1]
+    assert rules.apply(TEXT) == rules.apply_sequential(TEXT)
+
+
+def test_set_with_nothing_to_merge_runs_its_rules_in_sequence():
+    rules = RuleSet([(r'(?<=\d)\s*rng\b', 'mg'), (r'\btub\b', 'tab'), (r'(?<=\d)\s*rnl\b', 'ml')])
+    assert not rules.merged
+    assert rules._passes == [rule.apply for rule in rules.rules]
+    assert RuleSet([(r'\btub\b', 'tab'), (r'\brepoat\b', 'repeat')]).merged
+
+
+def test_stage_marker_splits_word_rules():
+    rules = RuleSet([(r'\btub\b', 'tab'), STAGE, (r'\brepoat\b', 'repeat')])
+    assert stage_sizes(rules) == [1, 1]
+
+
+def test_iter_replacements_reproduces_apply():
+    rules = RuleSet([(r'\btub\b', 'tab'), (r'\brepoat\b', 'repeat'), (r'(\d+)\s+rn(l|g)', r'\1m\2')])
+    text = TEXT
+    for stage in rules.stages:
+        pieces, cursor = [], 0
+        for start, end, replacement in stage.iter_replacements(text):
+            pieces += [text[cursor:start], replacement]
+            cursor = end
+        expected = stage.apply(text)
+        text = ''.join(pieces) + text[cursor:]
+        assert text == expected
+
+
+def test_literal_table_runs_in_order_on_the_inputs_its_order_decides():
+    # Inputs that several entries match; str.replace in table order decides
+    fixes = rule_set('parse_frank_shann_final')
+    assert fixes.apply('rnll') == 'ml'
+    assert fixes.apply('umolll') == 'umol/L'
+    assert fixes.apply('1 Ornin') == '1 0min'
+
+
+def test_literal_replacer_lets_later_entries_see_earlier_output():
+    replacer = LiteralReplacer([('rnl', 'ml'), ('mll', 'ml')])
+    assert replacer.apply('rnll') == 'ml'
+    assert LiteralReplacer([('mll', 'ml'), ('rnl', 'ml')]).apply('rnll') == 'mll'
+
+
+def test_rule_file_sets_run_by_scope_with_flags_and_when(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({
+        "names": {"description": "test", "strip": True, "rules": [
+            {"stage": 1, "scope": "name", "pattern": "\\bparaeetamol\\b", "replacement": "Paracetamol",
+             "flags": ["IGNORECASE"]},
+            {"scope": ["name", "dosage"], "pattern": "(\\d)rng", "replacement": "\\1mg"},
+            {"scope": "dosage", "pattern": "5\\b", "replacement": "s", "when": ["tablet"]}]},
+        "units": {"kind": "literal", "rules": [
+            {"scope": "dosage", "pattern": "rnl", "replacement": "ml"}]}}), encoding='utf-8')
+    book = RuleBook(str(path))
+    entry = {"name": " PARAEETAMOL 500rng ", "dosage": "15rng/kg in 5rnl, 2 tablet5", "id": "fs-1"}
+    assert book.apply_entry(entry, ["names", "units"])
+    assert entry == {"name": "Paracetamol 500mg", "dosage": "15mg/kg in 5ml, 2 tablets", "id": "fs-1"}
+    # when: the rule only runs on text holding one of its words
+    assert book["names"].apply("15rng q5", "dosage") == "15mg q5"
+    assert book["names"].apply("untouched 5rng", "id") == "untouched 5rng"
+    assert not book.apply_entry(entry, ["names", "units"])
@@ -0,0 +1,72 @@
+"""
+Tests for the plain and compressed page stores.
+
+Run with: python -m pytest test_page_store.py
+"""
+import pytest
+
+from page_store import (CompressedPageStore, PageStore, build_compressed_store, build_page_store,
+                        open_store)
+
+PAGES = [(1, "Amikacin\n15mg/kg daily"), (2, ""), (4, "Céfuroxime 750mg\n\nq8h")]
+
+
+def test_page_store_round_trips_pages_and_lines(tmp_path):
+    path = str(tmp_path / "book.pages")
+    assert build_page_store(iter(PAGES), path) == 3
+    with open_store(path) as store:
+        assert isinstance(store, PageStore)
+        assert list(store) == PAGES
+        assert store.page(4) == "Céfuroxime 750mg\n\nq8h"
+        assert store.line_count == 6
+        start, stop = store.page_line_range(4)
+        assert list(store.iter_lines(start, stop)) == ["Céfuroxime 750mg", "", "q8h"]
+        assert store.line(1) == "15mg/kg daily"
+        with pytest.raises(KeyError):
+            store.page(3)
+
+
+def test_page_store_refuses_an_index_for_another_blob(tmp_path):
+    path = str(tmp_path / "book.pages")
+    build_page_store(PAGES, path)
+    with open(path, 'ab') as blob:
+        blob.write(b"torn write\n")
+    with pytest.raises(ValueError):
+        PageStore(path)
+
+
+def test_compressed_store_reads_any_page_alone(tmp_path):
+    path = str(tmp_path / "book.pagez")
+    assert build_compressed_store(PAGES, path) == 3
+    with open_store(path) as store:
+        assert isinstance(store, CompressedPageStore)
+        assert len(store) == 3
+        assert store.page(4) == "Céfuroxime 750mg\n\nq8h"
+        assert store.page(2) == ""
+        assert list(store) == PAGES
+
+
+def test_compressed_store_rejects_other_files(tmp_path):
+    path = tmp_path / "book.pagez"
+    path.write_bytes(b"%PDF-1.4" + bytes(16))
+    with pytest.raises(ValueError):
+        CompressedPageStore(str(path))
+
+
+def test_pages_and_lines_are_zero_copy_views_at_their_byte_offsets(tmp_path):
+    path = str(tmp_path / "book.pages")
+    build_page_store(PAGES, path)
+    with open(path, 'rb') as f:
+        blob = f.read()
+    with open_store(path) as store:
+        page = store.page_bytes(4)
+        lines = store.lines_bytes(1, 4)
+        # Slices of the mapped blob, not copies of it
+        assert page.obj is store._mmap and lines.obj is store._mmap and page.readonly
+        assert bytes(page) == "Céfuroxime 750mg\n\nq8h".encode('utf-8')
+        # Offsets count bytes: the line holding "é" is a byte longer than its characters
+        assert store.line_offsets[4] - store.line_offsets[3] == len("Céfuroxime 750mg\n") + 1
+        assert all(blob[offset - 1:offset] == b"\n" for offset in store.line_offsets[1:])
+        # A line range may span pages; an empty page is one empty line
+        assert bytes(lines) == "15mg/kg daily\n\nCéfuroxime 750mg".encode('utf-8')
+        del page, lines
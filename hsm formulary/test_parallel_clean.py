@@ -0,0 +1,46 @@
+"""
+Tests for cleaning one long text across worker processes.
+
+Run with: python -m pytest test_parallel_clean.py
+"""
+import parallel_clean
+import parse_frank_shann_v3
+from ocr_rules import RuleSet, rule_set, sample_texts
+from parallel_clean import _clean_chunk, _cuts_agree, chunk_starts, clean_parallel
+
+
+def test_edit_over_a_cut_goes_to_the_chunk_before_it():
+    parallel_clean._rules = RuleSet([(r'ab', 'X')])
+    assert _clean_chunk("aabb", [2]) == ("aXb", [2])
+    assert _clean_chunk("abcc", [2, 3]) == ("Xcc", [1, 2])
+
+
+def test_chunks_start_at_page_markers():
+    text = "".join(f"=== PAGE {n} ===\nline {n}\n" for n in range(1, 9))
+    starts = chunk_starts(text, 3)
+    assert starts[0] == 0 and len(starts) == 3
+    assert all(text.startswith("=== PAGE", start) for start in starts)
+
+
+def test_cuts_agree_only_when_both_sides_read_the_cut_alike():
+    left = ("ctx aaaabbbb", (4, 8))
+    assert _cuts_agree([left, ("aaaabbbb ctx", (4, 8))])
+    assert not _cuts_agree([left, ("aaaabXbb ctx", (4, 8))])
+
+
+def test_parallel_result_is_the_serial_result(monkeypatch):
+    # The chunks must be joined, not replaced by the serial fallback
+    agreed = []
+    monkeypatch.setattr(parallel_clean, "_cuts_agree", lambda results: agreed.append(_cuts_agree(results)) or agreed[-1])
+    text = sample_texts()[0]
+    assert clean_parallel("parse_frank_shann_v3", text, workers=3) == rule_set("parse_frank_shann_v3").apply(text)
+    assert agreed == [True]
+
+
+def test_book_is_cleaned_serially_unless_workers_are_asked_for(monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("a process pool was started")
+
+    monkeypatch.setattr(parallel_clean, "ProcessPoolExecutor", no_pool)
+    text = "=== PAGE 1 ===\nParacetamol 15mg/kg 4H oml.\n=== PAGE 2 ===\nAmikacin 15rng/kg daily IV."
+    assert parse_frank_shann_v3.clean_book(text) == parse_frank_shann_v3.clean_text(text)
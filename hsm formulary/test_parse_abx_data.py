@@ -0,0 +1,57 @@
+"""
+Tests for line classification and the line class index of the ABX regime parser.
+
+Run with: python -m pytest test_parse_abx_data.py
+"""
+from parse_abx_data import LineIndex
+
+PAGE = ["Antibiotic  Usual dose",      # 0: header, not a drug
+        " IV Amikacin ",               # 1
+        "15mg/kg OD",                  # 2
+        "CrCl 10-50: q24h",            # 3
+        "GFR <10 ml/min: q48h",        # 4
+        "Oral Azithromycin",           # 5
+        "Take with food",              # 6
+        "500mg OD"]                    # 7
+INDEX = LineIndex(PAGE)
+
+
+def test_lines_are_classified_once_each():
+    lines = ["=== PAGE 3 === IV", "IV Usual dose", "Antibiotic IV", "Penicillin G", "0.5-4 MU q4-6h",
+             "CrCl 10-50mg: 75%", "Source: 2mg", "5 units/kg", "  Oral Cefuroxime 250mg  ", "ml/min"]
+    index = LineIndex(lines)
+    assert index.positions == {'drug': [3, 8], 'dose': [4, 7, 8], 'renal': [5, 9]}
+    assert LineIndex(lines, {'oral': lambda line: line.startswith('Oral')}).positions == {'oral': [8]}
+
+
+def test_next_line_finds_the_first_line_of_a_class_in_the_window():
+    assert INDEX.lines[1] == "IV Amikacin"
+    assert INDEX.next_line('drug', 0, len(PAGE)) == 1
+    assert INDEX.next_line('dose', 2, 22) == 2
+    assert INDEX.next_line('dose', 3, 20) == 7
+    assert INDEX.next_line('drug', 2, 30) == 5
+
+
+def test_next_line_is_none_when_the_window_has_no_line_of_the_class():
+    assert INDEX.next_line('dose', 3, 7) is None
+    assert INDEX.next_line('drug', 6, 26) is None
+    assert INDEX.next_line('renal', 8, 28) is None
+    assert INDEX.next_line('dose', 40, 60) is None
+
+
+def test_lines_between_returns_the_lines_of_a_class_in_order():
+    assert INDEX.lines_between('renal', 2, 31) == ["CrCl 10-50: q24h", "GFR <10 ml/min: q48h"]
+    assert INDEX.lines_between('renal', 4, 5) == ["GFR <10 ml/min: q48h"]
+    assert INDEX.lines_between('renal', 5, 35) == []
+    assert INDEX.lines_between('renal', 3, 3) == []
+    assert LineIndex([]).lines_between('dose', 1, 21) == []
+
+
+def test_lookups_match_a_rescan_of_the_lines():
+    for name in ('drug', 'dose', 'renal'):
+        tagged = INDEX.positions[name]
+        for start in range(len(PAGE) + 2):
+            for stop in range(start, len(PAGE) + 3):
+                window = [i for i in tagged if start <= i < stop]
+                assert INDEX.next_line(name, start, stop) == (window[0] if window else None)
+                assert INDEX.lines_between(name, start, stop) == [INDEX.lines[i] for i in window]
@@ -0,0 +1,99 @@
+"""
+Tests for splitting the counseling corpus into drug blocks and sections,
+and for parsing the blocks in a process pool.
+
+Run with: python -m pytest test_parse_counseling_pdf.py
+"""
+import random
+import re
+from itertools import islice
+
+from parse_counseling_pdf import ALL_HEADERS, HeaderIndex, clean_text, iter_drug_blocks, iter_drugs
+from pdf_extraction import open_pages
+
+WORDS = ["Name:", "Name :", "Pharmacological Group", "Indications and Dosage", "Method of Administration*",
+         "Special Considerations", "Side Effects and their Management", "Amlodipine", "5mg", "daily",
+         "Take with food.", "Avoid grapefruit juice and report any swelling of the ankles to the doctor."]
+
+
+def old_marked_text(pages):
+    """The whole corpus as the parser built it before it streamed pages"""
+    lines = []
+    for page_no, text in pages:
+        for line in [f"=== PAGE {page_no} ==="] + text.split('\n'):
+            line = line.strip()
+            lines.append("<HEADER_OTHERS>" if line == "Others" else
+                         "<HEADER_STORAGE>" if re.match(r'^Storage\*?$', line) else line)
+    text = re.sub(r'\s+', ' ', " ".join(lines))
+    text = re.sub(r'\bName\s*:', '<HEADER_NAME>', text, flags=re.IGNORECASE)
+    text = re.sub(r'\bPharmacological\s+Group\b', '<HEADER_GROUP>', text, flags=re.IGNORECASE)
+    text = re.sub(r'\bIndications\s+and\s+Dosage\b', '<HEADER_INDICATION>', text, flags=re.IGNORECASE)
+    text = re.sub(r'\bMethod\s+of\s+Administration\s*\*?', '<HEADER_METHOD>', text, flags=re.IGNORECASE)
+    text = re.sub(r'\bSpecial\s+Considerations\b', '<HEADER_SPECIAL>', text, flags=re.IGNORECASE)
+    return re.sub(r'\bSide\s+Effects\s+and\s+their\s+Management\s*\*?', '<HEADER_SIDE_EFFECTS>', text,
+                  flags=re.IGNORECASE)
+
+
+def old_blocks(text):
+    """(index, name_candidate, body) as the old regex splitter found them"""
+    matches = list(re.finditer(r'(.{0,100})<HEADER_NAME>', text))
+    return [(i, match.group(1), text[match.end():matches[i + 1].start() if i + 1 < len(matches) else len(text)])
+            for i, match in enumerate(matches)]
+
+
+def old_section(content, start_marker):
+    """A section as the old parser sliced it from one drug body"""
+    if start_marker not in content:
+        return ""
+    start_idx = content.find(start_marker) + len(start_marker)
+    end_idx = len(content)
+    for marker in set(ALL_HEADERS) - {start_marker}:
+        idx = content.find(marker, start_idx)
+        if idx != -1 and idx < end_idx:
+            end_idx = idx
+    return clean_text(content[start_idx:end_idx])
+
+
+def random_pages(rng):
+    pages = []
+    for page_no in range(1, rng.randint(1, 6)):
+        lines = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 8))) for _ in range(rng.randint(0, 6))]
+        lines += rng.sample(["Storage", "Storage*", "Others", "Dosage"], 2)
+        rng.shuffle(lines)
+        pages.append((page_no, "\n".join(lines)))
+    return pages
+
+
+def test_a_drug_block_is_its_name_window_and_body():
+    advice = "Avoid grapefruit juice and report any swelling of the ankles to the doctor."
+    pages = [(1, f"Amlodipine Tablet\nName: Amlodipine 5mg\nPharmacological Group CCB\n{advice}"),
+             (2, "Storage\nBelow 30C\nName: Ibuprofen\nOthers\nWith food")]
+    blocks = list(iter_drug_blocks(pages))
+    assert [(index, name) for index, name, _ in blocks] == [
+        (0, "=== PAGE 1 === Amlodipine Tablet "),
+        # The window is the 100 characters before the marker, cut mid-word if need be
+        (1, "uice and report any swelling of the ankles to the doctor. === PAGE 2 === <HEADER_STORAGE> Below 30C ")]
+    assert blocks[0][2] == " Amlodipine 5mg <HEADER_GROUP> CCB Avoid grapefruit j"
+    assert blocks[1][2] == " Ibuprofen <HEADER_OTHERS> With food"
+    assert blocks == old_blocks(old_marked_text(pages))
+
+
+def test_blocks_and_sections_match_the_old_splitter():
+    rng = random.Random(2017)
+    for _ in range(300):
+        pages = random_pages(rng)
+        text = old_marked_text(pages)
+        assert list(iter_drug_blocks(pages)) == old_blocks(text)
+        index = HeaderIndex(text)
+        starts = [match.end() for match in re.finditer('<HEADER_NAME>', text)]
+        ends = [match.start() for match in re.finditer('<HEADER_NAME>', text)][1:] + [len(text)]
+        for start, end in zip(starts, ends):
+            for marker in ALL_HEADERS:
+                assert index.section(marker, start, end) == old_section(text[start:end], marker)
+
+
+def test_a_process_pool_parses_the_same_drugs_in_the_same_order():
+    pages = list(islice(open_pages("counseling_pdf_content.txt"), 40))
+    serial = list(iter_drugs(pages))
+    assert len([drug for drug in serial if drug]) >= 10
+    assert list(iter_drugs(pages, workers=2, batch_size=3)) == serial
@@ -0,0 +1,50 @@
+"""
+Tests for the dilution guideline parser on small made-up pages.
+
+Run with: python -m pytest test_parse_dilution.py
+"""
+from parse_dilution import index_titles, parse_dilution
+
+CONTENTS = (1, "CONTENTS\n■Acyclovir Injection 10\n■Amikacin Injection 11\n■Cefuroxime Injection 31")
+TWO_MONOGRAPHS = (2, "10DILUTION GUIDELINE\nAcyclovir Injection\nBrand Name Zovirax\n"
+                     "Remarks Protect from light.\n"
+                     "Amikacin Injection\nBrand Name Amikin\nRemarks Monitor levels.")
+MENTION = (3, "31DILUTION GUIDELINE\nCefuroxime Injection\n"
+              "Brand Name Pharmaniaga Cefuroxime Injection (Strength: 750mg)\nRemarks None.")
+
+
+def test_index_holds_every_title_hit_across_the_corpus():
+    hits, texts = index_titles([CONTENTS, TWO_MONOGRAPHS, MENTION])
+    assert [(drug, page_no) for drug, page_no, _ in hits] == [
+        ("Acyclovir", 1), ("Amikacin", 1), ("Cefuroxime", 1),
+        ("Acyclovir", 2), ("Amikacin", 2), ("Cefuroxime", 3), ("Cefuroxime", 3)]
+    assert all(texts[page_no].startswith(f"{drug} Injection", offset) for drug, page_no, offset in hits)
+
+
+def test_page_with_two_headings_is_split_and_contents_are_skipped():
+    drugs = parse_dilution([CONTENTS, TWO_MONOGRAPHS, MENTION])
+    assert [(drug["id"], drug["genericName"], drug["brandName"], drug["remarks"]) for drug in drugs] == [
+        ("dilution-1", "Acyclovir", "Zovirax", "Protect from light."),
+        ("dilution-2", "Amikacin", "Amikin", "Monitor levels."),
+        ("dilution-3", "Cefuroxime", "Pharmaniaga Cefuroxime Injection (Strength: 750mg)", "None."),
+    ]
+
+
+def test_combined_label_is_not_read_as_an_ampersand_value():
+    page = (2, "16DILUTION GUIDELINE\nCefoperazone & Sulbactam Injection\nBrand Name Sulperazon\n"
+               "Reconstitution &\nFurther Dilution\nReconstitute with 3.4ml WFI.\nRemarks None.")
+    [drug] = parse_dilution([page])
+    assert drug["genericName"] == "Cefoperazone & Sulbactam"
+    assert drug["reconstitution"] == "Reconstitute with 3.4ml WFI."
+    assert drug["remarks"] == "None."
+
+
+def test_table_monograph_keeps_its_brand_and_leaves_stacked_fields_empty():
+    page = (2, "12DILUTION GUIDELINE\nAzithromycin Injection\nZithromax (Strength: 500mg)\n"
+               "Reconstitute with 4.8ml WFI.\nDiluents\nNS, D5\nInfuse over 1 hour.\n"
+               "Brand Name\nReconstitution\nFurther Dilution\nAdministration\nRemarks\n"
+               "References Product leaflet.")
+    [drug] = parse_dilution([page])
+    assert drug["brandName"] == "Zithromax (Strength: 500mg)"
+    assert drug["diluents"] == "NS, D5"
+    assert drug["reconstitution"] == drug["furtherDilution"] == drug["administration"] == drug["remarks"] == ""
@@ -0,0 +1,114 @@
+"""
+Tests for supervised page extraction with a stand-in backend.
+
+Run with: python -m pytest test_pdf_extraction.py
+"""
+import os
+import subprocess
+import sys
+import time
+
+import PyPDF2
+import pytest
+
+from extraction_backends import available_backends
+from page_store import build_compressed_store, build_page_store
+from pdf_extraction import _iter_supervised, iter_pages, open_pages, read_text_pages, write_pages
+
+
+class SlowBackend:
+    """Page 1 hangs, page 2 kills its worker, every other page is 'page n'"""
+    name = 'slow'
+    version = 'test'
+    modes = {'plain'}
+
+    def open(self, pdf_path):
+        return None
+
+    def extract_modes(self, document, index, modes):
+        if index == 1:
+            time.sleep(30)
+        if index == 2:
+            os._exit(3)
+        return (f"page {index}",)
+
+
+class PoisonBackend(SlowBackend):
+    """Page 1 kills its worker, every other page is 'page n'"""
+    name = 'poison'
+
+    def extract_modes(self, document, index, modes):
+        if index == 1:
+            os._exit(3)
+        return (f"page {index}",)
+
+
+@pytest.fixture
+def slow_backend():
+    available_backends()['slow'] = SlowBackend()
+    yield 'slow'
+    del available_backends()['slow']
+
+
+def test_timed_out_and_dead_workers_fail_only_their_page(slow_backend):
+    results = list(_iter_supervised("unused.pdf", range(6), ("plain",), slow_backend, 2,
+                                    page_timeout=1, memory_limit_mb=None))
+    assert [index for index, _, _ in results] == list(range(6))
+    assert results[1][1] is None and "timed out" in results[1][2]
+    assert results[2][1] is None and "exit code 3" in results[2][2]
+    assert [text for index, text, _ in results if index not in (1, 2)] == [
+        ("page 0",), ("page 3",), ("page 4",), ("page 5",)]
+
+
+def test_a_poison_page_is_reported_empty_and_not_cached(tmp_path):
+    writer = PyPDF2.PdfWriter()
+    for width in (200, 210, 220):
+        # Distinct sizes, so each blank page has a cache entry of its own
+        writer.add_blank_page(width=width, height=200)
+    pdf_path = str(tmp_path / "book.pdf")
+    with open(pdf_path, 'wb') as f:
+        writer.write(f)
+    available_backends()['poison'] = PoisonBackend()
+    try:
+        for _ in range(2):
+            failures = []
+            pages = list(iter_pages(pdf_path, backend='poison', workers=2, cache_dir=str(tmp_path / "cache"),
+                                    page_timeout=10, failures=failures))
+            assert pages == [(1, "page 0"), (2, ""), (3, "page 2")]
+            # Extracted again on the second run, not served from the cache as empty text
+            assert [failure["page"] for failure in failures] == [2]
+            assert "exit code 3" in failures[0]["error"]
+    finally:
+        del available_backends()['poison']
+
+
+def test_read_text_pages_splits_at_page_markers(tmp_path):
+    path = tmp_path / "extracted.txt"
+    path.write_text("=== PAGE 1 ===\n\nfirst\n\n=== PAGE 2 ===\n\nsecond\nline\n", encoding='utf-8')
+    assert list(read_text_pages(path)) == [(1, "first"), (2, "second\nline")]
+
+
+def test_written_pages_read_back_through_open_pages(tmp_path):
+    pages = [(1, "Amikacin\n15mg/kg daily"), (2, "Cefuroxime 750mg q8h")]
+    text_path = tmp_path / "extracted.txt"
+    assert write_pages(iter(pages), text_path) == 2
+    assert list(open_pages(text_path)) == pages
+    assert list(open_pages(str(text_path))) == pages
+    store_path = str(tmp_path / "extracted.pages")
+    build_page_store(open_pages(text_path), store_path)
+    assert list(open_pages(store_path)) == pages
+    packed_path = str(tmp_path / "extracted.pagez")
+    build_compressed_store(open_pages(store_path), packed_path)
+    assert list(open_pages(packed_path)) == pages
+    assert list(open_pages(iter(pages))) == pages
+
+
+def test_reading_a_text_file_loads_no_pdf_library(tmp_path):
+    path = tmp_path / "extracted.txt"
+    path.write_text("=== PAGE 1 ===\n\nfirst\n", encoding='utf-8')
+    script = ("import sys; from pdf_extraction import open_pages; import pdf_toc; "
+              f"assert list(open_pages({str(path)!r})) == [(1, 'first')]; "
+              "print(sorted(m for m in ('PyPDF2', 'pypdf', 'pdfminer') if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,43 @@
+"""
+Tests for mapping table-of-contents entries to page ranges.
+
+Run with: python -m pytest test_pdf_toc.py
+"""
+import PyPDF2
+
+from pdf_toc import iter_toc_pages, pages_for, parse_toc_text, read_toc, toc_spans
+
+
+def outlined_pdf(path):
+    """Eight blank pages with an outline: Amikacin at index 1, Amlodipine at 3, Atenolol at 6"""
+    writer = PyPDF2.PdfWriter()
+    for _ in range(8):
+        writer.add_blank_page(width=200, height=200)
+    for title, index in (("Amikacin", 1), ("Amlodipine", 3), ("Atenolol", 6)):
+        writer.add_outline_item(title, index)
+    with open(path, 'wb') as f:
+        writer.write(f)
+    return str(path)
+
+
+def test_printed_toc_lines_are_parsed():
+    assert parse_toc_text("CONTENTS\nAmlodipine ........ 23\nAtenolol ....... 27") == [
+        ("Amlodipine", 23), ("Atenolol", 27)]
+    assert parse_toc_text("Chapter 26: Ophthalmia Neonatorum 88") == [
+        ("Chapter 26: Ophthalmia Neonatorum", 88)]
+
+
+def test_spans_run_to_the_next_entry_and_keep_a_shared_first_page():
+    entries = [("Amikacin", 1), ("Amlodipine", 3), ("Amoxicillin", 3), ("Atenolol", 6)]
+    assert toc_spans(entries, 8) == [("Amikacin", 1, 3), ("Amlodipine", 3, 6),
+                                     ("Amoxicillin", 3, 6), ("Atenolol", 6, 8)]
+
+
+def test_toc_entry_maps_to_its_page_range(tmp_path):
+    pdf_path = outlined_pdf(tmp_path / "book.pdf")
+    assert read_toc(pdf_path, cache_dir=None) == [("Amikacin", 1), ("Amlodipine", 3), ("Atenolol", 6)]
+    assert pages_for(pdf_path, ["amlodipine"], cache_dir=None) == [3, 4, 5]
+    assert pages_for(pdf_path, ["Amikacin", "Atenolol"], cache_dir=None) == [1, 2, 6, 7]
+    assert pages_for(pdf_path, ["Warfarin"], cache_dir=None) == []
+    pages = iter_toc_pages(pdf_path, ["Amlodipine"], workers=1, cache_dir=None)
+    assert [page_no for page_no, _ in pages] == [4, 5, 6]
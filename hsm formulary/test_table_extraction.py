@@ -0,0 +1,59 @@
+"""
+Tests for coordinate-based table extraction and the renal dosing read from it.
+
+Run with: python -m pytest test_table_extraction.py
+"""
+from PyPDF2.generic import ContentStream
+
+from parse_abx_data import renal_dosing
+from table_extraction import assign_columns, cluster, group_rows, page_runs, row_cells
+from test_column_order import one_page_pdf
+
+
+def test_cluster_chains_sorted_neighbours_within_tolerance():
+    assert cluster([5.0, 1.0, 3.5, 20.0, 22.0], 3.0).tolist() == [0, 0, 0, 1, 1]
+    assert cluster([], 3.0).tolist() == []
+
+
+def test_shows_on_one_baseline_are_separate_runs():
+    page = one_page_pdf(b"BT /F1 10 Tf 50 700 Td (Name) Tj 100 0 Td (Dose) Tj ET")
+    assert [(x, y, text.strip()) for x, y, _, text in page_runs(page)] == [(50, 700, 'Name'), (150, 700, 'Dose')]
+
+
+def test_runs_from_a_parsed_content_stream_leave_it_unchanged():
+    page = one_page_pdf(b"BT /F1 10 Tf 50 700 Td (Name) Tj 100 0 Td (Dose) Tj ET")
+    content = ContentStream(page['/Contents'], page.pdf, 'bytes')
+    operations = list(content.operations)
+    assert page_runs(page, content) == page_runs(page)
+    assert content.operations == operations
+
+
+def test_row_cells_split_at_wide_gaps_and_join_split_words():
+    row = [(50.0, 700.0, 10.0, 'Pat'), (64.0, 700.0, 10.0, 'ient'), (150.0, 700.0, 10.0, 'Dose')]
+    assert [text for _, _, text in row_cells(row)] == ['Patient', 'Dose']
+    assert row_cells([]) == []
+
+
+def test_group_rows_orders_rows_top_down_and_runs_left_to_right():
+    runs = [(150.0, 688.0, 10.0, 'd'), (50.0, 700.0, 10.0, 'a'), (50.0, 689.0, 10.0, 'c'), (150.0, 701.0, 10.0, 'b')]
+    assert [[run[3] for run in row] for row in group_rows(runs)] == [['a', 'b'], ['c', 'd']]
+
+
+def test_assign_columns_joins_two_cells_of_one_column():
+    rows = [[(50.0, 60.0, 'A'), (200.0, 210.0, 'B')],
+            [(52.0, 60.0, 'C'), (205.0, 208.0, 'D'), (210.0, 220.0, 'E')]]
+    assert assign_columns(rows) == ([{0: 'A', 1: 'B'}, {0: 'C', 1: 'D E'}], 2)
+
+
+def test_renal_dosing_reads_range_lines_and_crcl_tables():
+    rows = [[(300.0, 400.0, 'CrCl 10 -50 : 500mg q12h')],
+            [(300.0, 400.0, 'then review')],
+            [(300.0, 400.0, 'CrCl (ml/min)'), (400.0, 450.0, 'Dose')],
+            [(300.0, 320.0, '> 50'), (400.0, 450.0, '1g q8h')],
+            [(300.0, 320.0, '< 10'), (400.0, 450.0, '1g q24h')],
+            [(300.0, 400.0, '*Source: renal handbook')]]
+    assert renal_dosing(rows) == [
+        {"crcl": "10-50", "adjustment": "500mg q12h then review"},
+        {"crcl": ">50", "adjustment": "1g q8h"},
+        {"crcl": "<10", "adjustment": "1g q24h"},
+    ]